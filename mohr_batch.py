@@ -0,0 +1,337 @@
+import argparse
+import contextlib
+import io
+import itertools
+import sys
+import time
+import zipfile
+import numpy as np
+from mohr_core import mohr_solve,mohr_solve_3d
+from mohr_failure import WorstTracker,evaluate
+
+#Headless batch mode: streams stress states from CSV, .npy or .npz files through
+# mohr_solve in fixed-size chunks and writes principal stresses, maximum shear
+# and principal angle to CSV or .npy. Only one chunk is held in memory at a
+# time; .npy and uncompressed .npz inputs are memory-mapped.
+#
+#   python mohrs_circle_gui.py batch states.csv results.csv --chunk-size 500000
+#
+#CSV inputs need a header naming the sigma_xx, sigma_yy and tau_xy columns and
+# may have an id column. .npy inputs are structured arrays with those fields or
+# plain (N,3) arrays in sigma_xx, sigma_yy, tau_xy order; .npz inputs hold one
+# array per field. Inputs with any of the sigma_zz, tau_xz, tau_yz fields (or
+# plain (N,6) arrays) are 3D states and give sigma1, sigma2, sigma3, tau_max.
+#
+#With material strengths the von Mises, Tresca and Coulomb-Mohr utilizations are
+# appended, and --worst N reports the N most utilized states (the N highest von
+# Mises stresses without strengths) without sorting the whole file.
+#
+#--store DB also saves every state and its results to a SQLite result store
+# (see mohr_store) in one transaction.
+
+STRESS_FIELDS=('sigma_xx','sigma_yy','tau_xy')
+OUT_OF_PLANE_FIELDS=('sigma_zz','tau_xz','tau_yz')
+RESULT_FIELDS=('sigma1','sigma2','tau_max','theta')
+RESULT_FIELDS_3D=('sigma1','sigma2','sigma3','tau_max')
+UTILIZATION_FIELDS={'von_mises':'von_mises_util','tresca':'tresca_util','mohr_coulomb':'mohr_coulomb_util'}
+CHUNK_SIZE=1_000_000
+
+########################## BEGIN READERS #####################
+
+#CSV reader, yields (ids,sigma_xx,sigma_yy,tau_xy[,sigma_zz,tau_xz,tau_yz]) chunks
+def read_csv_chunks(path,chunk_size=CHUNK_SIZE,dtype=np.float64,id_column='id'):
+    with open(path) as f:
+        header=[name.strip() for name in f.readline().split(',')]
+        try:
+            columns=[header.index(name) for name in STRESS_FIELDS]
+        except ValueError:
+            raise ValueError(f"{path}: header must name the columns {', '.join(STRESS_FIELDS)}")
+        id_index=header.index(id_column) if id_column in header else None
+
+        #3D inputs, missing out of plane columns are zero
+        out_of_plane=[header.index(name) if name in header else None for name in OUT_OF_PLANE_FIELDS]
+        is_3d=any(column is not None for column in out_of_plane)
+        columns+=[column for column in out_of_plane if column is not None]
+
+        #blank lines are skipped, count_rows does not count them either
+        while True:
+            block=list(itertools.islice(f,chunk_size))
+            if not block:
+                return
+            lines=[line for line in block if not line.isspace()]
+            if not lines:
+                continue
+            values=np.loadtxt(lines,delimiter=',',usecols=columns,dtype=dtype,ndmin=2)
+            ids=None
+            if id_index is not None:
+                ids=np.loadtxt(lines,delimiter=',',usecols=id_index,dtype=str,ndmin=1)
+            stresses=[values[:,i] for i in range(3)]
+            if is_3d:
+                extra=iter(values.T[3:])
+                zeros=np.zeros(len(values),dtype=dtype)
+                stresses+=[zeros if column is None else next(extra) for column in out_of_plane]
+            yield (ids,*stresses)
+
+
+#memory-map one array of an uncompressed .npz, fall back to loading it
+def _npz_array(path,archive,name):
+    member=archive.getinfo(name+'.npy')
+    if member.compress_type!=zipfile.ZIP_STORED:
+        with np.load(path) as data:
+            return data[name]
+
+    #the array data follows the local file header and the .npy header
+    with open(path,'rb') as f:
+        f.seek(member.header_offset)
+        local_header=f.read(30)
+        name_length=int.from_bytes(local_header[26:28],'little')
+        extra_length=int.from_bytes(local_header[28:30],'little')
+        f.seek(member.header_offset+30+name_length+extra_length)
+        version=np.lib.format.read_magic(f)
+        if version==(1,0):
+            shape,fortran_order,dtype=np.lib.format.read_array_header_1_0(f)
+        else:
+            shape,fortran_order,dtype=np.lib.format.read_array_header_2_0(f)
+        offset=f.tell()
+    return np.memmap(path,dtype=dtype,mode='r',shape=shape,offset=offset,
+    order='F' if fortran_order else 'C')
+
+
+#named arrays to (ids,*stresses), missing out of plane fields of 3D inputs are zero
+def _select_fields(path,names,get,id_column):
+    missing=[name for name in STRESS_FIELDS if name not in names]
+    if missing:
+        raise ValueError(f"{path}: missing fields {', '.join(missing)}")
+    ids=get(id_column) if id_column in names else None
+    stresses=[get(name) for name in STRESS_FIELDS]
+    if any(name in names for name in OUT_OF_PLANE_FIELDS):
+        zeros=np.zeros(1,dtype=stresses[0].dtype)
+        stresses+=[get(name) if name in names else np.broadcast_to(zeros,stresses[0].shape)
+        for name in OUT_OF_PLANE_FIELDS]
+    return (ids,*stresses)
+
+
+#open a .npy/.npz input as (ids,*stresses) arrays without reading it
+def open_arrays(path,id_column='id'):
+    if str(path).endswith('.npz'):
+        with zipfile.ZipFile(path) as archive:
+            names={member[:-4] for member in archive.namelist()}
+            return _select_fields(path,names,lambda name: _npz_array(path,archive,name),id_column)
+
+    data=np.load(path,mmap_mode='r')
+    if data.dtype.names:
+        return _select_fields(path,data.dtype.names,lambda name: data[name],id_column)
+    if data.ndim!=2 or data.shape[1] not in (3,6):
+        raise ValueError(f"{path}: expected a structured array or an (N,3) or (N,6) array, got shape {data.shape}")
+    return (None,*(data[:,i] for i in range(data.shape[1])))
+
+
+#chunked reader for any supported input, yields (ids,sigma_xx,sigma_yy,tau_xy)
+# chunks with sigma_zz, tau_xz, tau_yz appended for 3D inputs
+def read_chunks(path,chunk_size=CHUNK_SIZE,dtype=np.float64,id_column='id'):
+    if str(path).endswith('.csv'):
+        yield from read_csv_chunks(path,chunk_size,dtype,id_column)
+        return
+    ids,*stresses=open_arrays(path,id_column)
+    for start in range(0,len(stresses[0]),chunk_size):
+        stop=start+chunk_size
+        yield (None if ids is None else np.asarray(ids[start:stop]),
+        *(np.asarray(a[start:stop],dtype=dtype) for a in stresses))
+
+
+#number of states in an input file, the non-blank CSV lines after the header
+def count_rows(path,id_column='id'):
+    if str(path).endswith('.csv'):
+        with open(path,'rb') as f:
+            f.readline()
+            return sum(1 for line in f if not line.isspace())
+    return len(open_arrays(path,id_column)[1])
+
+########################## END READERS #####################
+
+########################## BEGIN WRITERS #####################
+
+#CSV writer, one row per state
+class CsvWriter:
+
+    def __init__(self,path,with_ids,precision=6,fields=RESULT_FIELDS):
+        self.file=open(path,'w',newline='')
+        self.with_ids=with_ids
+        self.fmt=f'%.{precision}g'
+        self.file.write(','.join((('id',) if with_ids else ())+tuple(fields))+'\n')
+
+    def write(self,ids,results):
+        body=io.StringIO()
+        np.savetxt(body,results,fmt=self.fmt,delimiter=',')
+        if self.with_ids:
+            lines=body.getvalue().splitlines()
+            self.file.write(''.join(f'{i},{line}\n' for i,line in zip(ids,lines)))
+        else:
+            self.file.write(body.getvalue())
+
+    def close(self):
+        self.file.close()
+
+
+#.npy writer, a memory-mapped (N,4) array of the result fields
+class NpyWriter:
+
+    def __init__(self,path,rows,dtype,fields=RESULT_FIELDS):
+        self.array=np.lib.format.open_memmap(path,mode='w+',dtype=dtype,shape=(rows,len(fields)))
+        self.row=0
+
+    def write(self,ids,results):
+        self.array[self.row:self.row+len(results)]=results
+        self.row+=len(results)
+
+    def close(self):
+        self.array.flush()
+        del self.array
+
+########################## END WRITERS #####################
+
+#solve one chunk, returns an (n,4) array of sigma1, sigma2, tau_max, theta, or of
+# sigma1, sigma2, sigma3, tau_max when the out of plane components are given
+def solve_chunk(sigma_xx,sigma_yy,tau_xy,*out_of_plane,dtype=np.float64):
+    if out_of_plane:
+        res=mohr_solve_3d(sigma_xx,sigma_yy,tau_xy,*out_of_plane,dtype=dtype)
+        return np.column_stack([res.sigma1,res.sigma2,res.sigma3,res.tau_max])
+    res=mohr_solve(sigma_xx,sigma_yy,tau_xy,dtype=dtype)
+    return np.column_stack([res.sigma1,res.sigma2,res.tau_max,res.theta])
+
+
+#criteria that can be evaluated with the given strengths, in UTILIZATION_FIELDS order
+def utilization_criteria(yield_strength=None,tensile_strength=None,compressive_strength=None):
+    criteria=[]
+    if yield_strength:
+        criteria+=['von_mises','tresca']
+    if tensile_strength and compressive_strength:
+        criteria.append('mohr_coulomb')
+    return criteria
+
+
+#utilizations of solved chunk results, the (n,k) array of the chosen criteria and
+# the ranking value for --worst: the governing utilization, or the von Mises
+# stress when no criterion is chosen
+def utilization_chunk(results,is_3d,criteria,strengths):
+    principal=results[:,:3] if is_3d else results[:,:2]
+    res=evaluate(*principal.T,**strengths)
+    columns=np.column_stack([getattr(res,name) for name in criteria]
+    or [np.empty((len(results),0))]).astype(results.dtype)
+    rank=np.nanmax(columns,axis=1) if criteria else res.von_mises_stress
+    return columns,rank
+
+
+#stream an input file through the solver into an output file, returns the row
+# count. strengths (yield_strength, tensile_strength, compressive_strength)
+# append utilization columns, a WorstTracker collects the worst states and a
+# mohr_store.ResultStore saves the states as one run.
+def run_batch(input_path,output_path,chunk_size=CHUNK_SIZE,dtype=np.float64,
+id_column='id',progress=None,strengths=None,tracker=None,store=None):
+    chunks=read_chunks(input_path,chunk_size,dtype,id_column)
+    first=next(chunks,None)
+    if first is None:
+        raise ValueError(f"{input_path}: no stress states found")
+
+    is_3d=len(first)>4
+    fields=RESULT_FIELDS_3D if is_3d else RESULT_FIELDS
+    strengths=strengths or {}
+    criteria=utilization_criteria(**strengths)
+    fields=fields+tuple(UTILIZATION_FIELDS[name] for name in criteria)
+    if str(output_path).endswith('.npy'):
+        writer=NpyWriter(output_path,count_rows(input_path,id_column),dtype,fields)
+    else:
+        writer=CsvWriter(output_path,with_ids=first[0] is not None,
+        precision=7 if np.dtype(dtype)==np.float32 else 10,fields=fields)
+
+    rows=0
+    start=time.perf_counter()
+    try:
+        with (store.bulk(input_path,count_rows(input_path,id_column)) if store is not None
+        else contextlib.nullcontext()) as run:
+            for ids,*stresses in itertools.chain([first],chunks):
+                results=solve_chunk(*stresses,dtype=dtype)
+                if run is not None:
+                    run.write(ids,stresses,results)
+                if criteria or tracker is not None:
+                    columns,rank=utilization_chunk(results,is_3d,criteria,strengths)
+                    if criteria:
+                        results=np.hstack([results,columns])
+                    if tracker is not None:
+                        tracker.add(rank,np.arange(rows,rows+len(results)),ids)
+                writer.write(ids,results)
+                rows+=len(stresses[0])
+                if progress is not None:
+                    progress(rows,time.perf_counter()-start)
+    finally:
+        writer.close()
+    return rows
+
+
+#rows/second progress report on stderr
+def print_progress(rows,elapsed):
+    rate=rows/elapsed if elapsed>0 else float('inf')
+    print(f"\r{rows:,} rows, {rate:,.0f} rows/s",end='',file=sys.stderr,flush=True)
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py batch',
+    description="Solve Mohr's circle for every stress state in a CSV, .npy or .npz file.")
+    parser.add_argument('input',help='CSV, .npy or .npz file of sigma_xx, sigma_yy, tau_xy '
+    'and optionally sigma_zz, tau_xz, tau_yz (MPa)')
+    parser.add_argument('output',help='CSV or .npy file for sigma1, sigma2, tau_max, theta '
+    '(sigma1, sigma2, sigma3, tau_max for 3D inputs)')
+    parser.add_argument('--chunk-size',type=int,default=CHUNK_SIZE,help='states per chunk (default %(default)s)')
+    parser.add_argument('--float32',action='store_true',help='compute and write in single precision')
+    parser.add_argument('--id-column',default='id',help='name of the optional ID column (default %(default)s)')
+    parser.add_argument('--yield-strength',type=float,help='yield strength (MPa), adds von Mises and Tresca utilizations')
+    parser.add_argument('--tensile-strength',type=float,help='tensile strength (MPa), with --compressive-strength '
+    'adds the Coulomb-Mohr utilization')
+    parser.add_argument('--compressive-strength',type=float,help='compressive strength as a positive value (MPa)')
+    parser.add_argument('--worst',type=int,metavar='N',help='report the N most utilized states')
+    parser.add_argument('--worst-output',help='CSV file for the --worst report (default stdout)')
+    parser.add_argument('--store',metavar='DB',help='also save the states and results to this SQLite result store')
+    parser.add_argument('--quiet',action='store_true',help='no progress report')
+    args=parser.parse_args(argv)
+
+    strengths=dict(yield_strength=args.yield_strength,tensile_strength=args.tensile_strength,
+    compressive_strength=args.compressive_strength)
+    tracker=WorstTracker(args.worst) if args.worst else None
+
+    store=None
+    if args.store is not None:
+        from mohr_store import ResultStore
+        store=ResultStore(args.store)
+
+    start=time.perf_counter()
+    try:
+        rows=run_batch(args.input,args.output,args.chunk_size,
+        np.float32 if args.float32 else np.float64,args.id_column,
+        None if args.quiet else print_progress,strengths,tracker,store)
+    finally:
+        if store is not None:
+            store.close()
+    elapsed=time.perf_counter()-start
+    if not args.quiet:
+        print(f"\n{rows:,} states written to {args.output} in {elapsed:.2f} s",file=sys.stderr)
+    if tracker is not None:
+        write_worst(tracker,args.worst_output,
+        'utilization' if utilization_criteria(**strengths) else 'von_mises_stress')
+    return 0
+
+
+#--worst report, one row per state, most critical first
+def write_worst(tracker,path=None,value_name='utilization'):
+    f=sys.stdout if path is None else open(path,'w',newline='')
+    try:
+        f.write(f'row,id,{value_name}\n')
+        for row,case_id,value in zip(tracker.rows,tracker.ids,tracker.values):
+            f.write(f"{row},{'' if case_id is None else case_id},{value:.10g}\n")
+    finally:
+        if path is not None:
+            f.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
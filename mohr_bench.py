@@ -0,0 +1,246 @@
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from mohr_core import mohr_points,mohr_solve,mohr_solve_3d
+from mohr_plot import AngleScrubber,MohrFigure,prepare_frame
+
+#Headless benchmark suite. Times the solver on single states and on batches,
+# figure construction, Agg draws, savefig and a soak of repeated GUI style
+# "Calculate" cycles that samples RSS and the number of live figures. Results
+# are written as JSON together with the versions and git commit they were
+# measured on, and --compare prints the change against an earlier run.
+#
+#   python mohrs_circle_gui.py bench --output bench.json
+#   python mohrs_circle_gui.py bench --quick --compare bench.json
+
+#batch sizes for the batched solver
+BATCH_SIZES=(10**3,10**4,10**5,10**6,10**7)
+
+#alternating load cases for the draw and soak benchmarks, 2D and 3D
+STATES=((10,5,3),(-40,25,-15),(80,-20,35),(10,5,3,40,0,0),(0,0,25),(-5,-60,10))
+
+########################## BEGIN MEASUREMENT #####################
+
+#time func(*args) in repeat rounds of number calls, seconds per call
+def measure(func,*args,repeat=5,number=1):
+    times=[]
+    for _ in range(repeat):
+        start=time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        times.append((time.perf_counter()-start)/number)
+    return {'min':min(times),'median':float(np.median(times)),'mean':float(np.mean(times)),
+    'repeat':repeat,'number':number}
+
+
+#calls per round so that one round takes at least min_time seconds
+def autorange(func,*args,min_time=0.05):
+    number=1
+    while True:
+        start=time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        if time.perf_counter()-start>=min_time or number>=10**6:
+            return number
+        number*=10
+
+
+#resident set size (bytes), the peak RSS where the current one is not available
+# and None where neither is (resource is Unix only)
+def rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+    except (OSError,ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform=='darwin' else peak*1024
+
+
+#number of matplotlib figures still alive
+def live_figures():
+    gc.collect()
+    return sum(isinstance(obj,Figure) for obj in gc.get_objects())
+
+
+#versions and commit the results were measured on
+def metadata():
+    try:
+        commit=subprocess.run(['git','rev-parse','HEAD'],capture_output=True,text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),timeout=10).stdout.strip() or None
+    except (OSError,subprocess.SubprocessError):
+        commit=None
+    return {'commit':commit,'time':time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    'python':platform.python_version(),'numpy':np.__version__,'matplotlib':matplotlib.__version__,
+    'platform':platform.platform(),'processor':platform.processor() or platform.machine(),
+    'cpu_count':os.cpu_count()}
+
+########################## END MEASUREMENT #####################
+
+########################## BEGIN BENCHMARKS #####################
+
+#single state solver calls
+def bench_scalar(repeat=5):
+    results={}
+    for name,func,args in (('mohr_solve',mohr_solve,(10,5,3)),
+    ('mohr_points',mohr_points,(10,5,3)),
+    ('mohr_solve_3d',mohr_solve_3d,(10,5,3,40,-8,6)),
+    ('prepare_frame',prepare_frame,(10,5,3))):
+        results[name]=measure(func,*args,repeat=repeat,number=autorange(func,*args))
+    return results
+
+
+#batched solver over growing batches, also reported as states per second
+def bench_batched(sizes=BATCH_SIZES,repeat=3,dtype=np.float64):
+    rng=np.random.default_rng(0)
+    results={}
+    for size in sizes:
+        stress=[rng.normal(0,100,size).astype(dtype) for _ in range(6)]
+        for name,func,args in (('mohr_solve',mohr_solve,stress[:3]),
+        ('mohr_solve_3d',mohr_solve_3d,stress)):
+            timing=measure(func,*args,repeat=repeat)
+            timing['states_per_s']=size/timing['min']
+            results[f'{name}[{size}]']=timing
+        del stress
+    return results
+
+
+#figure construction and per-state updates of the persistent figure
+def bench_figure(repeat=5):
+    mohr_fig=MohrFigure()
+    frame=prepare_frame(10,5,3)
+    return {'MohrFigure':measure(MohrFigure,repeat=repeat),
+    'apply':measure(mohr_fig.apply,frame,repeat=repeat,number=autorange(mohr_fig.apply,frame))}
+
+
+#full Agg draws of the persistent figure, the same state and a new state each time
+def bench_draw(repeat=10):
+    mohr_fig=MohrFigure()
+    canvas=FigureCanvasAgg(mohr_fig.fig)
+    mohr_fig.update(*STATES[0])
+    canvas.draw()
+    cycle=iter(STATES*repeat)
+    return {'draw':measure(canvas.draw,repeat=repeat),
+    'update+draw':measure(lambda: (mohr_fig.update(*next(cycle)),canvas.draw()),repeat=repeat)}
+
+
+#savefig to memory in every format
+def bench_savefig(repeat=5,dpi=100):
+    mohr_fig=MohrFigure()
+    FigureCanvasAgg(mohr_fig.fig)
+    mohr_fig.update(*STATES[0])
+    results={}
+    for fmt in ('png','svg','pdf'):
+        results[fmt]=measure(lambda: mohr_fig.fig.savefig(io.BytesIO(),format=fmt,dpi=dpi),repeat=repeat)
+    return results
+
+
+#repeated GUI style Calculate cycles on one figure: prepare the frame, apply it
+# and draw with the angle overlay connected. RSS and live figures are sampled
+# every sample_every cycles, growth over the run points at a leak.
+def bench_soak(cycles=2000,sample_every=100):
+    mohr_fig=MohrFigure()
+    canvas=FigureCanvasAgg(mohr_fig.fig)
+    AngleScrubber(mohr_fig)
+    samples=[]
+    start=time.perf_counter()
+    for cycle in range(cycles+1):
+        if cycle%sample_every==0:
+            samples.append({'cycle':cycle,'rss':rss(),'figures':live_figures(),
+            'elapsed':time.perf_counter()-start})
+        if cycle<cycles:
+            mohr_fig.apply(prepare_frame(*STATES[cycle%len(STATES)]))
+            canvas.draw()
+
+    #growth between the first sample after warm up and the end
+    first=samples[min(1,len(samples)-1)]
+    return {'cycles':cycles,'per_cycle':samples[-1]['elapsed']/max(cycles,1),
+    'rss_growth':None if first['rss'] is None else samples[-1]['rss']-first['rss'],
+    'figure_growth':samples[-1]['figures']-first['figures'],'samples':samples}
+
+
+#run the suite, returns the JSON document
+def run(quick=False,max_batch=10**7,soak_cycles=2000,progress=None):
+    sizes=tuple(size for size in BATCH_SIZES if size<=(10**5 if quick else max_batch))
+    repeat=2 if quick else 5
+    benchmarks=(('scalar',lambda: bench_scalar(repeat)),
+    ('batched',lambda: bench_batched(sizes,repeat=min(repeat,3))),
+    ('figure',lambda: bench_figure(repeat)),
+    ('draw',lambda: bench_draw(2*repeat)),
+    ('savefig',lambda: bench_savefig(repeat)),
+    ('soak',lambda: bench_soak(min(soak_cycles,200) if quick else soak_cycles)))
+
+    results={}
+    for name,bench in benchmarks:
+        if progress is not None:
+            progress(name)
+        results[name]=bench()
+    return {'meta':metadata(),'results':results}
+
+########################## END BENCHMARKS #####################
+
+#timing lines 'group/name seconds', the min of every timed benchmark
+def flatten(document):
+    rows={}
+    for group,results in document['results'].items():
+        for name,timing in results.items():
+            if isinstance(timing,dict) and 'min' in timing:
+                rows[f'{group}/{name}']=timing['min']
+        if 'per_cycle' in results:
+            rows[f'{group}/per_cycle']=results['per_cycle']
+    return rows
+
+
+#print the change of every timing against an earlier run
+def compare(old,new,file=sys.stdout):
+    old_rows,new_rows=flatten(old),flatten(new)
+    print(f"{'benchmark':40} {'old':>12} {'new':>12} {'change':>8}",file=file)
+    for name,value in new_rows.items():
+        if name in old_rows:
+            print(f"{name:40} {old_rows[name]*1e3:10.4f}ms {value*1e3:10.4f}ms "
+            f"{(value/old_rows[name]-1)*100:+7.1f}%",file=file)
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py bench',
+    description="Benchmark the solver, figure construction, drawing and memory use.")
+    parser.add_argument('--output',help='JSON file for the results (default stdout)')
+    parser.add_argument('--quick',action='store_true',help='small batches, fewer repeats and a short soak')
+    parser.add_argument('--max-batch',type=int,default=10**7,help='largest batch size (default %(default)s)')
+    parser.add_argument('--soak-cycles',type=int,default=2000,help='Calculate cycles of the soak (default %(default)s)')
+    parser.add_argument('--compare',help='earlier JSON results to compare against')
+    parser.add_argument('--quiet',action='store_true',help='no progress report')
+    args=parser.parse_args(argv)
+
+    progress=None if args.quiet else lambda name: print(f"running {name}...",file=sys.stderr,flush=True)
+    document=run(args.quick,args.max_batch,args.soak_cycles,progress)
+
+    if args.output is None:
+        json.dump(document,sys.stdout,indent=2)
+        print()
+    else:
+        with open(args.output,'w') as f:
+            json.dump(document,f,indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f),document,file=sys.stderr if args.output is None else sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
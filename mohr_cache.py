@@ -0,0 +1,112 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+#Bounded least-recently-used caches for the GUI. Load cases are keyed by their
+# stress components, optionally rounded to a quantum so that states that only
+# differ by noise in the last digits share an entry. The GUI keeps one cache of
+# prepared frames (the solved quantities, see mohr_plot.prepare_frame) and one
+# of rendered Agg buffers, so revisiting a case neither recomputes nor redraws.
+#
+#Caches are limited by entry count and optionally by memory, the least recently
+# used entries are evicted first. They are safe to share with the worker thread.
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    nbytes: int      #estimated memory held by the entries
+
+    @property
+    def hit_rate(self):
+        lookups=self.hits+self.misses
+        return self.hits/lookups if lookups else 0.0
+
+
+#cache key for a stress state, components rounded to multiples of quantum (MPa)
+def state_key(*stress,quantum=None):
+    if quantum:
+        return tuple(round(float(s)/quantum)*quantum+0.0 for s in stress)
+    return tuple(float(s)+0.0 for s in stress)  #+0.0 folds -0.0 into 0.0
+
+
+#memory estimate of a cached value: arrays and buffers by their data size,
+# containers by their items, anything else by sys.getsizeof
+def sizeof(value):
+    if hasattr(value,'nbytes'):
+        return int(value.nbytes)
+    try:
+        return memoryview(value).nbytes
+    except TypeError:
+        pass
+    if isinstance(value,dict):
+        return sys.getsizeof(value)+sum(sizeof(v) for v in value.values())
+    if isinstance(value,(list,tuple)):
+        return sys.getsizeof(value)+sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+
+    def __init__(self,max_entries=64,max_bytes=None):
+        self.max_entries=max_entries  #entry limit, None for no limit
+        self.max_bytes=max_bytes      #memory limit (bytes), None for no limit
+        self.hits=0
+        self.misses=0
+        self.evictions=0
+        self.nbytes=0
+        self._entries=OrderedDict()   #key -> (value,size), most recent last
+        self._lock=threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self,key):
+        return key in self._entries
+
+    #cached value or default, a hit marks the entry as most recently used
+    def get(self,key,default=None):
+        with self._lock:
+            entry=self._entries.get(key)
+            if entry is None:
+                self.misses+=1
+                return default
+            self.hits+=1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    #store a value, evicting least recently used entries to stay within the limits.
+    # A value larger than max_bytes on its own is not cached.
+    def put(self,key,value):
+        size=sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes-=self._entries.pop(key)[1]
+            if self.max_bytes is not None and size>self.max_bytes:
+                return
+            self._entries[key]=(value,size)
+            self.nbytes+=size
+            while self._entries and ((self.max_entries is not None and len(self._entries)>self.max_entries)
+            or (self.max_bytes is not None and self.nbytes>self.max_bytes)):
+                self.nbytes-=self._entries.popitem(last=False)[1][1]
+                self.evictions+=1
+
+    #cached value, computed with func(*args) and stored on a miss
+    def get_or_compute(self,key,func,*args):
+        missing=object()
+        value=self.get(key,missing)
+        if value is missing:
+            value=func(*args)
+            self.put(key,value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes=0
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self.hits,self.misses,self.evictions,len(self._entries),self.nbytes)
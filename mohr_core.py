@@ -0,0 +1,158 @@
+import numpy as np
+from typing import NamedTuple
+
+########################## BEGIN MOHR SOLVER #####################
+
+#The functions in this module do the Mohr's circle math only, they never touch
+# matplotlib. Every function accepts scalars or NumPy arrays of any (matching or
+# broadcastable) shape and returns results of the broadcast shape, so N stress
+# states are solved in one vectorized pass.
+
+#solver results, every field has the broadcast shape of the inputs
+class MohrResult(NamedTuple):
+    center: np.ndarray  #circle center on the sigma axis (MPa)
+    radius: np.ndarray  #circle radius (MPa)
+    sigma1: np.ndarray  #major principal stress (MPa)
+    sigma2: np.ndarray  #minor principal stress (MPa)
+    tau_max: np.ndarray #maximum in-plane shear stress (MPa)
+    theta: np.ndarray   #principal angle, x axis to sigma1 direction (degrees)
+
+
+#promote inputs to float arrays, keep float32 inputs as float32
+def _as_float_arrays(*values,dtype=None):
+    if dtype is None:
+        arrays=[x for x in values if hasattr(x,'dtype')]
+        dtype=np.result_type(*arrays,np.float32) if arrays else np.float64
+    return [np.asarray(x,dtype=dtype) for x in values]
+
+
+#vectorized principal stress solver
+def mohr_solve(sigma_xx,sigma_yy,tau_xy,dtype=None):
+    sigma_xx,sigma_yy,tau_xy=_as_float_arrays(sigma_xx,sigma_yy,tau_xy,dtype=dtype)
+
+    #circle center and half the x distance between A and B
+    center=0.5*(sigma_xx+sigma_yy)
+    half_diff=0.5*(sigma_xx-sigma_yy)
+
+    #circle radius equals half the AB line length
+    radius=np.hypot(half_diff,tau_xy)
+
+    #principal stresses and maximum shear stress
+    sigma1=center+radius
+    sigma2=center-radius
+    tau_max=radius
+
+    #principal angle, half the angle from CA to the sigma axis on the circle,
+    # positive for positive tau_xy. A state with tau_xy=0 gives 0 degrees, or
+    # 90 degrees when sigma_yy is the larger normal stress.
+    theta=0.5*np.degrees(np.arctan2(tau_xy,half_diff))
+
+    return MohrResult(center,radius,sigma1,sigma2,tau_max,theta)
+
+
+#3D solver results, principal stresses are ordered sigma1 >= sigma2 >= sigma3
+class MohrResult3D(NamedTuple):
+    sigma1: np.ndarray  #major principal stress (MPa)
+    sigma2: np.ndarray  #intermediate principal stress (MPa)
+    sigma3: np.ndarray  #minor principal stress (MPa)
+    tau_max: np.ndarray #absolute maximum shear stress, (sigma1-sigma3)/2 (MPa)
+    centers: np.ndarray #centers of the sigma1-sigma3, sigma1-sigma2 and sigma2-sigma3 circles, shape (...,3)
+    radii: np.ndarray   #radii of the same three circles, shape (...,3)
+    directions: np.ndarray=None #principal directions as columns, shape (...,3,3), only if requested
+
+
+#stack stress components into an array of symmetric (3,3) tensors
+def stress_tensor(sigma_xx,sigma_yy,tau_xy,sigma_zz=0,tau_xz=0,tau_yz=0,dtype=None):
+    components=_as_float_arrays(sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz,dtype=dtype)
+    sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz=np.broadcast_arrays(*components)
+    tensor=np.empty(sigma_xx.shape+(3,3),dtype=sigma_xx.dtype)
+    tensor[...,0,0]=sigma_xx
+    tensor[...,1,1]=sigma_yy
+    tensor[...,2,2]=sigma_zz
+    tensor[...,0,1]=tensor[...,1,0]=tau_xy
+    tensor[...,0,2]=tensor[...,2,0]=tau_xz
+    tensor[...,1,2]=tensor[...,2,1]=tau_yz
+    return tensor
+
+
+#eigenvalues of symmetric 3x3 tensors in closed form (trigonometric solution of
+# the characteristic cubic), returns sigma1 >= sigma2 >= sigma3. Per-matrix
+# LAPACK calls dominate np.linalg.eigvalsh for tiny matrices, this stays a
+# handful of array operations no matter how many states are solved.
+def _principal_3d(sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz):
+
+    #mean stress and deviatoric diagonal
+    mean=(sigma_xx+sigma_yy+sigma_zz)/3
+    a,b,c=sigma_xx-mean,sigma_yy-mean,sigma_zz-mean
+
+    #size of the deviator and its normalized determinant
+    p=np.sqrt((a*a+b*b+c*c+2*(tau_xy*tau_xy+tau_xz*tau_xz+tau_yz*tau_yz))/6)
+    det=(a*(b*c-tau_yz*tau_yz)-tau_xy*(tau_xy*c-tau_yz*tau_xz)
+    +tau_xz*(tau_xy*tau_yz-b*tau_xz))
+    with np.errstate(divide='ignore',invalid='ignore'):
+        r=np.where(p>0,det/(2*p*p*p),0)
+    phi=np.arccos(np.clip(r,-1,1))/3
+
+    sigma1=mean+2*p*np.cos(phi)
+    sigma3=mean+2*p*np.cos(phi+2*np.pi/3)
+    sigma2=3*mean-sigma1-sigma3
+    return sigma1,sigma2,sigma3
+
+
+#vectorized 3D principal stress solver. Arguments follow mohr_solve with the
+# out of plane components appended, so any number of states is solved in one
+# pass. Principal directions need a real eigen-solve and are only computed when
+# vectors=True, with one batched np.linalg.eigh call on the (...,3,3) stack.
+def mohr_solve_3d(sigma_xx,sigma_yy,tau_xy,sigma_zz=0,tau_xz=0,tau_yz=0,dtype=None,
+vectors=False):
+    components=_as_float_arrays(sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz,dtype=dtype)
+
+    directions=None
+    if vectors:
+        #eigenvalues come back in ascending order
+        values,directions=np.linalg.eigh(stress_tensor(*components))
+        directions=directions[...,::-1]
+        sigma3,sigma2,sigma1=values[...,0],values[...,1],values[...,2]
+    else:
+        sigma1,sigma2,sigma3=_principal_3d(*components)
+
+    #the three Mohr's circles
+    centers=np.stack([sigma1+sigma3,sigma1+sigma2,sigma2+sigma3],axis=-1)/2
+    radii=np.stack([sigma1-sigma3,sigma1-sigma2,sigma2-sigma3],axis=-1)/2
+
+    return MohrResult3D(sigma1,sigma2,sigma3,radii[...,0],centers,radii,directions)
+
+
+#stresses on a plane rotated counterclockwise by theta degrees from the x axis,
+# returns sigma_x', sigma_y' and tau_x'y' (theta equal to the principal angle
+# gives sigma1, sigma2 and zero shear)
+def mohr_transform(sigma_xx,sigma_yy,tau_xy,theta,dtype=None):
+    sigma_xx,sigma_yy,tau_xy,theta=_as_float_arrays(sigma_xx,sigma_yy,tau_xy,theta,dtype=dtype)
+    center=0.5*(sigma_xx+sigma_yy)
+    half_diff=0.5*(sigma_xx-sigma_yy)
+    two_theta=np.radians(2*theta)
+    cos,sin=np.cos(two_theta),np.sin(two_theta)
+    sigma_x=center+half_diff*cos+tau_xy*sin
+    sigma_y=center-half_diff*cos-tau_xy*sin
+    tau_xy_rot=-half_diff*sin+tau_xy*cos
+    return sigma_x,sigma_y,tau_xy_rot
+
+
+#critical points of a single state, as plotted on the circle
+def mohr_points(sigma_xx,sigma_yy,tau_xy):
+    res=mohr_solve(sigma_xx,sigma_yy,tau_xy,dtype=float)
+    center=float(res.center)
+    radius=float(res.radius)
+    return {
+        'A':(float(sigma_xx),-float(tau_xy)),
+        'B':(float(sigma_yy),float(tau_xy)),
+        'C':(center,0.0),
+        'S1':(float(res.sigma1),0.0),
+        'S2':(float(res.sigma2),0.0),
+        'T1':(center,radius),
+        'T2':(center,-radius),
+        'radius':radius,
+        'angle':float(res.theta),
+    }
+
+########################## END MOHR SOLVER #####################
@@ -0,0 +1,184 @@
+import argparse
+import json
+import sys
+import time
+from typing import NamedTuple
+import numpy as np
+from mohr_batch import CHUNK_SIZE,read_chunks
+
+#Critical plane search for plane stress histories. The principal angle only
+# describes one instant; for multiaxial fatigue the plane that matters is the
+# one where a damage parameter taken over the whole history is largest.
+#
+#The normal and shear stress on every plane of an angle grid are evaluated for
+# every step as one (steps x angles) product: with c=(sxx+syy)/2 and
+# h=(sxx-syy)/2 the plane stresses are [c,h,txy] @ [1,cos 2t,sin 2t] and
+# [h,txy] @ [-sin 2t,cos 2t]. Only running extremes per angle are kept, so
+# histories are scanned in chunks of any length. A second pass over a fine grid
+# around the best coarse angle refines the result.
+#
+#   python mohrs_circle_gui.py critical history.csv --criterion findley --k 0.3
+#
+#theta is the angle (degrees, counterclockwise from x) of the plane normal, the
+# same angle as in mohr_transform, and planes repeat every 180 degrees.
+
+#damage parameters per plane:
+# shear_range  max - min shear stress over the history
+# max_shear    largest absolute shear stress
+# max_normal   largest normal stress
+# findley      shear amplitude + k * largest normal stress
+CRITERIA=('shear_range','max_shear','max_normal','findley')
+
+#largest (steps x angles) block evaluated at once, input chunks are split to fit
+BLOCK_ELEMENTS=2**21
+
+#coarse grid spacing and fine grid points of the refinement pass
+GRID_STEP=1.0
+REFINE_POINTS=41
+
+#stress extremes over the history for every plane of an angle grid
+class PlaneScan(NamedTuple):
+    theta: np.ndarray       #plane normal angles (degrees)
+    tau_max: np.ndarray     #largest shear stress on each plane (MPa)
+    tau_min: np.ndarray     #smallest shear stress on each plane (MPa)
+    normal_max: np.ndarray  #largest normal stress on each plane (MPa)
+    normal_min: np.ndarray  #smallest normal stress on each plane (MPa)
+    steps: int
+
+
+class CriticalPlane(NamedTuple):
+    theta: float            #critical plane normal angle (degrees)
+    value: float            #damage parameter on the critical plane
+    criterion: str
+    tau_range: float        #shear range on the critical plane (MPa)
+    normal_max: float       #largest normal stress on the critical plane (MPa)
+    steps: int
+    scan: PlaneScan         #coarse grid scan, for plotting the parameter over theta
+
+
+#angle grid covering every plane once, [-90,90)
+def angle_grid(step=GRID_STEP):
+    return np.arange(-90,90,step,dtype=np.float64)
+
+
+#scan an iterable of (sigma_xx,sigma_yy,tau_xy) chunks against an angle grid
+def scan_planes(chunks,theta):
+    theta=np.asarray(theta,dtype=np.float64)
+    two_theta=np.radians(2*theta)
+    cos,sin=np.cos(two_theta),np.sin(two_theta)
+    normal_matrix=np.stack([np.ones_like(cos),cos,sin])    #rows multiply c, h, txy
+    shear_matrix=np.stack([-sin,cos])                       #rows multiply h, txy
+
+    tau_max=np.full(len(theta),-np.inf)
+    tau_min=np.full(len(theta),np.inf)
+    normal_max=np.full(len(theta),-np.inf)
+    normal_min=np.full(len(theta),np.inf)
+    steps=0
+    for sigma_xx,sigma_yy,tau_xy in chunks:
+        sigma_xx,sigma_yy,tau_xy=(np.asarray(s,dtype=np.float64) for s in (sigma_xx,sigma_yy,tau_xy))
+        if not len(sigma_xx):
+            continue
+        center=0.5*(sigma_xx+sigma_yy)
+        half_diff=0.5*(sigma_xx-sigma_yy)
+        block=max(1,BLOCK_ELEMENTS//len(theta))
+        for start in range(0,len(center),block):
+            rows=slice(start,start+block)
+            normal=np.column_stack([center[rows],half_diff[rows],tau_xy[rows]])@normal_matrix
+            shear=np.column_stack([half_diff[rows],tau_xy[rows]])@shear_matrix
+            np.maximum(tau_max,shear.max(axis=0),out=tau_max)
+            np.minimum(tau_min,shear.min(axis=0),out=tau_min)
+            np.maximum(normal_max,normal.max(axis=0),out=normal_max)
+            np.minimum(normal_min,normal.min(axis=0),out=normal_min)
+        steps+=len(sigma_xx)
+    return PlaneScan(theta,tau_max,tau_min,normal_max,normal_min,steps)
+
+
+#damage parameter of every scanned plane
+def damage(scan,criterion='shear_range',k=0.3):
+    if criterion=='shear_range':
+        return scan.tau_max-scan.tau_min
+    if criterion=='max_shear':
+        return np.maximum(scan.tau_max,-scan.tau_min)
+    if criterion=='max_normal':
+        return scan.normal_max
+    if criterion=='findley':
+        return 0.5*(scan.tau_max-scan.tau_min)+k*scan.normal_max
+    raise ValueError(f"unknown criterion {criterion!r}, expected one of {', '.join(CRITERIA)}")
+
+
+#chunks of (sigma_xx,sigma_yy,tau_xy) arrays
+def array_chunks(sigma_xx,sigma_yy,tau_xy,chunk_size=CHUNK_SIZE):
+    sigma_xx,sigma_yy,tau_xy=np.broadcast_arrays(sigma_xx,sigma_yy,tau_xy)
+    for start in range(0,len(sigma_xx),chunk_size):
+        stop=start+chunk_size
+        yield sigma_xx[start:stop],sigma_yy[start:stop],tau_xy[start:stop]
+
+
+#critical plane of a history. chunks is a function returning a new iterable of
+# (sigma_xx,sigma_yy,tau_xy) chunks, called once per pass.
+def search(chunks,criterion='shear_range',k=0.3,step=GRID_STEP,refine=True,
+refine_points=REFINE_POINTS):
+    scan=scan_planes(chunks(),angle_grid(step))
+    if not scan.steps:
+        raise ValueError("no stress states to search")
+    values=damage(scan,criterion,k)
+    best=int(np.argmax(values))
+    result=scan,best
+
+    #fine grid one coarse step either side of the best angle
+    if refine and refine_points>1:
+        fine=scan_planes(chunks(),np.linspace(scan.theta[best]-step,scan.theta[best]+step,refine_points))
+        fine_values=damage(fine,criterion,k)
+        if fine_values.max()>values[best]:
+            result=fine,int(np.argmax(fine_values))
+
+    found,i=result
+    theta=(float(found.theta[i])+90)%180-90
+    return CriticalPlane(theta,float(damage(found,criterion,k)[i]),criterion,
+    float(found.tau_max[i]-found.tau_min[i]),float(found.normal_max[i]),scan.steps,scan)
+
+
+#critical plane of stress arrays
+def critical_plane(sigma_xx,sigma_yy,tau_xy,criterion='shear_range',k=0.3,step=GRID_STEP,
+refine=True,chunk_size=CHUNK_SIZE):
+    return search(lambda: array_chunks(sigma_xx,sigma_yy,tau_xy,chunk_size),criterion,k,step,refine)
+
+
+#critical plane of a history file, streamed twice (coarse and fine pass)
+def critical_plane_file(path,criterion='shear_range',k=0.3,step=GRID_STEP,refine=True,
+chunk_size=CHUNK_SIZE):
+    def chunks():
+        for ids,*stresses in read_chunks(path,chunk_size):
+            if len(stresses)>3:
+                raise ValueError(f"{path}: the critical plane search supports plane states only")
+            yield stresses
+    return search(chunks,criterion,k,step,refine)
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py critical',
+    description="Find the critical plane of a plane stress history.")
+    parser.add_argument('input',help='CSV, .npy or .npz file of sigma_xx, sigma_yy, tau_xy (MPa), one state per step')
+    parser.add_argument('--criterion',choices=CRITERIA,default='shear_range',help='damage parameter (default %(default)s)')
+    parser.add_argument('--k',type=float,default=0.3,help='Findley normal stress factor (default %(default)s)')
+    parser.add_argument('--step',type=float,default=GRID_STEP,help='coarse grid spacing (degrees, default %(default)s)')
+    parser.add_argument('--no-refine',action='store_true',help='skip the fine grid pass')
+    parser.add_argument('--chunk-size',type=int,default=CHUNK_SIZE,help='steps per chunk (default %(default)s)')
+    parser.add_argument('--json',action='store_true',help='print the result as JSON')
+    args=parser.parse_args(argv)
+
+    start=time.perf_counter()
+    result=critical_plane_file(args.input,args.criterion,args.k,args.step,not args.no_refine,args.chunk_size)
+    elapsed=time.perf_counter()-start
+    if args.json:
+        print(json.dumps({name:value for name,value in result._asdict().items() if name!='scan'}))
+    else:
+        print(f"critical plane theta = {result.theta:.3f} deg, {result.criterion} = {result.value:.6g}, "
+        f"shear range = {result.tau_range:.6g} MPa, max normal = {result.normal_max:.6g} MPa "
+        f"({result.steps:,} steps in {elapsed:.2f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
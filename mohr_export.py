@@ -0,0 +1,162 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from mohr_plot import CriticalPlaneOverlay,FailureOverlay,MohrFigure
+
+#Background export of the Mohr's circle figure to PNG, SVG or PDF. The GUI
+# snapshots the shown state (stresses, failure strengths and critical plane)
+# and queues it; a worker process renders it on its own template figure on
+# the Agg canvas and writes the file, so a large or high resolution export never
+# blocks the Tk event loop. Agg rendering holds the GIL, which is why the work
+# runs in a process and not a thread. Files are written under a temporary
+# name and renamed when complete.
+#
+#   python mohrs_circle_gui.py export 80 -40 30 figure.pdf --yield-strength 250
+
+FORMATS=('png','svg','pdf')
+
+#exports rendered at the same time, one keeps the GUI machine responsive
+EXPORT_WORKERS=1
+
+#per-process template figure and overlays, created by _init_worker
+_template=None
+
+def _init_worker():
+    global _template
+    mohr_fig=MohrFigure()
+    FigureCanvasAgg(mohr_fig.fig)
+    _template=(mohr_fig,FailureOverlay(mohr_fig),CriticalPlaneOverlay(mohr_fig))
+
+
+#format of an export path from its extension, ValueError if not supported
+def export_format(path):
+    fmt=os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"{path}: export format must be one of {', '.join(FORMATS)}")
+    return fmt
+
+
+#render one snapshot with the process template and write it to path,
+# returns (path,bytes written,seconds)
+def export_figure(stress,path,dpi=100,strengths=None,critical=None):
+    if _template is None:
+        _init_worker()
+    start=time.perf_counter()
+    fmt=export_format(path)
+    mohr_fig,failure,critical_overlay=_template
+    mohr_fig.update(*stress)
+    failure.update(**(strengths or {}))
+    if critical is None:
+        critical_overlay.clear()
+    else:
+        critical_overlay.update(critical)
+
+    part=path+'.part'
+    try:
+        mohr_fig.fig.savefig(part,format=fmt,dpi=dpi)
+        os.replace(part,path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    return path,os.path.getsize(path),time.perf_counter()-start
+
+
+#Queue of background exports. callback(path,result,error,pending) is called
+# from a pool thread when an export finishes: result is the export_figure
+# result or None and error the exception or None, pending counts the exports
+# still queued. The worker process is started on the first submit.
+class ExportQueue:
+
+    def __init__(self,callback,workers=EXPORT_WORKERS):
+        self.callback=callback
+        self.workers=workers
+        self.pool=None
+        self.pending=0
+        self.lock=threading.Lock()
+
+    #queue an export of a snapshot, returns the number of pending exports
+    def submit(self,stress,path,dpi=100,strengths=None,critical=None):
+        export_format(path)
+        if critical is not None:
+            critical=critical._replace(scan=None)  #the plane is enough to draw it
+        with self.lock:
+            args=(export_figure,tuple(stress),path,dpi,dict(strengths or {}),critical)
+            try:
+                job=self._pool().submit(*args)
+            except BrokenProcessPool:
+                #a crashed worker breaks the pool, start a new one
+                self.pool=None
+                job=self._pool().submit(*args)
+            self.pending+=1
+            pending=self.pending
+        job.add_done_callback(lambda job: self._done(path,job))
+        return pending
+
+    #spawned workers do not inherit the Tk state of the GUI process
+    def _pool(self):
+        if self.pool is None:
+            self.pool=ProcessPoolExecutor(self.workers,
+            mp_context=multiprocessing.get_context('spawn'),initializer=_init_worker)
+        return self.pool
+
+    def _done(self,path,job):
+        with self.lock:
+            self.pending-=1
+            pending=self.pending
+        try:
+            result,error=job.result(),None
+        except BaseException as e:
+            result,error=None,e
+        self.callback(path,result,error,pending)
+
+    #stop the worker, waiting for the queued exports or cancelling them
+    def close(self,wait=True):
+        with self.lock:
+            pool,self.pool=self.pool,None
+        if pool is not None:
+            pool.shutdown(wait=wait,cancel_futures=not wait)
+
+
+#human readable file size
+def format_size(size):
+    for unit in ('B','kB','MB'):
+        if size<1024:
+            return f'{size:.0f} {unit}' if unit=='B' else f'{size:.1f} {unit}'
+        size/=1024
+    return f'{size:.1f} GB'
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py export',
+    description="Export the Mohr's circle figure of one stress state.")
+    parser.add_argument('stress',nargs='+',type=float,
+    help='sigma_xx sigma_yy tau_xy [sigma_zz tau_xz tau_yz] (MPa)')
+    parser.add_argument('output',help='image file, '+'/'.join(FORMATS)+' by extension')
+    parser.add_argument('--dpi',type=int,default=100,help='raster resolution (default %(default)s)')
+    for name in ('yield','tensile','compressive'):
+        parser.add_argument(f'--{name}-strength',type=float,help=f'{name} strength (MPa)')
+    args=parser.parse_args(argv)
+    if len(args.stress) not in (3,6):
+        parser.error('give 3 (plane) or 6 (3D) stress components')
+    try:
+        export_format(args.output)
+    except ValueError as e:
+        parser.error(str(e))
+
+    strengths=dict(yield_strength=args.yield_strength,tensile_strength=args.tensile_strength,
+    compressive_strength=args.compressive_strength)
+    path,size,seconds=export_figure(args.stress,args.output,args.dpi,strengths)
+    print(f"{path} written ({format_size(size)}) in {seconds:.2f} s",file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import numpy as np
+from typing import NamedTuple
+from mohr_core import _as_float_arrays,mohr_solve,mohr_solve_3d
+
+########################## BEGIN FAILURE CRITERIA #####################
+
+#Failure criteria evaluated on principal stresses, the S1/S2 (and S3) outputs of
+# mohr_solve / mohr_solve_3d. Like the solver every function takes scalars or
+# arrays and works on whole arrays at once. Plane states are treated as plane
+# stress, with zero as the third principal stress.
+#
+#Utilizations are equivalent stress over strength (1 is the failure limit) and
+# safety factors are their inverse. Criteria whose strengths are not given come
+# back as NaN.
+
+class FailureResult(NamedTuple):
+    von_mises_stress: np.ndarray  #von Mises equivalent stress (MPa)
+    tresca_stress: np.ndarray     #Tresca equivalent stress, largest principal difference (MPa)
+    von_mises: np.ndarray         #von Mises utilization against the yield strength
+    tresca: np.ndarray            #Tresca utilization against the yield strength
+    mohr_coulomb: np.ndarray      #Coulomb-Mohr utilization against the tensile/compressive strengths
+    von_mises_sf: np.ndarray      #safety factors, 1/utilization
+    tresca_sf: np.ndarray
+    mohr_coulomb_sf: np.ndarray
+
+
+#largest, intermediate and smallest of three principal stresses
+def sort_principal(sigma1,sigma2,sigma3=0):
+    sigma1,sigma2,sigma3=np.broadcast_arrays(*_as_float_arrays(sigma1,sigma2,sigma3))
+    high=np.maximum(np.maximum(sigma1,sigma2),sigma3)
+    low=np.minimum(np.minimum(sigma1,sigma2),sigma3)
+    return high,sigma1+sigma2+sigma3-high-low,low
+
+
+#von Mises equivalent stress
+def von_mises(sigma1,sigma2,sigma3=0):
+    return np.sqrt(0.5*((sigma1-sigma2)**2+(sigma2-sigma3)**2+(sigma3-sigma1)**2))
+
+
+#Tresca equivalent stress, twice the absolute maximum shear stress
+def tresca(sigma1,sigma2,sigma3=0):
+    high,mid,low=sort_principal(sigma1,sigma2,sigma3)
+    return high-low
+
+
+#Coulomb-Mohr utilization, tensile and compressive strengths are both positive
+def mohr_coulomb(sigma1,sigma2,sigma3=0,tensile_strength=1,compressive_strength=1):
+    high,mid,low=sort_principal(sigma1,sigma2,sigma3)
+    return np.maximum(high,0)/tensile_strength-np.minimum(low,0)/compressive_strength
+
+
+#safety factor from a utilization, unloaded states are infinitely safe
+def safety_factor(utilization):
+    with np.errstate(divide='ignore'):
+        return 1/np.asarray(utilization)
+
+
+#every criterion for principal stresses
+def evaluate(sigma1,sigma2,sigma3=0,yield_strength=None,tensile_strength=None,
+compressive_strength=None):
+    vm=von_mises(sigma1,sigma2,sigma3)
+    tr=tresca(sigma1,sigma2,sigma3)
+    nan=np.full(np.shape(vm),np.nan)
+
+    vm_util=vm/yield_strength if yield_strength else nan
+    tr_util=tr/yield_strength if yield_strength else nan
+    mc_util=nan
+    if tensile_strength and compressive_strength:
+        mc_util=mohr_coulomb(sigma1,sigma2,sigma3,tensile_strength,compressive_strength)
+
+    return FailureResult(vm,tr,vm_util,tr_util,mc_util,safety_factor(vm_util),
+    safety_factor(tr_util),safety_factor(mc_util))
+
+
+#every criterion straight from stress components (3D when any out of plane
+# component is given)
+def evaluate_states(sigma_xx,sigma_yy,tau_xy,sigma_zz=None,tau_xz=None,tau_yz=None,
+yield_strength=None,tensile_strength=None,compressive_strength=None):
+    if sigma_zz is None and tau_xz is None and tau_yz is None:
+        res=mohr_solve(sigma_xx,sigma_yy,tau_xy)
+        principal=(res.sigma1,res.sigma2,0)
+    else:
+        res=mohr_solve_3d(sigma_xx,sigma_yy,tau_xy,*(0 if s is None else s for s in (sigma_zz,tau_xz,tau_yz)))
+        principal=(res.sigma1,res.sigma2,res.sigma3)
+    return evaluate(*principal,yield_strength,tensile_strength,compressive_strength)
+
+
+#upper Coulomb-Mohr envelope on the Mohr diagram, the line tau=slope*sigma+intercept
+# tangent to the uniaxial tension and compression circles (the lower envelope
+# is its mirror image). Also returns the sigma of the tension circle tangent point.
+def mohr_coulomb_envelope(tensile_strength,compressive_strength):
+    center_t,radius_t=tensile_strength/2,tensile_strength/2
+    center_c,radius_c=-compressive_strength/2,compressive_strength/2
+    sin=(radius_t-radius_c)/(center_t-center_c)
+    slope=sin/np.sqrt(1-sin*sin)
+    intercept=radius_t*np.sqrt(1+slope*slope)-slope*center_t
+    tangent_t=center_t-radius_t*sin
+    return slope,intercept,tangent_t
+
+
+#indices of the n largest values, largest first. np.argpartition selects them
+# in linear time and only those n are sorted, no sorted copy of the whole
+# array is made. NaN values rank below every number.
+def worst(values,n):
+    values=np.asarray(values)
+    n=min(n,len(values))
+    if n<=0:
+        return np.empty(0,dtype=np.intp)
+    keyed=np.where(np.isnan(values),-np.inf,values)
+    index=np.argpartition(keyed,len(keyed)-n)[len(keyed)-n:]
+    return index[np.argsort(keyed[index])[::-1]]
+
+
+#running worst-n over a stream of chunks, keeps only n candidates in memory
+class WorstTracker:
+
+    def __init__(self,n):
+        self.n=n
+        self.values=np.empty(0)
+        self.rows=np.empty(0,dtype=np.int64)
+        self.ids=np.empty(0,dtype=object)
+
+    #add a chunk of values, rows are the global row numbers of the chunk
+    def add(self,values,rows,ids=None):
+        index=worst(values,self.n)
+        values=np.concatenate([self.values,np.asarray(values)[index]])
+        rows=np.concatenate([self.rows,np.asarray(rows)[index]])
+        chunk_ids=np.full(len(index),None,dtype=object) if ids is None else np.asarray(ids,dtype=object)[index]
+        ids=np.concatenate([self.ids,chunk_ids])
+        keep=worst(values,self.n)
+        self.values,self.rows,self.ids=values[keep],rows[keep],ids[keep]
+
+########################## END FAILURE CRITERIA #####################
@@ -0,0 +1,472 @@
+import argparse
+import sys
+import time
+import zipfile
+from typing import NamedTuple
+import numpy as np
+import matplotlib.tri as mtri
+from matplotlib.figure import Figure
+from mohr_core import mohr_solve
+from mohr_plot import MohrFigure
+from mohr_rosette import read_channel_chunks
+
+#2D FE result fields. Node coordinates with sigma_xx, sigma_yy and tau_xy per
+# node are solved in one vectorized pass and shown as a contour map of sigma1,
+# sigma2 or tau_max with principal direction glyphs. Hovering or clicking the
+# map picks the nearest node through a uniform grid index (a few cells are
+# searched, never the whole field) and shows its circle on a MohrFigure, which
+# is updated in place. The map itself is cached and only the pick marker is
+# blitted, so meshes of millions of nodes stay responsive.
+#
+#   python mohrs_circle_gui.py field mesh.csv field.png --quantity tau_max
+#   python mohrs_circle_gui.py field mesh.npz field.png --at 12.5,3 --mohr node.png
+#
+#Inputs are CSV files with a header, .npy structured arrays or .npz files with
+# the columns x, y, sigma_xx, sigma_yy, tau_xy (plain .npy arrays in that
+# column order). Element connectivity (triangles as 0-based node numbers) may
+# be given as a triangles array in the .npz or a separate file, otherwise
+# small meshes are triangulated. Meshes above TRI_NODES are contoured on a
+# raster of node averages instead, triangulating and contouring a million
+# nodes takes tens of seconds.
+
+FIELD_COLUMNS=('x','y','sigma_xx','sigma_yy','tau_xy')
+
+#contoured quantities and their labels
+QUANTITIES={'sigma1':'\u03C3'+'1 (MPa)','sigma2':'\u03C3'+'2 (MPa)','tau_max':'\u03C4'+'max (MPa)'}
+
+#contour levels and principal direction glyphs along the longer side
+CONTOUR_LEVELS=20
+GLYPH_GRID=32
+
+#largest mesh contoured on its triangulation, larger ones use a raster
+TRI_NODES=50_000
+
+#raster size along the longer side, average nodes per pixel of smaller meshes
+# and coarser levels used to fill empty pixels
+RASTER_SIZE=600
+NODES_PER_PIXEL=2
+RASTER_FILL_LEVELS=3
+
+#Delaunay triangles with an edge longer than this many median edges are
+# dropped, so holes and concave outlines are not bridged
+MAX_EDGE_RATIO=5.0
+
+#average number of nodes per cell of the grid index
+NODES_PER_CELL=4
+
+########################## BEGIN SPATIAL INDEX #####################
+
+#Uniform grid over the node coordinates. Nodes are sorted by cell once and
+# every cell is a slice of that order, so a nearest node query only looks at
+# the cells in rings around the query point until no closer node can exist.
+class GridIndex:
+
+    def __init__(self,x,y,nodes_per_cell=NODES_PER_CELL):
+        x=np.asarray(x,dtype=np.float64)
+        y=np.asarray(y,dtype=np.float64)
+        self.x,self.y=x,y
+        self.x0,self.y0=float(x.min()),float(y.min())
+        width=max(float(x.max())-self.x0,0.0)
+        height=max(float(y.max())-self.y0,0.0)
+        cells=max(len(x)/nodes_per_cell,1)
+        area=width*height
+        self.size=np.sqrt(area/cells) if area>0 else max(width,height,1.0)/cells
+        if self.size<=0:
+            self.size=1.0
+        self.nx=int(width/self.size)+1
+        self.ny=int(height/self.size)+1
+
+        cell=self._cell(x,y)
+        self.order=np.argsort(cell,kind='stable')
+        self.starts=np.searchsorted(cell[self.order],np.arange(self.nx*self.ny+1))
+
+    def __len__(self):
+        return len(self.x)
+
+    def _cell(self,x,y):
+        ix=np.clip(((x-self.x0)/self.size).astype(np.intp),0,self.nx-1)
+        iy=np.clip(((y-self.y0)/self.size).astype(np.intp),0,self.ny-1)
+        return iy*self.nx+ix
+
+    #nodes of a set of cells, the order slices concatenated
+    def _nodes(self,cells):
+        starts=self.starts[cells]
+        counts=self.starts[cells+1]-starts
+        total=int(counts.sum())
+        if not total:
+            return np.empty(0,dtype=np.intp)
+        offsets=np.repeat(starts-np.cumsum(counts)+counts,counts)
+        return self.order[offsets+np.arange(total)]
+
+    #cells with inner < Chebyshev distance from (cx,cy) <= outer, inside the grid
+    def _annulus(self,cx,cy,inner,outer):
+        ix=np.arange(max(cx-outer,0),min(cx+outer,self.nx-1)+1)
+        iy=np.arange(max(cy-outer,0),min(cy+outer,self.ny-1)+1)
+        ix,iy=np.meshgrid(ix,iy)
+        keep=np.maximum(np.abs(ix-cx),np.abs(iy-cy))>inner
+        return (iy[keep]*self.nx+ix[keep]) if inner>=0 else (iy*self.nx+ix).ravel()
+
+    #distance from (px,py) to the cells outside the block of Chebyshev radius
+    # ring around (cx,cy), inf when the block covers the grid
+    def _bound(self,px,py,cx,cy,ring):
+        x1,y1=self.x0+self.nx*self.size,self.y0+self.ny*self.size
+        bx0,bx1=self.x0+(cx-ring)*self.size,self.x0+(cx+ring+1)*self.size
+        by0,by1=self.y0+(cy-ring)*self.size,self.y0+(cy+ring+1)*self.size
+        regions=[]
+        if cx-ring>0:
+            regions.append((self.x0,bx0,self.y0,y1))
+        if cx+ring<self.nx-1:
+            regions.append((bx1,x1,self.y0,y1))
+        if cy-ring>0:
+            regions.append((self.x0,x1,self.y0,by0))
+        if cy+ring<self.ny-1:
+            regions.append((self.x0,x1,by1,y1))
+        return min((np.hypot(max(rx0-px,0,px-rx1),max(ry0-py,0,py-ry1))
+        for rx0,rx1,ry0,ry1 in regions),default=np.inf)
+
+    #index of the node nearest to (px,py). The searched block of cells doubles
+    # until no cell outside it can hold a closer node.
+    def nearest(self,px,py):
+        cx=min(max(int((px-self.x0)//self.size),0),self.nx-1)
+        cy=min(max(int((py-self.y0)//self.size),0),self.ny-1)
+        best,best_dist=-1,np.inf
+        inner,outer=-1,1
+        while True:
+            nodes=self._nodes(self._annulus(cx,cy,inner,outer))
+            if len(nodes):
+                dist=np.hypot(self.x[nodes]-px,self.y[nodes]-py)
+                i=int(np.argmin(dist))
+                if dist[i]<best_dist:
+                    best,best_dist=int(nodes[i]),float(dist[i])
+            bound=self._bound(px,py,cx,cy,outer)
+            if bound==np.inf or (best>=0 and best_dist<=bound):
+                return best
+            inner,outer=outer,2*outer
+
+########################## END SPATIAL INDEX #####################
+
+########################## BEGIN FIELD #####################
+
+#solved field, every stress field has one entry per node
+class Field(NamedTuple):
+    x: np.ndarray
+    y: np.ndarray
+    sigma_xx: np.ndarray
+    sigma_yy: np.ndarray
+    tau_xy: np.ndarray
+    sigma1: np.ndarray
+    sigma2: np.ndarray
+    tau_max: np.ndarray
+    theta: np.ndarray       #principal angle, x axis to sigma1 direction (degrees)
+    triangles: np.ndarray   #(M,3) node numbers, None if not given
+
+
+#solve every node at once
+def solve_field(x,y,sigma_xx,sigma_yy,tau_xy,triangles=None):
+    x,y,sigma_xx,sigma_yy,tau_xy=(np.asarray(a,dtype=np.float64) for a in (x,y,sigma_xx,sigma_yy,tau_xy))
+    res=mohr_solve(sigma_xx,sigma_yy,tau_xy)
+    if triangles is not None:
+        triangles=np.asarray(triangles,dtype=np.int32)
+        if triangles.ndim!=2 or triangles.shape[1]!=3:
+            raise ValueError(f"triangles must be an (M,3) array, got shape {triangles.shape}")
+        if len(triangles) and (triangles.min()<0 or triangles.max()>=len(x)):
+            raise ValueError("triangles refer to nodes that do not exist")
+    return Field(x,y,sigma_xx,sigma_yy,tau_xy,res.sigma1,res.sigma2,res.tau_max,res.theta,triangles)
+
+
+#triangles of a .npy or headerless CSV file
+def read_triangles(path):
+    if str(path).endswith('.npy'):
+        return np.load(path)
+    return np.loadtxt(path,delimiter=',',dtype=np.int64,ndmin=2)
+
+
+#read a field file, an .npz may hold the triangles too
+def read_field(path,triangles_path=None):
+    path=str(path)
+    columns=FIELD_COLUMNS
+    if path.endswith('.npy'):
+        data=np.load(path,mmap_mode='r')
+        if not data.dtype.names:
+            if data.ndim!=2 or data.shape[1]!=len(FIELD_COLUMNS):
+                raise ValueError(f"{path}: expected a structured array or an (N,5) array, got shape {data.shape}")
+            columns=[str(i) for i in range(len(FIELD_COLUMNS))]
+    values=np.concatenate(list(read_channel_chunks(path,columns)) or [np.empty((0,len(columns)))])
+    if not len(values):
+        raise ValueError(f"{path}: no nodes found")
+
+    triangles=None
+    if triangles_path is not None:
+        triangles=read_triangles(triangles_path)
+    elif path.endswith('.npz'):
+        with zipfile.ZipFile(path) as archive:
+            if 'triangles.npy' in archive.namelist():
+                with np.load(path) as data:
+                    triangles=data['triangles']
+    return solve_field(*values.T,triangles)
+
+
+#triangulation of a field, Delaunay with long edges dropped when no triangles are given
+def triangulate(field):
+    if field.triangles is not None:
+        return mtri.Triangulation(field.x,field.y,field.triangles)
+    tri=mtri.Triangulation(field.x,field.y)
+    corners=np.stack([field.x[tri.triangles],field.y[tri.triangles]],axis=-1)
+    edges=np.linalg.norm(corners-np.roll(corners,1,axis=1),axis=-1).max(axis=1)
+    tri.set_mask(edges>MAX_EDGE_RATIO*np.median(edges))
+    return tri
+
+
+#Node averages of values on an (ny,nx) raster over extent (x0,x1,y0,y1), a
+# masked array. Empty pixels take the average of the coarser raster levels
+# (2x, 4x, ... pixels) where at least half of the coarse pixel is covered by
+# nodes, so sparse sampling is filled but holes and outlines stay sharp.
+def raster_average(x,y,values,extent,shape,fill_levels=RASTER_FILL_LEVELS):
+    x0,x1,y0,y1=extent
+    ny,nx=shape
+    ix=np.clip(((x-x0)/(x1-x0)*nx).astype(np.intp),0,nx-1)
+    iy=np.clip(((y-y0)/(y1-y0)*ny).astype(np.intp),0,ny-1)
+    sums=np.bincount(iy*nx+ix,values,minlength=nx*ny).reshape(shape)
+    counts=np.bincount(iy*nx+ix,minlength=nx*ny).reshape(shape).astype(np.float64)
+
+    raster=np.full(shape,np.nan)
+    filled=counts>0
+    raster[filled]=sums[filled]/counts[filled]
+    level_sums,level_counts,covered=sums,counts,filled.astype(np.float64)
+    for level in range(1,fill_levels+1):
+        if filled.all():
+            break
+        #sum 2x2 blocks of the previous level, padded to even size
+        level_sums=_coarsen(level_sums)
+        level_counts=_coarsen(level_counts)
+        covered=_coarsen(covered)
+        factor=2**level
+        up=lambda a: np.repeat(np.repeat(a,factor,axis=0),factor,axis=1)[:ny,:nx]
+        up_counts=up(level_counts)
+        fill=~filled&(up_counts>0)&(up(covered)>=factor*factor/2)
+        raster[fill]=up(level_sums)[fill]/up_counts[fill]
+        filled|=fill
+    return np.ma.masked_invalid(raster)
+
+
+def _coarsen(a):
+    ny,nx=a.shape
+    a=np.pad(a,((0,ny%2),(0,nx%2)))
+    return a.reshape(a.shape[0]//2,2,a.shape[1]//2,2).sum(axis=(1,3))
+
+
+#nodes closest to the centers of a (rows,cols) grid of cells over extent, at
+# most one per cell, for evenly spread glyphs
+def spread_nodes(x,y,extent,shape):
+    x0,x1,y0,y1=extent
+    rows,cols=shape
+    fx=(x-x0)/(x1-x0)*cols
+    fy=(y-y0)/(y1-y0)*rows
+    ix=np.clip(fx.astype(np.intp),0,cols-1)
+    iy=np.clip(fy.astype(np.intp),0,rows-1)
+    dist=(fx-ix-0.5)**2+(fy-iy-0.5)**2
+    order=np.lexsort((dist,iy*cols+ix))
+    cells=(iy*cols+ix)[order]
+    first=np.flatnonzero(np.r_[True,cells[1:]!=cells[:-1]])
+    return order[first]
+
+########################## END FIELD #####################
+
+########################## BEGIN MATPLOTLIB #####################
+
+class FieldFigure:
+
+    def __init__(self,field,quantity='sigma1',fig=None,glyphs=GLYPH_GRID,tri_nodes=TRI_NODES):
+        if fig is None:
+            fig=Figure(figsize=(8,6))
+        self.fig=fig
+        self.field=field
+        self.index=GridIndex(field.x,field.y)
+        self.node=None
+        self.background=None
+        ax=self.ax=fig.add_subplot()
+        ax.set_aspect(1)
+        ax.set_xlabel('x')
+        ax.set_ylabel('y')
+
+        #extent with a small margin
+        x0,x1=float(field.x.min()),float(field.x.max())
+        y0,y1=float(field.y.min()),float(field.y.max())
+        margin=0.02*max(x1-x0,y1-y0,1e-9)
+        self.extent=(x0-margin,x1+margin,y0-margin,y1+margin)
+        ax.set_xlim(*self.extent[:2])
+        ax.set_ylim(*self.extent[2:])
+
+        #triangulation for small meshes, raster grid for large ones
+        self.triangulation=triangulate(field) if len(field.x)<=tri_nodes else None
+        width,height=self.extent[1]-self.extent[0],self.extent[3]-self.extent[2]
+        scale=min(RASTER_SIZE/max(width,height),np.sqrt(len(field.x)/NODES_PER_PIXEL/max(width*height,1e-300)))
+        self.raster_shape=(max(2,int(round(height*scale))),max(2,int(round(width*scale))))
+        self.contours=None
+        self.cax=None
+
+        #principal direction glyphs, sigma1 black and sigma2 white, one per glyph cell
+        cols=max(1,int(round(GLYPH_GRID*width/max(width,height))))
+        rows=max(1,int(round(GLYPH_GRID*height/max(width,height))))
+        nodes=spread_nodes(field.x,field.y,self.extent,(rows,cols)) if glyphs else np.empty(0,dtype=np.intp)
+        length=0.7*max(width,height)/GLYPH_GRID
+        angle=np.radians(field.theta[nodes])
+        self.glyphs=[ax.quiver(field.x[nodes],field.y[nodes],dx*length,dy*length,color=color,
+        angles='xy',scale_units='xy',scale=1,pivot='middle',headwidth=0,headlength=0,
+        headaxislength=0,width=0.002,zorder=5)
+        for color,dx,dy in (('k',np.cos(angle),np.sin(angle)),('w',-np.sin(angle),np.cos(angle)))]
+
+        #picked node, blitted over the cached map
+        self.marker,=ax.plot([],[],'o',markerfacecolor='none',markeredgecolor='red',markersize=12,
+        markeredgewidth=2,zorder=10,animated=True)
+        fig.canvas.mpl_connect('draw_event',self._on_draw)
+        self.set_quantity(quantity)
+
+    #contour another quantity
+    def set_quantity(self,quantity):
+        if quantity not in QUANTITIES:
+            raise ValueError(f"unknown quantity {quantity!r}, expected one of {', '.join(QUANTITIES)}")
+        self.quantity=quantity
+        values=getattr(self.field,quantity)
+        if self.contours is not None:
+            self.contours.remove()
+        levels=np.linspace(float(values.min()),float(values.max()),CONTOUR_LEVELS+1)
+        if levels[0]==levels[-1]:
+            levels=levels[0]+np.linspace(-1,1,CONTOUR_LEVELS+1)
+        if self.triangulation is not None:
+            self.contours=self.ax.tricontourf(self.triangulation,values,levels=levels,cmap='jet',zorder=1)
+        else:
+            raster=raster_average(self.field.x,self.field.y,values,self.extent,self.raster_shape)
+            ny,nx=self.raster_shape
+            x0,x1,y0,y1=self.extent
+            self.contours=self.ax.contourf(x0+(np.arange(nx)+0.5)*(x1-x0)/nx,
+            y0+(np.arange(ny)+0.5)*(y1-y0)/ny,raster,levels=levels,cmap='jet',zorder=1)
+        self.contours.set_rasterized(True)
+        if self.cax is None:
+            self.cax=self.fig.colorbar(self.contours,ax=self.ax,fraction=0.04).ax
+        else:
+            self.cax.clear()
+            self.fig.colorbar(self.contours,cax=self.cax)
+        self.cax.set_ylabel(QUANTITIES[quantity])
+        self.ax.set_title(f"{QUANTITIES[quantity].split(' ')[0]} at {len(self.field.x):,} nodes")
+        self.background=None
+        self.fig.stale=True
+
+    #nearest node to a point
+    def pick(self,x,y):
+        return self.index.nearest(x,y)
+
+    #mark a node, only the marker is redrawn once the map is cached
+    def show_node(self,node):
+        self.node=node
+        self.marker.set_data([self.field.x[node]],[self.field.y[node]])
+        canvas=self.fig.canvas
+        if self.background is None:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        self.ax.draw_artist(self.marker)
+        canvas.blit(self.ax.bbox)
+
+    def _on_draw(self,event):
+        canvas=self.fig.canvas
+        if canvas.is_saving():
+            return
+        self.background=canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.marker)
+
+    #stress state of a node, the MohrFigure.update arguments
+    def stress(self,node):
+        f=self.field
+        return float(f.sigma_xx[node]),float(f.sigma_yy[node]),float(f.tau_xy[node])
+
+
+#Connects a FieldFigure to a MohrFigure: moving over the map (with hover) or
+# clicking it picks the nearest node and shows its circle. The Mohr figure is
+# only updated when the picked node changes.
+class FieldExplorer:
+
+    def __init__(self,field_fig,mohr_fig=None,hover=True,on_pick=None):
+        self.field_fig=field_fig
+        self.mohr_fig=mohr_fig or MohrFigure()
+        self.hover=hover
+        self.on_pick=on_pick    #on_pick(node), after the figures are updated
+        canvas=field_fig.fig.canvas
+        self.cids=[canvas.mpl_connect('motion_notify_event',self._on_motion),
+        canvas.mpl_connect('button_press_event',self._on_press)]
+
+    #show a node on both figures
+    def select(self,node):
+        if node<0 or node==self.field_fig.node:
+            return
+        self.field_fig.show_node(node)
+        self.mohr_fig.update(*self.field_fig.stress(node))
+        self.mohr_fig.fig.canvas.draw_idle()
+        if self.on_pick is not None:
+            self.on_pick(node)
+
+    def disconnect(self):
+        for cid in self.cids:
+            self.field_fig.fig.canvas.mpl_disconnect(cid)
+
+    def _on_motion(self,event):
+        if self.hover and event.inaxes is self.field_fig.ax:
+            self.select(self.field_fig.pick(event.xdata,event.ydata))
+
+    def _on_press(self,event):
+        if event.inaxes is self.field_fig.ax:
+            self.select(self.field_fig.pick(event.xdata,event.ydata))
+
+########################## END MATPLOTLIB #####################
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py field',
+    description="Contour the principal stresses of a 2D FE result and show the Mohr's circle of a node.")
+    parser.add_argument('input',help='CSV, .npy or .npz file of x, y, sigma_xx, sigma_yy, tau_xy per node')
+    parser.add_argument('output',help='image file for the contour map, the format follows the extension')
+    parser.add_argument('--quantity',choices=QUANTITIES,default='sigma1',help='contoured quantity (default %(default)s)')
+    parser.add_argument('--triangles',help='.npy or CSV file of (M,3) 0-based node numbers')
+    parser.add_argument('--no-glyphs',action='store_true',help='leave out the principal direction glyphs')
+    pick=parser.add_mutually_exclusive_group()
+    pick.add_argument('--node',type=int,help='mark this node')
+    pick.add_argument('--at',metavar='X,Y',help='mark the node nearest to this point')
+    parser.add_argument('--mohr',help="image file for the Mohr's circle of the marked node")
+    parser.add_argument('--dpi',type=int,default=100,help='raster resolution (default %(default)s)')
+    args=parser.parse_args(argv)
+
+    start=time.perf_counter()
+    field=read_field(args.input,args.triangles)
+    loaded=time.perf_counter()
+    field_fig=FieldFigure(field,args.quantity,glyphs=0 if args.no_glyphs else GLYPH_GRID)
+    built=time.perf_counter()
+
+    node=args.node
+    if args.at is not None:
+        try:
+            x,y=(float(v) for v in args.at.split(','))
+        except ValueError:
+            parser.error(f"--at needs X,Y, got {args.at!r}")
+        node=field_fig.pick(x,y)
+    if node is not None:
+        if not 0<=node<len(field.x):
+            parser.error(f"no node {node}, the field has {len(field.x):,} nodes")
+        field_fig.marker.set_animated(False)
+        field_fig.marker.set_data([field.x[node]],[field.y[node]])
+        sigma_xx,sigma_yy,tau_xy=field_fig.stress(node)
+        print(f"node {node} at ({field.x[node]:.6g}, {field.y[node]:.6g}): sigma_xx = {sigma_xx:.6g}, "
+        f"sigma_yy = {sigma_yy:.6g}, tau_xy = {tau_xy:.6g}, sigma1 = {field.sigma1[node]:.6g}, "
+        f"sigma2 = {field.sigma2[node]:.6g}, tau_max = {field.tau_max[node]:.6g} MPa")
+        if args.mohr is not None:
+            MohrFigure().update(sigma_xx,sigma_yy,tau_xy).savefig(args.mohr,dpi=args.dpi)
+    elif args.mohr is not None:
+        parser.error('--mohr needs --node or --at')
+
+    field_fig.fig.savefig(args.output,dpi=args.dpi)
+    print(f"{len(field.x):,} nodes read in {loaded-start:.2f} s, contoured in {built-loaded:.2f} s, "
+    f"{args.output} written in {time.perf_counter()-start:.2f} s",file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
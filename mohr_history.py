@@ -0,0 +1,242 @@
+import argparse
+import os
+import sys
+import time
+from typing import NamedTuple
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from mohr_batch import read_chunks
+from mohr_core import mohr_solve
+from mohr_plot import BOX,MohrFigure
+
+#Load history playback. A sequence of plane stress states (one per time step)
+# is solved in one vectorized pass and played back on a MohrFigure with
+# blitting: the axes are fixed to fit every step, the static parts of the
+# figure are drawn once into a background and only the circle, its points
+# and lines, the rotated principal element and a step label are redrawn per
+# frame. Long histories are decimated to a frame budget, keeping the largest
+# circle of every skipped run of steps so peaks are never dropped.
+#
+#   python mohrs_circle_gui.py history loads.csv --gif history.gif --max-frames 600
+#   python mohrs_circle_gui.py history loads.npy --png-dir frames/
+#
+#Inputs are read like the batch mode inputs (see mohr_batch), the id column
+# labels the steps, e.g. with the time of each step.
+
+#frame budget for playback and export
+MAX_FRAMES=1000
+
+#solved history, every field is an array with one entry per step
+class History(NamedTuple):
+    sigma_xx: np.ndarray
+    sigma_yy: np.ndarray
+    tau_xy: np.ndarray
+    center: np.ndarray
+    radius: np.ndarray
+    sigma1: np.ndarray
+    sigma2: np.ndarray
+    theta: np.ndarray
+    labels: np.ndarray  #step labels, None for step numbers
+
+
+#solve every step at once
+def solve_history(sigma_xx,sigma_yy,tau_xy,labels=None):
+    res=mohr_solve(sigma_xx,sigma_yy,tau_xy,dtype=np.float64)
+    sigma_xx,sigma_yy,tau_xy=np.broadcast_arrays(*(np.asarray(s,dtype=np.float64)
+    for s in (sigma_xx,sigma_yy,tau_xy)))
+    return History(sigma_xx,sigma_yy,tau_xy,res.center,res.radius,res.sigma1,res.sigma2,
+    res.theta,None if labels is None else np.asarray(labels))
+
+
+#read a history file, plane states only
+def read_history(path,id_column='id'):
+    chunks=list(read_chunks(path,id_column=id_column))
+    if not chunks:
+        raise ValueError(f"{path}: no stress states found")
+    if len(chunks[0])>4:
+        raise ValueError(f"{path}: history playback supports plane states only")
+    ids=None if chunks[0][0] is None else np.concatenate([chunk[0] for chunk in chunks])
+    return solve_history(*(np.concatenate([chunk[i] for chunk in chunks]) for i in (1,2,3)),ids)
+
+
+#indices of at most max_frames steps, the step with the largest circle of every
+# run of skipped steps. The first and last steps are always kept, so the
+# budget must be at least 3 frames.
+def decimate(radius,max_frames=MAX_FRAMES):
+    if max_frames<3:
+        raise ValueError(f"frame budget {max_frames} must be at least 3")
+    steps=len(radius)
+    if steps<=max_frames:
+        return np.arange(steps)
+    size=-(-steps//(max_frames-2))  #steps per kept frame
+    inner=np.asarray(radius[1:-1])
+    bins=-(-len(inner)//size)
+    padded=np.full(bins*size,-np.inf)
+    padded[:len(inner)]=inner
+    peaks=np.argmax(padded.reshape(bins,size),axis=1)+np.arange(bins)*size+1
+    return np.concatenate([[0],peaks,[steps-1]])
+
+
+class HistoryPlayer:
+
+    def __init__(self,history,mohr_fig=None):
+        self.history=history
+        self.mohr_fig=mohr_fig or MohrFigure()
+        self.background=None
+        m=self.mohr_fig
+        fig,ax1,ax2=m.fig,m.ax1,m.ax2
+
+        #show the first step, then keep only the parts that do not change
+        m.update(float(history.sigma_xx[0]),float(history.sigma_yy[0]),float(history.tau_xy[0]))
+        self.moving=[m.circle,m.AB_points,m.AB_line,m.center_point,m.S_points,m.S_line,
+        m.T_points,m.stress_element2,*m.principal_element]
+        for artist in m.dynamic_artists:
+            artist.set_visible(artist in self.moving)
+
+        #step label and the values of the shown step
+        self.text=ax2.text(0.05,0.55,'',bbox=BOX,zorder=12,size='small')
+        ax1_text=ax1.text(0.03,0.97,'',transform=ax1.transAxes,bbox=BOX,zorder=12,
+        fontsize='small',verticalalignment='top')
+        self.texts=[self.text,ax1_text]
+        self.moving+=self.texts
+        self.moving.sort(key=lambda artist: artist.get_zorder())
+        for artist in self.moving:
+            artist.set_animated(True)
+
+        #axes fit every step, so the background never has to be redrawn
+        low=float(np.min(history.sigma2))
+        high=float(np.max(history.sigma1))
+        tau=float(np.max(history.radius))
+        span=max(high-low,2*tau,1e-9)
+        ax1.set_xlim(low-0.15*span,high+0.15*span)
+        ax1.set_ylim(-tau-0.15*span,tau+0.15*span)
+        ax1.set_autoscale_on(False)
+
+        #recache the background after every full draw
+        self.cid=fig.canvas.mpl_connect('draw_event',self._on_draw)
+        self.index=0
+
+    def __len__(self):
+        return len(self.history.radius)
+
+    #move the moving artists to a step
+    def set_step(self,i):
+        h=self.history
+        self.index=i
+        m=self.mohr_fig
+        sxx,syy,txy=float(h.sigma_xx[i]),float(h.sigma_yy[i]),float(h.tau_xy[i])
+        center,radius=float(h.center[i]),float(h.radius[i])
+        s1,s2=float(h.sigma1[i]),float(h.sigma2[i])
+        m.circle.set_center((center,0))
+        m.circle.set_radius(radius)
+        m.AB_points.set_data([sxx,syy],[-txy,txy])
+        m.AB_line.set_data([sxx,syy],[-txy,txy])
+        m.center_point.set_data([center],[0])
+        m.S_points.set_data([s1,s2],[0,0])
+        m.S_line.set_data([s2,s1],[0,0])
+        m.T_points.set_data([center,center],[radius,-radius])
+        m.rotation.clear().rotate_deg(float(h.theta[i]))
+
+        label=f'step {i}' if h.labels is None else str(h.labels[i])
+        self.text.set_text(label+'\n\u03C3'+'1 = '+str(round(s1,2))+' MPa\n\u03C3'+'2 = '
+        +str(round(s2,2))+' MPa\n\u03C4'+'max = '+str(round(radius,2))+' MPa\n'
+        +r'$\theta$'+' = '+str(round(float(h.theta[i]),2))+u'\N{DEGREE SIGN}')
+        self.texts[1].set_text('\u03C3'+'xx = '+str(round(sxx,2))+' MPa\n\u03C3'+'yy = '
+        +str(round(syy,2))+' MPa\n\u03C4'+'xy = '+str(round(txy,2))+' MPa')
+
+    #show a step, redrawing only the moving artists
+    def show(self,i):
+        self.set_step(i)
+        canvas=self.mohr_fig.fig.canvas
+        if self.background is None:
+            canvas.draw()
+            return
+        canvas.restore_region(self.background)
+        self._draw_moving()
+        canvas.blit(self.mohr_fig.fig.bbox)
+
+    #stop listening to the canvas
+    def disconnect(self):
+        self.mohr_fig.fig.canvas.mpl_disconnect(self.cid)
+
+    def _draw_moving(self):
+        for artist in self.moving:
+            artist.axes.draw_artist(artist)
+
+    def _on_draw(self,event):
+        canvas=self.mohr_fig.fig.canvas
+        if canvas.is_saving():
+            return
+        self.background=canvas.copy_from_bbox(self.mohr_fig.fig.bbox)
+        self.set_step(self.index)
+        self._draw_moving()
+
+
+#render steps headless to PNG files and/or a GIF, returns the number of frames
+def export(history,indices,png_dir=None,gif_path=None,fps=30,dpi=80,progress=None):
+    from PIL import Image
+
+    player=HistoryPlayer(history)
+    fig=player.mohr_fig.fig
+    fig.set_dpi(dpi)
+    canvas=FigureCanvasAgg(fig)
+    canvas.draw()
+    if png_dir is not None:
+        os.makedirs(png_dir,exist_ok=True)
+
+    frames=[]
+    start=time.perf_counter()
+    for done,i in enumerate(indices,1):
+        player.show(int(i))
+        image=Image.fromarray(np.asarray(canvas.buffer_rgba())).convert('RGB')
+        if png_dir is not None:
+            image.save(os.path.join(png_dir,f'frame_{done-1:06d}.png'),compress_level=1)
+        if gif_path is not None:
+            frames.append(image.quantize(colors=64,method=Image.Quantize.FASTOCTREE))
+        if progress is not None:
+            progress(done,len(indices),time.perf_counter()-start)
+
+    if gif_path is not None and frames:
+        frames[0].save(gif_path,save_all=True,append_images=frames[1:],
+        duration=max(int(1000/fps),20),loop=0,optimize=False)
+    return len(indices)
+
+
+#frames/second progress report on stderr
+def print_progress(done,total,elapsed):
+    rate=done/elapsed if elapsed>0 else float('inf')
+    print(f"\r{done}/{total} frames, {rate:,.1f} frames/s",end='',file=sys.stderr,flush=True)
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py history',
+    description="Animate a load history of plane stress states to a GIF or PNG frames.")
+    parser.add_argument('input',help='CSV, .npy or .npz file of sigma_xx, sigma_yy, tau_xy (MPa), one state per step')
+    parser.add_argument('--gif',help='animated GIF to write')
+    parser.add_argument('--png-dir',help='directory for one PNG per frame')
+    parser.add_argument('--max-frames',type=int,default=MAX_FRAMES,help='frame budget, longer histories '
+    'are decimated keeping peaks (default %(default)s)')
+    parser.add_argument('--fps',type=float,default=30,help='GIF frame rate (default %(default)s)')
+    parser.add_argument('--dpi',type=int,default=80,help='frame resolution (default %(default)s)')
+    parser.add_argument('--id-column',default='id',help='name of the optional step label column (default %(default)s)')
+    parser.add_argument('--quiet',action='store_true',help='no progress report')
+    args=parser.parse_args(argv)
+    if args.gif is None and args.png_dir is None:
+        parser.error('nothing to write, give --gif and/or --png-dir')
+    if args.max_frames<3:
+        parser.error('--max-frames must be at least 3')
+
+    start=time.perf_counter()
+    history=read_history(args.input,args.id_column)
+    indices=decimate(history.radius,args.max_frames)
+    count=export(history,indices,args.png_dir,args.gif,args.fps,args.dpi,
+    None if args.quiet else print_progress)
+    if not args.quiet:
+        print(f"\n{count} frames of {len(history.radius):,} steps written in "
+        f"{time.perf_counter()-start:.2f} s",file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
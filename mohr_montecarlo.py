@@ -0,0 +1,392 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.patches import Annulus,Circle,Rectangle
+from mohr_batch import CHUNK_SIZE,STRESS_FIELDS
+from mohr_core import mohr_solve
+
+#Monte Carlo propagation of input stress uncertainty. sigma_xx, sigma_yy and
+# tau_xy are drawn from normal, uniform or lognormal distributions (the normal
+# and lognormal ones optionally correlated) and solved in chunks with the
+# vectorized solver, spread over a process pool. Every chunk draws from its own
+# stream spawned from one SeedSequence, so a seed gives the same result for any
+# worker count. Workers return fixed-bin histograms of the results instead of
+# the samples, so memory does not grow with the sample count; percentiles are
+# read from the histograms, whose range is set by a small pilot sample.
+#
+#   python mohrs_circle_gui.py montecarlo --sigma-xx 80 5 --sigma-yy -40 8 --tau-xy 30 3 \
+#       --dist tau_xy=uniform --corr sigma_xx,sigma_yy=0.5 --samples 10000000 --output mc.png
+
+DISTRIBUTIONS=('normal','uniform','lognormal')
+
+#result quantities with a histogram, center and radius draw the circle band
+QUANTITIES=('sigma1','sigma2','tau_max','theta','center','radius')
+
+#fine histogram bins per quantity, the displayed histograms merge them into at
+# least HIST_SHOWN bars over the shown range
+HIST_BINS=4096
+HIST_SHOWN=60
+
+#samples drawn to set the histogram ranges, and the margin added to their range
+PILOT_SAMPLES=2**16
+PILOT_MARGIN=0.25
+
+#default percentile band and the percentiles reported
+BAND=(5,95)
+PERCENTILES=(1,5,50,95,99)
+
+########################## BEGIN SAMPLING #####################
+
+#uncertain input, spread is the standard deviation (normal, lognormal) or the
+# half width (uniform)
+class Input(NamedTuple):
+    mean: float
+    spread: float
+    distribution: str='normal'
+
+
+#check the inputs and the correlation matrix (None for independent inputs),
+# returns the Cholesky factor of the correlation matrix or None
+def correlation_factor(inputs,correlation=None):
+    for name,spec in zip(STRESS_FIELDS,inputs):
+        if spec.distribution not in DISTRIBUTIONS:
+            raise ValueError(f"{name}: distribution must be one of {', '.join(DISTRIBUTIONS)}")
+        if not spec.spread>=0:
+            raise ValueError(f"{name}: spread must not be negative")
+        if spec.distribution=='lognormal' and not spec.mean>0:
+            raise ValueError(f"{name}: a lognormal input needs a positive mean")
+    if correlation is None:
+        return None
+
+    correlation=np.asarray(correlation,dtype=np.float64)
+    if correlation.shape!=(3,3) or not np.allclose(correlation,correlation.T) or not np.allclose(np.diag(correlation),1):
+        raise ValueError("correlation must be a symmetric 3x3 matrix with a unit diagonal")
+    for i,spec in enumerate(inputs):
+        if spec.distribution=='uniform' and np.any(np.delete(correlation[i],i)):
+            raise ValueError(f"{STRESS_FIELDS[i]}: uniform inputs can not be correlated")
+    try:
+        return np.linalg.cholesky(correlation)
+    except np.linalg.LinAlgError:
+        raise ValueError("correlation matrix is not positive definite") from None
+
+
+#n samples of the inputs, correlated through the standard normal scores of the
+# normal and lognormal inputs
+def draw_samples(rng,n,inputs,factor=None):
+    scores=rng.standard_normal((3,n))
+    if factor is not None:
+        scores=factor@scores
+    samples=[]
+    for spec,z in zip(inputs,scores):
+        if spec.distribution=='uniform':
+            samples.append(spec.mean+spec.spread*rng.uniform(-1,1,n))
+        elif spec.distribution=='lognormal':
+            s2=np.log1p((spec.spread/spec.mean)**2)
+            samples.append(np.exp(np.log(spec.mean)-s2/2+np.sqrt(s2)*z))
+        else:
+            samples.append(spec.mean+spec.spread*z)
+    return samples
+
+
+#result quantities of input samples, in QUANTITIES order
+def solve_samples(sigma_xx,sigma_yy,tau_xy):
+    res=mohr_solve(sigma_xx,sigma_yy,tau_xy,dtype=np.float64)
+    return res.sigma1,res.sigma2,res.tau_max,res.theta,res.center,res.radius
+
+
+#histogram counts, minimum, maximum and shifted sums of one chunk of samples.
+# Values outside ranges count in the edge bins.
+def sample_chunk(seed,n,inputs,factor,ranges,bins=HIST_BINS):
+    rng=np.random.default_rng(seed)
+    counts=np.zeros((len(QUANTITIES),bins),dtype=np.int64)
+    stats=np.zeros((4,len(QUANTITIES)))
+    for i,values in enumerate(solve_samples(*draw_samples(rng,n,inputs,factor))):
+        lo,hi=ranges[i]
+        index=((values-lo)*(bins/(hi-lo))).astype(np.intp)
+        np.clip(index,0,bins-1,out=index)
+        counts[i]=np.bincount(index,minlength=bins)
+        shifted=values-0.5*(lo+hi)  #keeps the sum of squares accurate
+        stats[:,i]=values.min(),values.max(),shifted.sum(),np.dot(shifted,shifted)
+    return counts,stats
+
+########################## END SAMPLING #####################
+
+#distributions of the result quantities, arrays are in QUANTITIES order
+class MonteCarloResult(NamedTuple):
+    inputs: tuple
+    samples: int
+    seed: int
+    edges: np.ndarray   #(quantities,bins+1) histogram bin edges
+    counts: np.ndarray  #(quantities,bins) sample counts
+    mean: np.ndarray
+    std: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+    elapsed: float
+
+    #q-th percentiles of a quantity, interpolated in the histogram
+    def percentile(self,name,q):
+        i=QUANTITIES.index(name)
+        cdf=np.concatenate([[0],np.cumsum(self.counts[i])])/self.samples
+        value=np.interp(np.asarray(q,dtype=np.float64)/100,cdf,self.edges[i])
+        return np.clip(value,self.minimum[i],self.maximum[i])
+
+    #quantity -> mean, std, min, max and the percentiles
+    def summary(self,percentiles=PERCENTILES):
+        summary={}
+        for i,name in enumerate(QUANTITIES):
+            row=dict(mean=float(self.mean[i]),std=float(self.std[i]),
+            min=float(self.minimum[i]),max=float(self.maximum[i]))
+            for q,value in zip(percentiles,self.percentile(name,percentiles)):
+                row[f'p{q:g}']=float(value)
+            summary[name]=row
+        return summary
+
+
+#Propagate the input distributions through the solver with samples draws in
+# chunks of chunk_size, on workers processes (None for every core). mp_context
+# is passed to the pool, the GUI uses spawn. progress(done,total,elapsed) is
+# called after every chunk.
+def monte_carlo(inputs,correlation=None,samples=1_000_000,seed=0,workers=None,
+chunk_size=CHUNK_SIZE,bins=HIST_BINS,mp_context=None,progress=None):
+    inputs=tuple(Input(*spec) for spec in inputs)
+    factor=correlation_factor(inputs,correlation)
+    if samples<1:
+        raise ValueError("samples must be positive")
+    start=time.perf_counter()
+    sizes=[min(chunk_size,samples-i) for i in range(0,samples,chunk_size)]
+    pilot,*seeds=np.random.SeedSequence(seed).spawn(len(sizes)+1)
+
+    #histogram ranges around a pilot sample, the principal angle is within +-90 degrees
+    ranges=[]
+    for name,values in zip(QUANTITIES,solve_samples(*draw_samples(np.random.default_rng(pilot),
+    PILOT_SAMPLES,inputs,factor))):
+        lo,hi=float(values.min()),float(values.max())
+        margin=max(PILOT_MARGIN*(hi-lo),1e-9*(1+abs(lo)+abs(hi)))
+        lo,hi=lo-margin,hi+margin
+        if name=='theta':
+            lo,hi=max(lo,-90.0),min(hi,90.0)
+        ranges.append((lo,hi))
+
+    counts=np.zeros((len(QUANTITIES),bins),dtype=np.int64)
+    minimum=np.full(len(QUANTITIES),np.inf)
+    maximum=np.full(len(QUANTITIES),-np.inf)
+    sums=np.zeros((2,len(QUANTITIES)))
+    workers=min(workers or os.cpu_count() or 1,len(sizes))
+    args=(seeds,sizes,[inputs]*len(sizes),[factor]*len(sizes),[ranges]*len(sizes),[bins]*len(sizes))
+    pool=ProcessPoolExecutor(workers,mp_context=mp_context) if workers>1 else None
+    try:
+        #chunks are merged in order, so the float sums do not depend on the workers
+        chunks=pool.map(sample_chunk,*args) if pool is not None else map(sample_chunk,*args)
+        for done,(chunk_counts,stats) in enumerate(chunks,1):
+            counts+=chunk_counts
+            np.minimum(minimum,stats[0],out=minimum)
+            np.maximum(maximum,stats[1],out=maximum)
+            sums+=stats[2:]
+            if progress is not None:
+                progress(sum(sizes[:done]),samples,time.perf_counter()-start)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    shift=np.array([0.5*(lo+hi) for lo,hi in ranges])
+    mean=sums[0]/samples
+    std=np.sqrt(np.maximum(sums[1]/samples-mean*mean,0))
+    edges=np.array([np.linspace(lo,hi,bins+1) for lo,hi in ranges])
+    return MonteCarloResult(inputs,samples,seed,edges,counts,mean+shift,std,minimum,maximum,
+    time.perf_counter()-start)
+
+########################## BEGIN MATPLOTLIB #####################
+
+#histogram panel titles
+LABELS={'sigma1':'\u03C31 (MPa)','sigma2':'\u03C32 (MPa)','tau_max':'\u03C4max (MPa)','theta':'\u03B8p (deg)'}
+
+#Mohr's circle percentile bands and histograms of a MonteCarloResult. The
+# circle panel shows the nominal circle of the mean inputs, the median circle,
+# the band of circle radii and the sigma1, sigma2 and tau_max bands.
+class MonteCarloFigure:
+
+    def __init__(self,fig=None,band=BAND):
+        if fig is None:
+            fig=Figure(figsize=(12,6))
+        self.fig=fig
+        self.band=band
+        grid=fig.add_gridspec(2,3,width_ratios=(2,1,1))
+        ax=self.ax=fig.add_subplot(grid[:,0])
+        ax.grid(True)
+        ax.axhline(color='k',zorder=1)
+        ax.axvline(color='k',zorder=1)
+        ax.set_aspect(1)
+        ax.set_xlabel('Sigma (MPa)')
+        ax.set_ylabel('Tau (MPa)')
+        self.title=fig.suptitle('',y=0.97)
+
+        #percentile bands, sigma bands span the axes height
+        self.radius_band=Annulus((0,0),1,0.5,color='tab:blue',alpha=0.3,zorder=3,label='radius band')
+        self.sigma_bands=[Rectangle((0,0),0,1,transform=ax.get_xaxis_transform(),color=color,
+        alpha=0.2,zorder=2,label=label) for color,label in (('tab:red','\u03C31 band'),('tab:green','\u03C32 band'))]
+        self.tau_bands=[Rectangle((0,0),1,0,transform=ax.get_yaxis_transform(),color='tab:orange',
+        alpha=0.2,zorder=2,label='\u03C4max band' if i==0 else None) for i in range(2)]
+        self.median=Circle((0,0),1,fill=False,edgecolor='tab:blue',linewidth=2,zorder=5,label='median circle')
+        self.nominal=Circle((0,0),1,fill=False,edgecolor='k',linestyle='--',linewidth=1.5,zorder=6,
+        label='mean inputs')
+        for patch in (self.radius_band,*self.sigma_bands,*self.tau_bands,self.median,self.nominal):
+            ax.add_patch(patch)
+        ax.legend(loc='upper right',fontsize='small')
+
+        #histograms with the band and median lines
+        self.hist_axes={}
+        self.stairs={}
+        self.lines={}
+        for i,name in enumerate(LABELS):
+            hax=self.hist_axes[name]=fig.add_subplot(grid[i//2,1+i%2])
+            hax.set_xlabel(LABELS[name])
+            hax.set_yticks([])
+            self.stairs[name]=hax.stairs([0],[0,1],fill=True,color='tab:blue',alpha=0.6)
+            self.lines[name]=[hax.axvline(0,color='k',linestyle=style,linewidth=1)
+            for style in ('--','-','--')]
+        self.text=ax.text(0.02,0.02,'',transform=ax.transAxes,size='small',zorder=10,
+        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'))
+        fig.subplots_adjust(left=0.06,right=0.98,wspace=0.25,hspace=0.35)
+
+    def update(self,result):
+        lo_q,hi_q=self.band
+        qs=(lo_q,50,hi_q)
+        p={name:result.percentile(name,qs) for name in QUANTITIES}
+        nominal=mohr_solve(*(spec.mean for spec in result.inputs),dtype=np.float64)
+
+        center,(r_lo,r_med,r_hi)=float(p['center'][1]),p['radius']
+        self.radius_band.set_center((center,0))
+        self.radius_band.set_radii(max(r_hi,1e-12))
+        self.radius_band.set_width(max(r_hi-r_lo,1e-12))
+        self.median.set_center((center,0))
+        self.median.set_radius(r_med)
+        self.nominal.set_center((float(nominal.center),0))
+        self.nominal.set_radius(float(nominal.radius))
+        for rect,name in zip(self.sigma_bands,('sigma1','sigma2')):
+            rect.set_x(p[name][0])
+            rect.set_width(p[name][2]-p[name][0])
+        for rect,y in zip(self.tau_bands,(p['tau_max'][0],-p['tau_max'][2])):
+            rect.set_y(y)
+            rect.set_height(p['tau_max'][2]-p['tau_max'][0])
+
+        low=min(p['sigma2'][0],float(nominal.sigma2))
+        high=max(p['sigma1'][2],float(nominal.sigma1))
+        tau=max(r_hi,float(nominal.radius))
+        span=max(high-low,2*tau,1e-9)
+        self.ax.set_xlim(low-0.1*span,high+0.1*span)
+        self.ax.set_ylim(-tau-0.1*span,tau+0.1*span)
+
+        #merged fine bins as densities, shown over the 0.1 to 99.9 percentile range
+        for name in LABELS:
+            i=QUANTITIES.index(name)
+            lo,hi=result.percentile(name,(0.1,99.9))
+            pad=max(0.05*(hi-lo),1e-9*(1+abs(lo)))
+            shown=(hi-lo+2*pad)/(result.edges[i][1]-result.edges[i][0])
+            group=2**int(np.log2(max(shown/HIST_SHOWN,1)))
+            counts=result.counts[i].reshape(-1,group).sum(axis=1)
+            edges=result.edges[i][::group]
+            self.stairs[name].set_data(counts/(result.samples*np.diff(edges)),edges)
+            for line,value in zip(self.lines[name],p[name]):
+                line.set_xdata([value,value])
+            hax=self.hist_axes[name]
+            hax.set_xlim(lo-pad,hi+pad)
+            hax.relim()
+            hax.autoscale_view(scalex=False)
+
+        self.text.set_text('\n'.join(f"{LABELS[name].split(' ')[0]}: {result.mean[QUANTITIES.index(name)]:.4g}"
+        f" \u00B1 {result.std[QUANTITIES.index(name)]:.3g}, P{lo_q:g}-P{hi_q:g} "
+        f"[{p[name][0]:.4g}, {p[name][2]:.4g}]" for name in LABELS))
+        self.title.set_text(f"Monte Carlo Mohr's Circle, {result.samples:,} samples "
+        f"(seed {result.seed}), bands P{lo_q:g}-P{hi_q:g}")
+        self.fig.stale=True
+        return self.fig
+
+###################### END MATPLOTLIB ########################
+
+#samples/second progress report on stderr
+def print_progress(done,total,elapsed):
+    rate=done/elapsed if elapsed>0 else float('inf')
+    print(f"\r{done:,}/{total:,} samples, {rate:,.0f} samples/s",end='',file=sys.stderr,flush=True)
+
+
+#name=distribution and name,name=r command line values
+def _parse_option(text,option):
+    key,sep,value=text.partition('=')
+    if not sep:
+        raise ValueError(f"{option} {text}: expected NAME=VALUE")
+    names=key.split(',')
+    for name in names:
+        if name not in STRESS_FIELDS:
+            raise ValueError(f"{option} {text}: unknown input {name}, use {', '.join(STRESS_FIELDS)}")
+    return names,value
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py montecarlo',
+    description="Propagate input stress uncertainty through Mohr's circle by Monte Carlo sampling.")
+    for name in STRESS_FIELDS:
+        parser.add_argument('--'+name.replace('_','-'),dest=name,nargs=2,type=float,required=True,
+        metavar=('MEAN','SPREAD'),help=f'{name} mean and standard deviation, half width for uniform (MPa)')
+    parser.add_argument('--dist',action='append',default=[],metavar='NAME=DIST',
+    help=f"distribution of an input: {', '.join(DISTRIBUTIONS)} (default normal)")
+    parser.add_argument('--corr',action='append',default=[],metavar='NAME,NAME=R',
+    help='correlation of two normal or lognormal inputs, e.g. sigma_xx,sigma_yy=0.5')
+    parser.add_argument('--samples',type=int,default=1_000_000,help='number of samples (default %(default)s)')
+    parser.add_argument('--seed',type=int,default=0,help='random seed (default %(default)s)')
+    parser.add_argument('--workers',type=int,help='worker processes (default all cores)')
+    parser.add_argument('--chunk-size',type=int,default=CHUNK_SIZE,help='samples per chunk (default %(default)s)')
+    parser.add_argument('--band',type=float,nargs=2,default=BAND,metavar=('LO','HI'),
+    help='percentile band drawn on the circle (default %(default)s)')
+    parser.add_argument('--output',help='image file of the circle bands and histograms')
+    parser.add_argument('--dpi',type=int,default=100,help='raster resolution (default %(default)s)')
+    parser.add_argument('--json',action='store_true',help='print the statistics as JSON')
+    parser.add_argument('--quiet',action='store_true',help='no progress report')
+    args=parser.parse_args(argv)
+
+    distributions=dict.fromkeys(STRESS_FIELDS,'normal')
+    correlation=None
+    try:
+        for text in args.dist:
+            names,value=_parse_option(text,'--dist')
+            for name in names:
+                distributions[name]=value
+        for text in args.corr:
+            names,value=_parse_option(text,'--corr')
+            if len(names)!=2 or names[0]==names[1]:
+                raise ValueError(f"--corr {text}: name two different inputs")
+            if correlation is None:
+                correlation=np.eye(3)
+            i,j=(STRESS_FIELDS.index(name) for name in names)
+            correlation[i,j]=correlation[j,i]=float(value)
+        inputs=[Input(*getattr(args,name),distributions[name]) for name in STRESS_FIELDS]
+        result=monte_carlo(inputs,correlation,args.samples,args.seed,args.workers,args.chunk_size,
+        progress=None if args.quiet else print_progress)
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.quiet:
+        print(f"\n{result.samples:,} samples in {result.elapsed:.2f} s",file=sys.stderr)
+
+    percentiles=sorted(set(PERCENTILES+tuple(args.band)))
+    summary=result.summary(percentiles)
+    if args.json:
+        print(json.dumps(dict(samples=result.samples,seed=result.seed,statistics=summary)))
+    else:
+        columns=list(summary['sigma1'])
+        print(f"{'':>8}"+''.join(f'{column:>11}' for column in columns))
+        for name,row in summary.items():
+            print(f'{name:>8}'+''.join(f'{row[column]:11.4g}' for column in columns))
+    if args.output:
+        MonteCarloFigure(band=tuple(args.band)).update(result).savefig(args.output,dpi=args.dpi)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import argparse
+import sys
+import time
+import numpy as np
+from matplotlib.collections import EllipseCollection
+from matplotlib.figure import Figure
+from mohr_batch import read_chunks
+from mohr_core import mohr_solve,mohr_solve_3d
+
+#Overlay of many Mohr's circles on one diagram, e.g. every load case of a
+# batch. Up to DENSITY_THRESHOLD circles are drawn as one EllipseCollection;
+# above it the circle outlines are binned into a 2D histogram and shown as a
+# single rasterized image, so a million states draw about as fast as a few.
+# The envelope of all circles (the outline of their union) is drawn on top.
+#
+#   python mohrs_circle_gui.py overlay states.npy overlay.png
+#
+#3D states are shown by their outer (sigma1-sigma3) circle.
+
+#circle count above which the density rendering is used
+DENSITY_THRESHOLD=5000
+
+#points sampled on every circle outline and histogram bins along sigma
+OUTLINE_SAMPLES=48
+DENSITY_BINS=600
+
+#circles per block of the outline binning
+DENSITY_BLOCK=2**16
+
+########################## BEGIN GEOMETRY #####################
+
+#centers and radii of the circles of 3 (plane) or 6 (3D) stress arrays
+def circles(*stresses):
+    if len(stresses)>3:
+        res=mohr_solve_3d(*stresses,dtype=np.float64)
+        return res.centers[...,0],res.radii[...,0]
+    res=mohr_solve(*stresses,dtype=np.float64)
+    return res.center,res.radius
+
+
+#upper convex hull of points sorted by x (monotone chain), returns indices
+def _upper_hull(x,y):
+    hull=[]
+    for i in range(len(x)):
+        while len(hull)>=2:
+            j,k=hull[-2],hull[-1]
+            if (x[k]-x[j])*(y[i]-y[j])-(y[k]-y[j])*(x[i]-x[j])>=0:
+                hull.pop()
+            else:
+                break
+        hull.append(i)
+    return np.array(hull,dtype=np.intp)
+
+
+#Upper envelope tau(sigma) of a set of circles on a sigma grid. Inside circle i
+# tau^2 <= r^2-(sigma-c)^2 = -sigma^2+2*c*sigma+(r^2-c^2), so the envelope is
+# sqrt(-sigma^2 + the max of the lines 2*c*sigma+b). Only the circles on the
+# upper convex hull of the points (2c,b) can give that max; points below the
+# hull of the extreme points in a fan of directions are dropped in one
+# vectorized step and the exact hull is built from the few that remain.
+def circle_envelope(center,radius,points=512):
+    center=np.ravel(np.asarray(center,dtype=np.float64))
+    radius=np.ravel(np.asarray(radius,dtype=np.float64))
+    slope=2*center
+    offset=radius*radius-center*center
+
+    #extreme points in directions over the upper half plane
+    extreme=np.unique([np.argmax(slope*np.cos(angle)+offset*np.sin(angle))
+    for angle in np.linspace(0,np.pi,9)])
+    order=extreme[np.argsort(slope[extreme],kind='stable')]
+    inner=order[_upper_hull(slope[order],offset[order])]
+    keep=offset>=np.interp(slope,slope[inner],offset[inner])-1e-9*(1+np.abs(offset))
+
+    #exact hull of the remaining candidates
+    candidates=np.flatnonzero(keep)
+    candidates=candidates[np.lexsort((offset[candidates],slope[candidates]))]
+    hull=candidates[_upper_hull(slope[candidates],offset[candidates])]
+
+    sigma=np.linspace((center-radius).min(),(center+radius).max(),points)
+    square=-sigma*sigma+np.max(np.outer(sigma,slope[hull])+offset[hull],axis=1)
+    return sigma,np.sqrt(np.maximum(square,0))
+
+
+#2D histogram of points sampled on every circle outline over extent
+# (sigma_min,sigma_max,tau_min,tau_max), shape (tau bins,sigma bins). The extent
+# must be symmetric in tau: only the upper half circles are sampled and binned
+# (in float32 bin coordinates), the lower half is their mirror image. Points
+# outside the extent count in the edge bins.
+def outline_density(center,radius,extent,bins,samples=OUTLINE_SAMPLES,block=DENSITY_BLOCK):
+    nx,ny=bins
+    x0,x1,y0,y1=extent
+    x_scale,y_scale=nx/(x1-x0),ny/(y1-y0)
+    half=samples//2
+    angles=np.linspace(0,np.pi,half,endpoint=False)+np.pi/samples  #none on the sigma axis
+    cos=(np.cos(angles)*x_scale).astype(np.float32)
+    sin=(np.sin(angles)*y_scale).astype(np.float32)
+    x=((np.ravel(center)-x0)*x_scale).astype(np.float32)
+    radius=np.ravel(radius).astype(np.float32)
+    y=np.float32(-y0*y_scale)
+
+    counts=np.zeros(nx*ny,dtype=np.int64)
+    for start in range(0,len(x),block):
+        r=radius[start:start+block,None]
+        ix=(x[start:start+block,None]+r*cos).astype(np.intp)
+        iy=(y+r*sin).astype(np.intp)
+        np.clip(ix,0,nx-1,out=ix)
+        np.clip(iy,0,ny-1,out=iy)
+        counts+=np.bincount((iy*nx+ix).ravel(),minlength=nx*ny)
+    counts=counts.reshape(ny,nx)
+    return counts+counts[::-1]
+
+########################## END GEOMETRY #####################
+
+class OverlayFigure:
+
+    def __init__(self,fig=None,density_threshold=DENSITY_THRESHOLD):
+        if fig is None:
+            fig=Figure(figsize=(12,6))
+        self.fig=fig
+        self.density_threshold=density_threshold
+        ax=self.ax=fig.add_subplot()
+        ax.grid(True)
+        ax.axhline(color='k',zorder=1)
+        ax.axvline(color='k',zorder=1)
+        ax.set_aspect(1)
+        ax.set_xlabel('Sigma (MPa)')
+        ax.set_ylabel('Tau (MPa)')
+        self.title=fig.suptitle("Mohr's Circles",y=0.93)
+
+        #individual circles, one collection for all of them
+        self.collection=EllipseCollection([],[],[],units='xy',offsets=np.empty((0,2)),
+        offset_transform=ax.transData,facecolors='none',edgecolors='tab:blue',
+        linewidths=0.6,alpha=0.3,zorder=5)
+        ax.add_collection(self.collection,autolim=False)
+
+        #outline density, rasterized so vector output stays small
+        self.image=ax.imshow(np.zeros((2,2)),origin='lower',extent=(0,1,0,1),cmap='viridis',
+        interpolation='nearest',zorder=4,rasterized=True)
+
+        #envelope of all circles
+        self.envelope,=ax.plot([],[],color='red',linewidth=2,zorder=10,label='envelope')
+        for artist in (self.collection,self.image,self.envelope):
+            artist.set_visible(False)
+
+    #show every circle of stress arrays (3 for plane states, 6 for 3D states)
+    def update(self,*stresses):
+        center,radius=(np.ravel(a) for a in circles(*stresses))
+        count=len(center)
+        if not count:
+            raise ValueError("no stress states to overlay")
+        low,high=float((center-radius).min()),float((center+radius).max())
+        tau=float(radius.max())
+        span=max(high-low,2*tau,1e-9)
+        xlim=(low-0.05*span,high+0.05*span)
+        ylim=(-tau-0.05*span,tau+0.05*span)
+
+        dense=count>self.density_threshold
+        if dense:
+            nx=DENSITY_BINS
+            ny=max(1,int(round(nx*(ylim[1]-ylim[0])/(xlim[1]-xlim[0]))))
+            extent=(*xlim,*ylim)
+            counts=outline_density(center,radius,extent,(nx,ny))
+            self.image.set_data(np.ma.masked_equal(np.log1p(counts),0))
+            self.image.set_extent(extent)
+            self.image.autoscale()
+        else:
+            self.collection.set_offsets(np.column_stack([center,np.zeros(count)]))
+            self.collection.set_widths(2*radius)
+            self.collection.set_heights(2*radius)
+            self.collection.set_angles(np.zeros(count))
+        self.collection.set_visible(not dense)
+        self.image.set_visible(dense)
+
+        sigma,upper=circle_envelope(center,radius)
+        self.envelope.set_data(np.concatenate([sigma,sigma[::-1]]),np.concatenate([upper,-upper[::-1]]))
+        self.envelope.set_visible(True)
+
+        self.ax.set_xlim(*xlim)
+        self.ax.set_ylim(*ylim)
+        self.title.set_text(f"Mohr's Circles of {count:,} States"+(' (outline density)' if dense else ''))
+        self.fig.stale=True
+        return self.fig
+
+
+#all states of an input file as stress arrays
+def read_states(path,id_column='id'):
+    chunks=list(read_chunks(path,id_column=id_column))
+    if not chunks:
+        raise ValueError(f"{path}: no stress states found")
+    return [np.concatenate([chunk[i] for chunk in chunks]) for i in range(1,len(chunks[0]))]
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py overlay',
+    description="Draw the Mohr's circles of every stress state in a file on one diagram.")
+    parser.add_argument('input',help='CSV, .npy or .npz file of stress states (see batch)')
+    parser.add_argument('output',help='image file, the format follows the extension')
+    parser.add_argument('--density-threshold',type=int,default=DENSITY_THRESHOLD,
+    help='circle count above which the outline density is drawn (default %(default)s)')
+    parser.add_argument('--dpi',type=int,default=100,help='raster resolution (default %(default)s)')
+    args=parser.parse_args(argv)
+
+    start=time.perf_counter()
+    overlay=OverlayFigure(density_threshold=args.density_threshold)
+    overlay.update(*read_states(args.input))
+    overlay.fig.savefig(args.output,dpi=args.dpi)
+    print(f"{args.output} written in {time.perf_counter()-start:.2f} s",file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,769 @@
+import numpy as np
+import matplotlib.transforms as trans
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle,Rectangle
+from mohr_core import mohr_points,mohr_solve_3d,mohr_transform
+from mohr_failure import evaluate_states,mohr_coulomb_envelope
+from mohr_profile import stage
+
+#This module builds the Mohr's circle figure. It only uses matplotlib's
+# object-oriented Figure API (never pyplot), so it imports and renders without
+# Tk or a display; the GUI attaches a Tk canvas to the figures it returns.
+
+########################## BEGIN MATPLOTLIB #####################
+
+#shared text box and arrow styles
+BOX=dict(boxstyle="round,pad=0.3",color='w',ec='k')
+ARROW=dict(arrowstyle='->',connectionstyle='arc3')
+
+#empty figure with the static axes decoration
+def new_figure():
+
+    #plot initialization
+    fig=Figure(figsize=(12,6))
+    ax1,ax2=fig.subplots(ncols=2)
+    ax1.grid(True)
+
+    #mark axes
+    ax1.axhline(color='k')
+    ax1.axvline(color='k')
+
+    #set aspect ratios of subplots to 1
+    ax1.set_aspect(1)
+    ax2.set_aspect(1)
+
+    #plot title, axis labels
+    fig.suptitle("Mohr's Circle for Stress",y=0.93)
+    ax1.set_xlabel('Sigma (MPa)')
+    ax1.set_ylabel('Tau (MPa)')
+    ax2.get_xaxis().set_visible(False)
+    ax2.get_yaxis().set_visible(False)
+
+    return fig,ax1,ax2
+
+
+#Long-lived Mohr's circle figure. Every artist is created once in __init__ and
+# apply()/update() only move, relabel, show or hide them, so recalculating never
+# allocates a new figure, canvas or annotation and memory stays flat.
+class MohrFigure:
+
+    def __init__(self,fig=None):
+        if fig is None:
+            fig,ax1,ax2=new_figure()
+        else:
+            ax1,ax2=fig.axes[:2]
+        self.fig=fig
+        self.ax1=ax1
+        self.ax2=ax2
+        self.state=None
+
+        ########################  subplot 1   #####################
+
+        #create circle
+        self.circle=Circle((0,0),1,facecolor='yellow',edgecolor='black',zorder=5)
+        ax1.add_artist(self.circle)
+
+        #plot A,B
+        self.AB_points,=ax1.plot([],[],'bo',zorder=10)
+        #annotate A,B and their arrows
+        self.A_label=ax1.annotate('A',(0,0),xytext=(30,-15),xycoords=ax1.transData,
+        textcoords='offset pixels',bbox=BOX,zorder=15)
+        self.A_arrow=ax1.annotate('',xy=(0,0),xytext=(30,-15),xycoords=ax1.transData,
+        textcoords='offset pixels',arrowprops=ARROW,zorder=12)
+        self.B_label=ax1.annotate('B',(0,0),xytext=(30,-15),xycoords=ax1.transData,
+        textcoords='offset pixels',bbox=BOX,zorder=15)
+        self.B_arrow=ax1.annotate('',xy=(0,0),xytext=(30,-15),xycoords=ax1.transData,
+        textcoords='offset pixels',arrowprops=ARROW,zorder=12)
+
+        #plot and annotate sigma_1,sigma_2
+        self.S_points,=ax1.plot([],[],'ro',zorder=10)
+        self.S1_label=ax1.annotate('\u03C3'+'1',(0,0),xytext=(20,-8),xycoords=ax1.transData,
+        textcoords='offset pixels',bbox=BOX,zorder=12)
+        self.S2_label=ax1.annotate('\u03C3'+'2',(0,0),xytext=(-30,-8),xycoords=ax1.transData,
+        textcoords='offset pixels',bbox=BOX,zorder=12)
+
+        #plot center, AB line and line across principal stress points
+        self.center_point,=ax1.plot([],[],'bo',zorder=10)
+        self.AB_line,=ax1.plot([],[],'r',zorder=9)
+        self.S_line,=ax1.plot([],[],'cornflowerblue',zorder=9)
+
+        #plot and annotate maximum/minimum shear stress
+        self.T_points,=ax1.plot([],[],'ro',zorder=10)
+        self.T1_label=ax1.annotate('\u03C4'+'1',(0,0),xytext=(-10,20),xycoords=ax1.transData,
+        textcoords='offset pixels',bbox=BOX,zorder=12)
+        self.T2_label=ax1.annotate('\u03C4'+'2',(0,0),xytext=(-10,-30),xycoords=ax1.transData,
+        textcoords='offset pixels',bbox=BOX,zorder=12)
+
+        #given stresses
+        self.sigma_xx_text=ax1.text(0.03,0.95,'',transform=ax1.transAxes,bbox=BOX,
+        zorder=12,fontsize='small')
+        self.sigma_yy_text=ax1.text(0.03,0.9,'',transform=ax1.transAxes,bbox=BOX,
+        zorder=12,fontsize='small')
+        self.tau_xy_text=ax1.text(0.03,0.85,'',transform=ax1.transAxes,bbox=BOX,
+        zorder=12,fontsize='small')
+
+        #critical points, principal stresses, maximum shear stresses
+        self.critical_text=ax1.text(0.7,0.75,'',bbox=BOX,transform=ax1.transAxes,
+        fontsize='small')
+        self.principal_text=ax1.text(0.05,0.05,'',bbox=BOX,transform=ax1.transAxes,
+        fontsize='small')
+        self.shear_text=ax1.text(0.6,0.05,'',bbox=BOX,transform=ax1.transAxes,
+        fontsize='small')
+
+        #3D state: nested sigma1-sigma3, sigma1-sigma2 and sigma2-sigma3 circles
+        self.circles_3d=[Circle((0,0),1,facecolor=color,edgecolor='black',zorder=zorder)
+        for color,zorder in (('yellow',5),('lightskyblue',6),('lightskyblue',6))]
+        for circle in self.circles_3d:
+            ax1.add_artist(circle)
+
+        #3D principal stresses and absolute maximum shear stress
+        self.S_points_3d,=ax1.plot([],[],'ro',zorder=10)
+        self.S_labels_3d=[ax1.annotate('\u03C3'+str(i+1),(0,0),xytext=xytext,
+        xycoords=ax1.transData,textcoords='offset pixels',bbox=BOX,zorder=12)
+        for i,xytext in enumerate(((20,-8),(-8,-30),(-30,-8)))]
+        self.T_points_3d,=ax1.plot([],[],'ro',zorder=10)
+        self.T_label_3d=ax1.annotate('\u03C4'+'max',(0,0),xytext=(-10,20),xycoords=ax1.transData,
+        textcoords='offset pixels',bbox=BOX,zorder=12)
+
+        #out of plane stresses
+        self.sigma_zz_text=ax1.text(0.03,0.8,'',transform=ax1.transAxes,bbox=BOX,
+        zorder=12,fontsize='small')
+        self.tau_xz_text=ax1.text(0.03,0.75,'',transform=ax1.transAxes,bbox=BOX,
+        zorder=12,fontsize='small')
+        self.tau_yz_text=ax1.text(0.03,0.7,'',transform=ax1.transAxes,bbox=BOX,
+        zorder=12,fontsize='small')
+
+        #center mohr's circle and define data limits
+        ax1.margins(0.7)
+
+        ####################    subplot 2 plotting     #####################
+
+        ########## Element 1 ##########
+
+        #element 1 label
+        ax2.text(0.05,0.95,'Given State of Stress',bbox=dict(color='w',ec='k',
+        boxstyle='roundtooth'))
+        stress_element1=Rectangle((0.65,0.65),width=0.2,height=0.2,
+        facecolor="yellow",edgecolor="black",zorder=10)
+        ax2.add_artist(stress_element1)
+
+        #plot element1 center dot
+        ax2.plot(0.75,0.75,'bo',scalex=False,scaley=False,zorder=15)
+
+        #plot element1 axes
+        ax2.plot([0.75,0.975],[0.75,0.75],'r',scalex=False,scaley=False,zorder=11,
+        linestyle='--',linewidth=2.0)
+        ax2.plot([0.75,0.75],[0.75,0.975],'r',scalex=False,scaley=False,zorder=11,
+        linestyle='--',linewidth=2.0)
+
+        #stress arrows, direction is set by update()
+        self.sigma_xx_arrows=[ax2.annotate("",xy=(0,0),xytext=(0,0),
+        arrowprops=ARROW,zorder=15) for i in range(2)]
+        self.sigma_yy_arrows=[ax2.annotate("",xy=(0,0),xytext=(0,0),
+        arrowprops=ARROW,zorder=15) for i in range(2)]
+        self.tau_xy_arrows=[ax2.annotate("",xy=(0,0),xytext=(0,0),
+        arrowprops=ARROW,zorder=15) for i in range(4)]
+
+        #stress labels
+        self.element_sigma_xx_text=ax2.text(0.05,0.875,'',bbox=BOX,zorder=10)
+        self.element_sigma_yy_text=ax2.text(0.05,0.8,'',bbox=BOX,zorder=10)
+        self.element_tau_xy_text=ax2.text(0.05,0.725,'',bbox=BOX,zorder=10)
+        self.element_out_of_plane_text=ax2.text(0.05,0.6,'',bbox=BOX,zorder=10,size='small')
+
+        ######## element 2 ########
+
+        #element 2 label
+        ax2.text(0.05,0.5,'Principal Stresses',bbox=dict(color='w',ec='k',
+        boxstyle='roundtooth'))
+
+        #rotation of the principal element, everything drawn in the principal
+        # frame shares this transform so update() only has to reset the angle
+        self.rotation=trans.Affine2D()
+        s=self.rotation+trans.Affine2D().translate(0.75,0.225)+ax2.transAxes
+        self.principal_transform=s
+
+        #create rectangle
+        self.stress_element2=Rectangle((-0.1,-0.1),width=0.2,height=0.2,transform=s,
+        facecolor="yellow",edgecolor="black",zorder=10)
+        ax2.add_artist(self.stress_element2)
+
+        #element2 middle dot
+        self.principal_element=ax2.plot(0.75,0.225,'bo',scalex=False,scaley=False,zorder=15)
+
+        #plot element2 axes
+        self.principal_element+=ax2.plot([0.75,0.975],[0.225,0.225],'r',scalex=False,
+        scaley=False,zorder=11,linestyle='--',linewidth=2.0)
+        self.principal_element+=ax2.plot([0.75,0.75],[0.225,0.455],'r',scalex=False,
+        scaley=False,zorder=11,linestyle='--',linewidth=2.0)
+
+        #plot element2 new axes
+        self.principal_element+=ax2.plot([0,0.225],[0,0],'cornflowerblue',scalex=False,
+        scaley=False,transform=s,zorder=11,linestyle='--',linewidth=2.0)
+        self.principal_element+=ax2.plot([0,0],[0,0.225],'cornflowerblue',scalex=False,
+        scaley=False,transform=s,zorder=11,linestyle='--',linewidth=2.0)
+
+        #principal stress arrows and labels
+        self.S1_arrows=[ax2.annotate('',xy=(0,0),xytext=(0,0),xycoords=s,textcoords=s,
+        arrowprops=ARROW,zorder=11) for i in range(2)]
+        self.S2_arrows=[ax2.annotate('',xy=(0,0),xytext=(0,0),xycoords=s,textcoords=s,
+        arrowprops=ARROW,zorder=11) for i in range(2)]
+        self.element_S1_text=ax2.text(0.05,0.4,'',bbox=BOX,zorder=10)
+        self.element_S2_text=ax2.text(0.05,0.3,'',bbox=BOX,zorder=10)
+        self.element_S3_text=ax2.text(0.05,0.2,'',bbox=BOX,zorder=10)
+
+        #theta arrow and text
+        self.theta_arrow=ax2.annotate('',xy=(0,0.225),xytext=(0.75,0.45),
+            xycoords=s,
+            textcoords=ax2.transAxes,
+            arrowprops=dict(arrowstyle='->',connectionstyle='angle3',zorder=11))
+        self.theta_text=ax2.text(0.575,0.475,'',bbox=BOX,zorder=10,size='small')
+
+        #nothing to show until the first update
+        self.dynamic_artists=[self.circle,self.AB_points,self.A_label,self.A_arrow,
+        self.B_label,self.B_arrow,self.S_points,self.S1_label,self.S2_label,
+        self.center_point,self.AB_line,self.S_line,self.T_points,self.T1_label,
+        self.T2_label,self.sigma_xx_text,self.sigma_yy_text,self.tau_xy_text,
+        self.critical_text,self.principal_text,self.shear_text,
+        *self.sigma_xx_arrows,*self.sigma_yy_arrows,*self.tau_xy_arrows,
+        self.element_sigma_xx_text,self.element_sigma_yy_text,self.element_tau_xy_text,
+        self.stress_element2,*self.S1_arrows,*self.S2_arrows,self.element_S1_text,
+        self.element_S2_text,self.theta_arrow,self.theta_text]
+        for artist in self.dynamic_artists:
+            artist.set_visible(False)
+
+        #artists that only make sense for a plane state (the construction from A
+        # and B, the rotated principal element) and those only shown for 3D states
+        self.plane_artists=[self.circle,self.AB_points,self.A_label,self.A_arrow,
+        self.B_label,self.B_arrow,self.S_points,self.S1_label,self.S2_label,
+        self.center_point,self.AB_line,self.S_line,self.T_points,self.T1_label,
+        self.T2_label,self.critical_text,self.stress_element2,*self.principal_element,
+        *self.S1_arrows,*self.S2_arrows,self.theta_arrow,self.theta_text]
+        self.space_artists=[*self.circles_3d,self.S_points_3d,*self.S_labels_3d,
+        self.T_points_3d,self.T_label_3d,self.sigma_zz_text,self.tau_xz_text,
+        self.tau_yz_text,self.element_out_of_plane_text,self.element_S3_text]
+        for artist in self.space_artists:
+            artist.set_visible(False)
+        self.state_3d=None
+
+    #point a group of arrows at new positions, hide it when positions is None
+    def _set_arrows(self,arrows,positions):
+        for arrow in arrows:
+            arrow.set_visible(positions is not None)
+        if positions is None:
+            return
+        for arrow,(xy,xytext) in zip(arrows,positions):
+            arrow.xy=xy
+            arrow.xyann=xytext
+
+    #move every artist to a frame made by prepare_frame and return the figure
+    def apply(self,frame):
+        with stage('apply'):
+            return self._apply(frame)
+
+    def _apply(self,frame):
+        A,B,center,S1,S2,T1,T2=(frame[k] for k in ('A','B','C','S1','S2','T1','T2'))
+        self.state=frame['state']
+        for artist in self.dynamic_artists+self.principal_element:
+            artist.set_visible(True)
+
+        ########################  subplot 1   #####################
+
+        #circle
+        self.circle.set_center(center)
+        self.circle.set_radius(frame['radius'])
+
+        #A,B
+        self.AB_points.set_data([A[0],B[0]],[A[1],B[1]])
+        self.A_label.xy=A
+        self.A_arrow.xy=A
+        self.B_label.xy=B
+        self.B_arrow.xy=B
+
+        #sigma_1,sigma_2
+        self.S_points.set_data([S1[0],S2[0]],[S1[1],S2[1]])
+        self.S1_label.xy=S1
+        self.S2_label.xy=S2
+
+        #center, AB line and line across principal stress points
+        self.center_point.set_data([center[0]],[center[1]])
+        self.AB_line.set_data([A[0],B[0]],[A[1],B[1]])
+        self.S_line.set_data([S2[0],S1[0]],[0,0])
+
+        #maximum/minimum shear stress
+        self.T_points.set_data([T1[0],T2[0]],[T1[1],T2[1]])
+        self.T1_label.xy=T1
+        self.T2_label.xy=T2
+
+        #text boxes
+        for name,text in frame['texts'].items():
+            getattr(self,name).set_text(text)
+
+        #3D state replaces the plane construction
+        self.state_3d=frame['out_of_plane']
+        if self.state_3d is not None:
+            self._apply_3d(frame['principal_3d'])
+
+        ####################    subplot 2 plotting     #####################
+
+        #stress arrows on both elements, labels are hidden for zero stresses
+        for name,positions in frame['arrows'].items():
+            self._set_arrows(getattr(self,name),positions)
+        for name,visible in frame['labels'].items():
+            getattr(self,name).set_visible(visible)
+
+        #rotate the principal element
+        self.rotation.clear().rotate_deg(frame['angle'])
+
+        #theta arrow and text
+        if frame['theta_style'] is not None:
+            self.theta_arrow.arrow_patch.set_connectionstyle(frame['theta_style'])
+            self.theta_text.set_x(frame['theta_x'])
+        self.theta_arrow.set_visible(frame['theta_style'] is not None)
+        self.theta_text.set_visible(frame['theta_style'] is not None)
+
+        for artist in self.space_artists:
+            artist.set_visible(self.state_3d is not None)
+        if self.state_3d is not None:
+            for artist in self.plane_artists:
+                artist.set_visible(False)
+
+        #rescale data limits to the new circle, overlays drawn with blitting
+        # (animated artists) still show the previous state and are left out
+        animated=[line for line in self.ax1.lines if line.get_animated() and line.get_visible()]
+        for line in animated:
+            line.set_visible(False)
+        with stage('relim'):
+            self.ax1.relim(visible_only=True)
+            self.ax1.autoscale_view()
+        for line in animated:
+            line.set_visible(True)
+
+        self.fig.stale=True
+        return self.fig
+
+    #three nested circles, principal stresses and absolute maximum shear
+    def _apply_3d(self,principal):
+        for circle,center,radius in zip(self.circles_3d,principal['centers'],principal['radii']):
+            circle.set_center((center,0))
+            circle.set_radius(radius)
+        sigma=principal['sigma']
+        self.S_points_3d.set_data(sigma,[0,0,0])
+        for label,value in zip(self.S_labels_3d,sigma):
+            label.xy=(value,0)
+        center,tau_max=principal['centers'][0],principal['tau_max']
+        self.T_points_3d.set_data([center,center],[tau_max,-tau_max])
+        self.T_label_3d.xy=(center,tau_max)
+
+    #move every artist to a new state of stress and return the figure
+    def update(self,sigma_xx,sigma_yy,tau_xy,sigma_zz=0,tau_xz=0,tau_yz=0):
+        return self.apply(prepare_frame(sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz))
+
+
+#Everything MohrFigure.apply needs for one state: solved points, formatted
+# labels and arrow positions. This does not touch any artist, so it is safe to
+# run in a worker thread while the GUI thread keeps drawing. Any nonzero out of
+# plane component makes it a 3D frame with three circles. Already solved
+# points (as mohr_points returns them, e.g. from a result store) skip the
+# plane solve.
+def prepare_frame(sigma_xx,sigma_yy,tau_xy,sigma_zz=0,tau_xz=0,tau_yz=0,points=None):
+    with stage('prepare'):
+        return _prepare_frame(sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz,points)
+
+def _prepare_frame(sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz,points=None):
+
+    #solve the state of stress (all of the math lives in mohr_core)
+    if points is None:
+        with stage('solve'):
+            points=mohr_points(sigma_xx,sigma_yy,tau_xy)
+    A=points['A']
+    B=points['B']
+    S1=points['S1']
+    S2=points['S2']
+    T1=points['T1']
+    T2=points['T2']
+
+    #stress element angle
+    angle=points['angle']
+
+    frame=dict(points,state=(sigma_xx,sigma_yy,tau_xy))
+
+    ########################  subplot 1   #####################
+
+    texts={}
+
+    #given stresses
+    texts['sigma_xx_text']='\u03C3'+'xx = '+str(round(sigma_xx,2))+' MPa'
+    texts['sigma_yy_text']='\u03C3'+'yy = '+str(round(sigma_yy,2))+' MPa'
+    texts['tau_xy_text']='\u03C4'+'xy = '+str(round(tau_xy,2))+' MPa'
+
+    #critical points
+    texts['critical_text']=('Critical Points:\nA: ('
+    +str(round(A[0],2))+', '+str(round(A[1],2))+')\nB: ('+str(round(B[0],2))+', '+
+    str(round(B[1],2))+')\n\u03C3'+'1: ('+str(round(S1[0],2))+', '+
+    str(round(S1[1],2))+')\n\u03C3'+'2: ('+str(round(S2[0],2))+', '+
+    str(round(S2[1],2))+')\n\u03C4'+'1: ('+str(round(T1[0],2))+', '+
+    str(round(T1[1],2))+')\n\u03C4'+'2: ('+str(round(T2[0],2))+', '+
+    str(round(T2[1],2))+')')
+
+    #principal Stresses
+    texts['principal_text']=('Principal Stresses:\n\u03C3'+'1'+'= '
+    +str(round(S1[0],2))+' MPa\n\u03C3'+'2'+'= '+str(round(S2[0],2))+' MPa')
+
+    #maximum shear stresses
+    texts['shear_text']=('Max Shear Stresses:\n\u03C4'+'1'+'= '
+    +str(round(T1[1],2))+' MPa\n\u03C4'+'2'+'= '+str(round(T2[1],2))+' MPa')
+
+    ####################    subplot 2 plotting     #####################
+
+    arrows={}
+
+    ########## Element 1 ##########
+
+    #sigma_xx
+    if sigma_xx>0:
+        arrows['sigma_xx_arrows']=[((0.975,0.75),(0.85,0.75)),((0.525,0.75),(0.65,0.75))]
+    elif sigma_xx<0:
+        arrows['sigma_xx_arrows']=[((0.85,0.75),(0.975,0.75)),((0.65,0.75),(0.525,0.75))]
+    else:
+        arrows['sigma_xx_arrows']=None
+    texts['element_sigma_xx_text']='\u03C3'+'xx = '+str(round(sigma_xx,2))+' MPa'
+
+    #sigma_yy
+    if sigma_yy>0:
+        arrows['sigma_yy_arrows']=[((0.75,0.975),(0.75,0.85)),((0.75,0.525),(0.75,0.65))]
+    elif sigma_yy<0:
+        arrows['sigma_yy_arrows']=[((0.75,0.85),(0.75,0.975)),((0.75,0.65),(0.75,0.525))]
+    else:
+        arrows['sigma_yy_arrows']=None
+    texts['element_sigma_yy_text']='\u03C3'+'yy = '+str(round(sigma_yy,2))+' MPa'
+
+    #tau_xy
+    if tau_xy>0:
+        arrows['tau_xy_arrows']=[((0.85,0.885),(0.65,0.885)),((0.885,0.85),(0.885,0.65)),
+        ((0.65,0.615),(0.85,0.615)),((0.615,0.65),(0.615,0.85))]
+    elif tau_xy<0:
+        arrows['tau_xy_arrows']=[((0.85,0.885),(0.65,0.885)),((0.885,0.65),(0.885,0.85)),
+        ((0.65,0.615),(0.85,0.615)),((0.615,0.85),(0.615,0.65))]
+    else:
+        arrows['tau_xy_arrows']=None
+    texts['element_tau_xy_text']='\u03C4'+'xy = '+str(round(tau_xy,2))+' MPa'
+
+    ######## element 2 ########
+
+    #S1 arrows
+    if S1[0]>0:
+        arrows['S1_arrows']=[((0.225,0),(0.1,0)),((-0.225,0),(-0.1,0))]
+    elif S1[0]<0:
+        arrows['S1_arrows']=[((0,0.1),(0,0.225)),((0,-0.1),(0,-0.225))]
+    else:
+        arrows['S1_arrows']=None
+    texts['element_S1_text']='\u03C3'+'1 = '+str(round(S1[0],2))+' MPa'
+
+    #S2 arrows
+    if S2[0]>0:
+        arrows['S2_arrows']=[((0,0.225),(0,0.1)),((0,-0.225),(0,-0.1))]
+    elif S2[0]<0:
+        arrows['S2_arrows']=[((0,0.1),(0,0.225)),((0,-0.1),(0,-0.225))]
+    else:
+        arrows['S2_arrows']=None
+    texts['element_S2_text']='\u03C3'+'2 = '+str(round(S2[0],2))+' MPa'
+
+    #theta arrow and text
+    if angle < 0:
+        frame['theta_style']=f'angle3,angleA=0,angleB={angle}'
+        frame['theta_x']=0.775
+    elif angle > 0:
+        frame['theta_style']=f'angle3,angleB={angle},angleA=0'
+        frame['theta_x']=0.575
+    else:
+        frame['theta_style']=None
+    texts['theta_text']=r'$\theta$'+' = '+str(round(angle,2))+u'\N{DEGREE SIGN}'
+
+    #3D state of stress
+    frame['out_of_plane']=None
+    frame['principal_3d']=None
+    if sigma_zz or tau_xz or tau_yz:
+        frame['out_of_plane']=(sigma_zz,tau_xz,tau_yz)
+        with stage('solve'):
+            res=mohr_solve_3d(sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz,dtype=float)
+        sigma=[float(res.sigma1),float(res.sigma2),float(res.sigma3)]
+        tau_max=float(res.tau_max)
+        frame['principal_3d']={'sigma':sigma,'tau_max':tau_max,
+        'centers':[float(c) for c in res.centers],'radii':[float(r) for r in res.radii]}
+
+        texts['sigma_zz_text']='\u03C3'+'zz = '+str(round(sigma_zz,2))+' MPa'
+        texts['tau_xz_text']='\u03C4'+'xz = '+str(round(tau_xz,2))+' MPa'
+        texts['tau_yz_text']='\u03C4'+'yz = '+str(round(tau_yz,2))+' MPa'
+        texts['element_out_of_plane_text']=('\u03C3'+'zz = '+str(round(sigma_zz,2))
+        +' MPa\n\u03C4'+'xz = '+str(round(tau_xz,2))+' MPa\n\u03C4'+'yz = '
+        +str(round(tau_yz,2))+' MPa')
+        texts['principal_text']=('Principal Stresses:\n\u03C3'+'1'+'= '
+        +str(round(sigma[0],2))+' MPa\n\u03C3'+'2'+'= '+str(round(sigma[1],2))
+        +' MPa\n\u03C3'+'3'+'= '+str(round(sigma[2],2))+' MPa')
+        texts['shear_text']=('Max Shear Stress:\n\u03C4'+'max'+'= '
+        +str(round(tau_max,2))+' MPa')
+        for i,name in enumerate(('element_S1_text','element_S2_text','element_S3_text')):
+            texts[name]='\u03C3'+str(i+1)+' = '+str(round(sigma[i],2))+' MPa'
+
+    frame['texts']=texts
+    frame['arrows']=arrows
+    frame['labels']={
+        'element_sigma_xx_text':sigma_xx!=0,
+        'element_sigma_yy_text':sigma_yy!=0,
+        'element_tau_xy_text':tau_xy!=0,
+        'element_S1_text':S1[0]!=0 or frame['out_of_plane'] is not None,
+        'element_S2_text':S2[0]!=0 or frame['out_of_plane'] is not None,
+    }
+    return frame
+
+
+#Interactive stress transformation overlay. Dragging the given element in ax2
+# (or calling set_angle from a slider) rotates it to any angle theta, shows the
+# transformed stresses and sweeps the matching diameter around the circle.
+# The overlay artists are animated and blitted: the rest of the figure is
+# cached in a background after every full draw and only these few artists are
+# redrawn per motion event.
+class AngleScrubber:
+
+    def __init__(self,mohr_fig,on_change=None):
+        self.mohr_fig=mohr_fig
+        self.on_change=on_change  #on_change(theta), called when the element is dragged
+        self.theta=0.0
+        self.background=None
+        self.dragging=False
+        ax1,ax2=mohr_fig.ax1,mohr_fig.ax2
+
+        #rotated diameter and its x and y face points
+        self.diameter,=ax1.plot([],[],'g',zorder=11,animated=True)
+        self.face_points,=ax1.plot([],[],'go',zorder=12,animated=True)
+
+        #rotated outline of the given element
+        self.rotation=trans.Affine2D()
+        s=self.rotation+trans.Affine2D().translate(0.75,0.75)+ax2.transAxes
+        self.element=Rectangle((-0.1,-0.1),width=0.2,height=0.2,transform=s,
+        fill=False,edgecolor='green',linestyle='--',linewidth=2.0,zorder=16,animated=True)
+        ax2.add_artist(self.element)
+
+        #transformed stresses
+        self.text=ax2.text(0.05,0.56,'',bbox=dict(BOX,ec='g'),zorder=10,
+        size='small',animated=True)
+
+        self.artists=[self.diameter,self.face_points,self.element,self.text]
+        for artist in self.artists:
+            artist.set_visible(False)
+
+        #recache the background after every full draw, handle element dragging
+        canvas=mohr_fig.fig.canvas
+        self.cids=[canvas.mpl_connect('draw_event',self._on_draw),
+        canvas.mpl_connect('button_press_event',self._on_press),
+        canvas.mpl_connect('motion_notify_event',self._on_motion),
+        canvas.mpl_connect('button_release_event',self._on_release)]
+
+    #move the overlay to a new angle (degrees) and blit it
+    def set_angle(self,theta):
+        self.theta=float(theta)
+        self._update_artists()
+        self.blit()
+
+    #stop listening to the canvas and remove the overlay
+    def disconnect(self):
+        for cid in self.cids:
+            self.mohr_fig.fig.canvas.mpl_disconnect(cid)
+        for artist in self.artists:
+            artist.remove()
+
+    def _update_artists(self):
+        #the transformation overlay is for plane states only
+        state=self.mohr_fig.state
+        if self.mohr_fig.state_3d is not None:
+            state=None
+        for artist in self.artists:
+            artist.set_visible(state is not None)
+        if state is None:
+            return
+        sigma_x,sigma_y,tau_xy=(float(v) for v in mohr_transform(*state,self.theta))
+
+        #x face plots at (sigma_x',-tau_x'y'), y face at (sigma_y',tau_x'y')
+        self.diameter.set_data([sigma_x,sigma_y],[-tau_xy,tau_xy])
+        self.face_points.set_data([sigma_x,sigma_y],[-tau_xy,tau_xy])
+        self.rotation.clear().rotate_deg(self.theta)
+        self.text.set_text(r'$\theta$'+' = '+str(round(self.theta,2))+u'\N{DEGREE SIGN}'
+        +'\n\u03C3'+"x' = "+str(round(sigma_x,2))+' MPa'
+        +'\n\u03C3'+"y' = "+str(round(sigma_y,2))+' MPa'
+        +'\n\u03C4'+"x'y' = "+str(round(tau_xy,2))+' MPa')
+
+    #redraw only the overlay on top of the cached background
+    def blit(self):
+        canvas=self.mohr_fig.fig.canvas
+        if self.background is None:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        self._draw_artists()
+        canvas.blit(self.mohr_fig.fig.bbox)
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            artist.axes.draw_artist(artist)
+
+    def _on_draw(self,event):
+        canvas=self.mohr_fig.fig.canvas
+        if canvas.is_saving():
+            return #savefig renders at its own dpi, keep the screen background
+        self.background=canvas.copy_from_bbox(self.mohr_fig.fig.bbox)
+        self._update_artists()
+        self._draw_artists()
+
+    def _on_press(self,event):
+        if event.inaxes is not self.mohr_fig.ax2 or self.mohr_fig.state is None or self.mohr_fig.state_3d is not None:
+            return
+        x,y=self.mohr_fig.ax2.transAxes.inverted().transform((event.x,event.y))
+        self.dragging=(x-0.75)**2+(y-0.75)**2<0.2**2
+
+    def _on_motion(self,event):
+        if not self.dragging:
+            return
+        x,y=self.mohr_fig.ax2.transAxes.inverted().transform((event.x,event.y))
+        if x==0.75 and y==0.75:
+            return
+
+        #the transformation repeats every 180 degrees, keep theta in [-90,90)
+        theta=(np.degrees(np.arctan2(y-0.75,x-0.75))+90)%180-90
+        self.set_angle(theta)
+        if self.on_change is not None:
+            self.on_change(self.theta)
+
+    def _on_release(self,event):
+        self.dragging=False
+
+
+#Failure envelopes on the circle and safety factors of the current state. The
+# Tresca limits are the horizontal lines tau=+-Sy/2, the Coulomb-Mohr envelope
+# is tangent to the uniaxial tension and compression circles (drawn dotted).
+# Von Mises has no envelope on the Mohr diagram and only shows as a number.
+class FailureOverlay:
+
+    def __init__(self,mohr_fig):
+        self.mohr_fig=mohr_fig
+        self.strengths={}
+        ax1,ax2=mohr_fig.ax1,mohr_fig.ax2
+
+        #collections stay out of the autoscaled data limits
+        self.tresca_lines=LineCollection([],colors='darkorange',linestyles='dashed',
+        linewidths=1.5,zorder=8)
+        self.mohr_coulomb_lines=LineCollection([],colors='red',linewidths=1.5,zorder=8)
+        self.strength_circles=LineCollection([],colors='gray',linestyles='dotted',
+        linewidths=1.5,zorder=7)
+        for collection in (self.tresca_lines,self.mohr_coulomb_lines,self.strength_circles):
+            ax1.add_collection(collection,autolim=False)
+
+        #safety factors
+        self.text=ax2.text(0.05,0.03,'',bbox=dict(BOX,ec='red'),zorder=10,size='small')
+
+        self.artists=[self.tresca_lines,self.mohr_coulomb_lines,self.strength_circles,self.text]
+        for artist in self.artists:
+            artist.set_visible(False)
+
+    #set the strengths (MPa, None to leave a criterion out) and redraw the overlay
+    def update(self,yield_strength=None,tensile_strength=None,compressive_strength=None):
+        self.strengths=dict(yield_strength=yield_strength,tensile_strength=tensile_strength,
+        compressive_strength=compressive_strength)
+        with stage('failure'):
+            self.refresh()
+
+    #follow the current state of the figure
+    def refresh(self):
+        yield_strength=self.strengths.get('yield_strength')
+        tensile_strength=self.strengths.get('tensile_strength')
+        compressive_strength=self.strengths.get('compressive_strength')
+        has_mc=bool(tensile_strength and compressive_strength)
+        state=self.mohr_fig.state
+        for artist in self.artists:
+            artist.set_visible(False)
+        self.mohr_fig.fig.stale=True
+        if state is None or not (yield_strength or has_mc):
+            return
+
+        #lines are drawn far past any sensible view and clipped by the axes
+        far=1000*max(s for s in (yield_strength,tensile_strength,compressive_strength) if s)
+
+        if yield_strength:
+            self.tresca_lines.set_segments([[(-far,tau),(far,tau)]
+            for tau in (yield_strength/2,-yield_strength/2)])
+            self.tresca_lines.set_visible(True)
+
+        if has_mc:
+            slope,intercept,tangent=mohr_coulomb_envelope(tensile_strength,compressive_strength)
+            self.mohr_coulomb_lines.set_segments([[(-far,sign*(slope*-far+intercept)),
+            (tangent,sign*(slope*tangent+intercept))] for sign in (1,-1)])
+            angles=np.linspace(0,2*np.pi,181)
+            self.strength_circles.set_segments([np.column_stack([center+radius*np.cos(angles),
+            radius*np.sin(angles)]) for center,radius in ((tensile_strength/2,tensile_strength/2),
+            (-compressive_strength/2,compressive_strength/2))])
+            self.mohr_coulomb_lines.set_visible(True)
+            self.strength_circles.set_visible(True)
+
+        #safety factors of the shown state
+        if self.mohr_fig.state_3d is None:
+            result=evaluate_states(*state,**self.strengths)
+        else:
+            result=evaluate_states(*state,*self.mohr_fig.state_3d,**self.strengths)
+        lines=['Safety Factors:']
+        if yield_strength:
+            lines.append('von Mises = '+str(round(float(result.von_mises_sf),2)))
+            lines.append('Tresca = '+str(round(float(result.tresca_sf),2)))
+        if has_mc:
+            lines.append('Mohr-Coulomb = '+str(round(float(result.mohr_coulomb_sf),2)))
+        self.text.set_text('\n'.join(lines))
+        self.text.set_visible(True)
+
+
+#Critical plane of a load history (see mohr_critical) on the given stress
+# element in ax2: the trace of the plane through the element center, its
+# normal and the damage parameter found on it.
+class CriticalPlaneOverlay:
+
+    def __init__(self,mohr_fig):
+        self.mohr_fig=mohr_fig
+        ax2=mohr_fig.ax2
+
+        #plane trace and normal in a frame rotated to the plane normal angle
+        self.rotation=trans.Affine2D()
+        s=self.rotation+trans.Affine2D().translate(0.75,0.75)+ax2.transAxes
+        self.trace,=ax2.plot([0,0],[-0.2,0.2],color='purple',linewidth=2.5,
+        scalex=False,scaley=False,transform=s,zorder=17)
+        self.normal=ax2.annotate('',xy=(0.2,0),xytext=(0,0),xycoords=s,textcoords=s,
+        arrowprops=dict(arrowstyle='-|>',color='purple',linewidth=2.0),zorder=17)
+        self.text=ax2.text(0.4,0.03,'',bbox=dict(BOX,ec='purple'),zorder=10,size='small')
+
+        self.artists=[self.trace,self.normal,self.text]
+        self.clear()
+
+    #show a mohr_critical.CriticalPlane result
+    def update(self,result):
+        self.result=result
+        self.rotation.clear().rotate_deg(result.theta)
+        self.text.set_text('Critical Plane ('+result.criterion.replace('_',' ')+'):\n'
+        +r'$\theta_c$'+' = '+str(round(result.theta,2))+u'\N{DEGREE SIGN}\n'
+        +'value = '+str(round(result.value,2))+' MPa\n'
+        +'\u0394\u03C4'+' = '+str(round(result.tau_range,2))+' MPa\n'
+        +'\u03C3'+'n,max = '+str(round(result.normal_max,2))+' MPa')
+        for artist in self.artists:
+            artist.set_visible(True)
+        self.mohr_fig.fig.stale=True
+
+    def clear(self):
+        self.result=None  #shown result, None when hidden
+        for artist in self.artists:
+            artist.set_visible(False)
+        self.mohr_fig.fig.stale=True
+
+
+#mohrs circle callback function, builds a standalone figure for one state
+def mohrs_circle(sigma_xx,sigma_yy,tau_xy,sigma_zz=0,tau_xz=0,tau_yz=0):
+    with stage('build'):
+        mohr_fig=MohrFigure()
+    return mohr_fig.update(sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz)
+
+###################### END MATPLOTLIB ########################
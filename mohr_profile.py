@@ -0,0 +1,111 @@
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+
+#Opt-in timing of the stages of a recalculation. The figure code marks its
+# stages with stage(name); while TIMER is disabled (the default) that is a
+# shared no-op context and costs next to nothing. Stages may nest, a nested
+# stage is also counted in its parent. The GUI shows TIMER.summary() in the
+# status bar and appends TIMER.record() to a JSON lines log.
+#
+#capture() runs a single recalculation under cProfile or tracemalloc.
+
+_NULL=contextlib.nullcontext()
+
+class StageTimer:
+
+    def __init__(self,enabled=False):
+        self.enabled=enabled
+        self.stages={}   #stage name -> seconds since the last reset, in first use order
+        self.started=time.perf_counter()
+        self._lock=threading.Lock()
+
+    #start a new recalculation
+    def reset(self):
+        with self._lock:
+            self.stages={}
+            self.started=time.perf_counter()
+
+    #time a block, repeated stages add up
+    def stage(self,name):
+        if not self.enabled:
+            return _NULL
+        return self._stage(name)
+
+    @contextlib.contextmanager
+    def _stage(self,name):
+        start=time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed=time.perf_counter()-start
+            with self._lock:
+                self.stages[name]=self.stages.get(name,0.0)+elapsed
+
+    #time since the last reset (s)
+    def total(self):
+        return time.perf_counter()-self.started
+
+    #compact breakdown for the status bar, 'solve 0.02 | apply 1.8 | draw 131 | total 140 ms'
+    def summary(self):
+        with self._lock:
+            parts=[f'{name} {seconds*1e3:.3g}' for name,seconds in self.stages.items()]
+        return ' | '.join(parts+[f'total {self.total()*1e3:.3g} ms'])
+
+    #structured record of the last recalculation, stage times in ms
+    def record(self,**extra):
+        with self._lock:
+            stages={name:round(seconds*1e3,4) for name,seconds in self.stages.items()}
+        return dict(time=time.strftime('%Y-%m-%dT%H:%M:%S'),**extra,stages_ms=stages,
+        total_ms=round(self.total()*1e3,4))
+
+    #append the record of the last recalculation to a JSON lines file
+    def log(self,path,**extra):
+        with open(path,'a') as f:
+            f.write(json.dumps(self.record(**extra))+'\n')
+
+
+#timer shared by the figure code and the GUI
+TIMER=StageTimer()
+
+def stage(name):
+    return TIMER.stage(name)
+
+
+#run func(*args) under cProfile ('cprofile') or tracemalloc ('tracemalloc') and
+# write the report to path (binary pstats for cProfile, text for tracemalloc).
+# Returns the result of func and a short text report of the top entries.
+def capture(mode,path,func,*args,top=15):
+    report=io.StringIO()
+    if mode=='cprofile':
+        profile=cProfile.Profile()
+        result=profile.runcall(func,*args)
+        profile.dump_stats(path)
+        pstats.Stats(profile,stream=report).sort_stats('cumulative').print_stats(top)
+        return result,report.getvalue()
+
+    if mode=='tracemalloc':
+        was_tracing=tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(25)
+        try:
+            before=tracemalloc.take_snapshot()
+            result=func(*args)
+            after=tracemalloc.take_snapshot()
+            current,peak=tracemalloc.get_traced_memory()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+        report.write(f'traced memory: {current/2**20:.2f} MB, peak {peak/2**20:.2f} MB\n')
+        for diff in after.compare_to(before,'lineno')[:top]:
+            report.write(f'{diff}\n')
+        with open(path,'w') as f:
+            f.write(report.getvalue())
+        return result,report.getvalue()
+
+    raise ValueError(f"unknown profiling mode {mode!r}, expected 'cprofile' or 'tracemalloc'")
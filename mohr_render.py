@@ -0,0 +1,143 @@
+import argparse
+import functools
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from mohr_batch import read_chunks
+from mohr_plot import MohrFigure
+
+#Batch rendering of Mohr's circle figures for report load cases. Every worker
+# process keeps one template MohrFigure on the non-interactive Agg canvas and
+# only updates it in place per case, so figure construction is paid once per
+# process instead of once per case. The optional multi-page PDF is written by
+# the parent process while the workers render the images.
+#
+#   python mohrs_circle_gui.py render cases.csv figures/ --format png svg --pdf report.pdf
+#
+#Input files are read like the batch mode inputs (see mohr_batch), the id column
+# names the output files.
+
+FORMATS=('png','svg','pdf')
+
+#per-process template figure, created by _init_worker
+_template=None
+
+def _init_worker():
+    global _template
+    _template=MohrFigure()
+    FigureCanvasAgg(_template.fig)
+
+
+#render one case with the process template, returns the written paths
+def render_case(name,stress,out_dir,formats=('png',),dpi=100):
+    if _template is None:
+        _init_worker()
+    _template.update(*stress)
+    paths=[]
+    for fmt in formats:
+        path=os.path.join(out_dir,f'{name}.{fmt}')
+        _template.fig.savefig(path,format=fmt,dpi=dpi)
+        paths.append(path)
+    return paths
+
+
+#render (stress,fmt,dpi) jobs with the process template, returns the image bytes
+def render_images(jobs):
+    if _template is None:
+        _init_worker()
+    images=[]
+    for stress,fmt,dpi in jobs:
+        _template.update(*stress)
+        buffer=io.BytesIO()
+        _template.fig.savefig(buffer,format=fmt,dpi=dpi)
+        images.append(buffer.getvalue())
+    return images
+
+
+#safe file name for a case id, row number when there is none
+def case_name(case_id,row):
+    if case_id is None:
+        return f'case_{row:06d}'
+    return re.sub(r'[^\w.-]+','_',str(case_id)).strip('.') or f'case_{row:06d}'
+
+
+#(name,stress) for every state in an input file, stress is the tuple of
+# MohrFigure.update arguments
+def read_cases(path,id_column='id'):
+    row=0
+    for ids,*stresses in read_chunks(path,id_column=id_column):
+        for i in range(len(stresses[0])):
+            yield (case_name(None if ids is None else ids[i],row),
+            tuple(float(a[i]) for a in stresses))
+            row+=1
+
+
+#render every case to out_dir with a process pool, returns the number of cases
+def render_batch(cases,out_dir,formats=('png',),dpi=100,pdf_path=None,workers=None,
+progress=None):
+    os.makedirs(out_dir,exist_ok=True)
+    cases=list(cases)
+    if not cases:
+        return 0
+    workers=workers or os.cpu_count() or 1
+    chunksize=max(1,len(cases)//(4*workers))
+    start=time.perf_counter()
+
+    pdf=None
+    if pdf_path is not None:
+        pdf=PdfPages(pdf_path)
+        page=MohrFigure()
+
+    try:
+        with ProcessPoolExecutor(workers,initializer=_init_worker) as pool:
+            render=functools.partial(render_case,out_dir=out_dir,formats=tuple(formats),dpi=dpi)
+            jobs=pool.map(render,*zip(*cases),chunksize=chunksize)
+
+            #write the report pages while the workers render the images
+            for done,(case,paths) in enumerate(zip(cases,jobs),1):
+                if pdf is not None:
+                    page.update(*case[1])
+                    pdf.savefig(page.fig)
+                if progress is not None:
+                    progress(done,len(cases),time.perf_counter()-start)
+    finally:
+        if pdf is not None:
+            pdf.close()
+    return len(cases)
+
+
+#cases/second progress report on stderr
+def print_progress(done,total,elapsed):
+    rate=done/elapsed if elapsed>0 else float('inf')
+    print(f"\r{done}/{total} figures, {rate:,.1f} figures/s",end='',file=sys.stderr,flush=True)
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py render',
+    description="Render a Mohr's circle figure for every stress state in a CSV, .npy or .npz file.")
+    parser.add_argument('input',help='CSV, .npy or .npz file of sigma_xx, sigma_yy, tau_xy (MPa)')
+    parser.add_argument('out_dir',help='directory for the figures, one file per case and format')
+    parser.add_argument('--format',nargs='+',default=['png'],choices=FORMATS,help='image formats (default png)')
+    parser.add_argument('--dpi',type=int,default=100,help='raster resolution (default %(default)s)')
+    parser.add_argument('--pdf',help='also write every case as one page of this PDF')
+    parser.add_argument('--workers',type=int,help='worker processes (default: one per core)')
+    parser.add_argument('--id-column',default='id',help='name of the optional ID column (default %(default)s)')
+    parser.add_argument('--quiet',action='store_true',help='no progress report')
+    args=parser.parse_args(argv)
+
+    start=time.perf_counter()
+    count=render_batch(read_cases(args.input,args.id_column),args.out_dir,args.format,args.dpi,
+    args.pdf,args.workers,None if args.quiet else print_progress)
+    if not args.quiet:
+        print(f"\n{count} cases rendered to {args.out_dir} in {time.perf_counter()-start:.2f} s",file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
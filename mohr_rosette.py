@@ -0,0 +1,211 @@
+import argparse
+import itertools
+import sys
+import time
+import zipfile
+import numpy as np
+from mohr_batch import CHUNK_SIZE,CsvWriter,NpyWriter,_npz_array,count_rows,print_progress,solve_chunk
+from mohr_core import _as_float_arrays
+
+#Strain gauge rosettes. Three gauge strains at known angles give the plane
+# strain state, and with E and nu the plane stress state that the Mohr solver
+# takes. Like the solver everything is vectorized, and rosette channel files
+# from the DAQ are streamed in chunks so memory stays bounded for any length.
+#
+#   python mohrs_circle_gui.py rosette daq.csv stresses.csv --E 200000 --nu 0.3 \
+#       --gauge R1=ch1,ch2,ch3 --gauge R2=ch4,ch5,ch6 --layout rectangular --microstrain
+#
+#Gauge angles are measured counterclockwise from the x axis. Inputs are CSV
+# files with a header, .npy files (structured arrays with the channel names
+# as fields, or plain 2D arrays with channels given as column numbers) or .npz
+# files with one array per channel.
+
+#gauge angles (degrees) of the standard rosettes
+ROSETTES={'rectangular':(0,45,90),'delta':(0,60,120)}
+
+#strain per microstrain
+MICROSTRAIN=1e-6
+
+########################## BEGIN CONVERSION #####################
+
+#matrix that maps (eps_x,eps_y,gamma_xy) to the strains of gauges at angles (degrees)
+def gauge_matrix(angles):
+    theta=np.radians(np.asarray(angles,dtype=float))
+    return np.column_stack([np.cos(theta)**2,np.sin(theta)**2,np.sin(theta)*np.cos(theta)])
+
+
+#plane strain state (eps_x,eps_y,gamma_xy) from three gauge strains
+def rosette_strains(eps_a,eps_b,eps_c,angles=ROSETTES['rectangular'],dtype=None):
+    eps_a,eps_b,eps_c=_as_float_arrays(eps_a,eps_b,eps_c,dtype=dtype)
+    matrix=gauge_matrix(angles)
+    if abs(np.linalg.det(matrix))<1e-9:
+        raise ValueError(f"gauge angles {tuple(angles)} do not determine the strain state")
+    #rounding keeps the exact coefficients of the standard layouts, e.g. 2,-1,-1 for gamma_xy
+    inverse=np.round(np.linalg.inv(matrix),12).astype(eps_a.dtype)
+    eps_x=inverse[0,0]*eps_a+inverse[0,1]*eps_b+inverse[0,2]*eps_c
+    eps_y=inverse[1,0]*eps_a+inverse[1,1]*eps_b+inverse[1,2]*eps_c
+    gamma_xy=inverse[2,0]*eps_a+inverse[2,1]*eps_b+inverse[2,2]*eps_c
+    return eps_x,eps_y,gamma_xy
+
+
+#plane stress state (sigma_xx,sigma_yy,tau_xy) from plane strains, E in MPa gives MPa.
+# ValueError unless -1<nu<1, the stiffness is singular at the ends.
+def plane_stress(eps_x,eps_y,gamma_xy,E,nu):
+    if not -1<nu<1:
+        raise ValueError(f"Poisson's ratio {nu:g} must be between -1 and 1")
+    scale=E/(1-nu*nu)
+    return scale*(eps_x+nu*eps_y),scale*(eps_y+nu*eps_x),E/(2*(1+nu))*gamma_xy
+
+
+#plane stress state from three gauge strains, the inputs of mohr_solve
+def rosette_stress(eps_a,eps_b,eps_c,E,nu,angles=ROSETTES['rectangular'],dtype=None):
+    return plane_stress(*rosette_strains(eps_a,eps_b,eps_c,angles,dtype),E,nu)
+
+########################## END CONVERSION #####################
+
+########################## BEGIN STREAMING #####################
+
+#chunked reader of named channels, yields (n,len(columns)) arrays. Plain .npy
+# arrays take column numbers as names.
+def read_channel_chunks(path,columns,chunk_size=CHUNK_SIZE,dtype=np.float64):
+    path=str(path)
+    if path.endswith('.csv'):
+        with open(path) as f:
+            header=[name.strip() for name in f.readline().split(',')]
+            missing=[name for name in columns if name not in header]
+            if missing:
+                raise ValueError(f"{path}: missing columns {', '.join(missing)}")
+            usecols=[header.index(name) for name in columns]
+
+            #blank lines are skipped, count_rows does not count them either
+            while True:
+                block=list(itertools.islice(f,chunk_size))
+                if not block:
+                    return
+                lines=[line for line in block if not line.isspace()]
+                if not lines:
+                    continue
+                yield np.loadtxt(lines,delimiter=',',usecols=usecols,dtype=dtype,ndmin=2)
+
+    if path.endswith('.npz'):
+        with zipfile.ZipFile(path) as archive:
+            arrays=[_npz_array(path,archive,name) for name in columns]
+    else:
+        data=np.load(path,mmap_mode='r')
+        if data.dtype.names:
+            arrays=[data[name] for name in columns]
+        else:
+            arrays=[data[:,int(name)] for name in columns]
+    for start in range(0,len(arrays[0]),chunk_size):
+        yield np.column_stack([np.asarray(a[start:start+chunk_size],dtype=dtype) for a in arrays])
+
+
+#number of samples in a channel file
+def count_samples(path,columns):
+    path=str(path)
+    if path.endswith('.csv'):
+        return count_rows(path)
+    if path.endswith('.npz'):
+        with zipfile.ZipFile(path) as archive:
+            return len(_npz_array(path,archive,columns[0]))
+    return len(np.load(path,mmap_mode='r'))
+
+
+#output columns for the rosettes, prefixed with the rosette name when there are several
+def result_fields(names,time_column=None):
+    fields=[] if time_column is None else [time_column]
+    for name in names:
+        prefix=f'{name}_' if len(names)>1 else ''
+        fields+=[prefix+field for field in ('sigma_xx','sigma_yy','tau_xy','sigma1','sigma2','tau_max','theta')]
+    return tuple(fields)
+
+
+#convert one chunk of gauge channels, columns are [time] then three per rosette
+def convert_chunk(values,rosettes,E,nu,angles,scale=1.0,time_column=False,dtype=np.float64):
+    out=[values[:,:1]] if time_column else []
+    first=1 if time_column else 0
+    for i in range(rosettes):
+        strains=values[:,first+3*i:first+3*i+3]*dtype(scale)
+        stress=rosette_stress(*strains.T,E,nu,angles,dtype=dtype)
+        out+=[np.column_stack(stress),solve_chunk(*stress,dtype=dtype)]
+    return np.hstack(out)
+
+
+#stream a channel file through the conversion and the solver into an output
+# file, gauges maps rosette names to their three channels. Returns the sample count.
+def run_rosette(input_path,output_path,gauges,E,nu,angles=ROSETTES['rectangular'],
+scale=1.0,time_column=None,chunk_size=CHUNK_SIZE,dtype=np.float64,progress=None):
+    columns=([] if time_column is None else [time_column])+[c for channels in gauges.values() for c in channels]
+    fields=result_fields(list(gauges),time_column)
+    if str(output_path).endswith('.npy'):
+        writer=NpyWriter(output_path,count_samples(input_path,columns),dtype,fields)
+    else:
+        writer=CsvWriter(output_path,with_ids=False,
+        precision=7 if np.dtype(dtype)==np.float32 else 10,fields=fields)
+
+    rows=0
+    start=time.perf_counter()
+    try:
+        for values in read_channel_chunks(input_path,columns,chunk_size,dtype):
+            writer.write(None,convert_chunk(values,len(gauges),E,nu,angles,scale,
+            time_column is not None,np.dtype(dtype).type))
+            rows+=len(values)
+            if progress is not None:
+                progress(rows,time.perf_counter()-start)
+    finally:
+        writer.close()
+    return rows
+
+########################## END STREAMING #####################
+
+#--gauge NAME=a,b,c or a,b,c into (name,channels)
+def parse_gauge(text,index):
+    name,_,channels=text.rpartition('=')
+    channels=[c.strip() for c in channels.split(',')]
+    if len(channels)!=3:
+        raise argparse.ArgumentTypeError(f"--gauge needs three channels, got {text!r}")
+    return name or f'R{index+1}',channels
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py rosette',
+    description="Convert strain gauge rosette channels to plane stress states and solve Mohr's circle.")
+    parser.add_argument('input',help='CSV, .npy or .npz file of gauge strain channels')
+    parser.add_argument('output',help='CSV or .npy file for sigma_xx, sigma_yy, tau_xy, sigma1, sigma2, '
+    'tau_max, theta of every rosette')
+    parser.add_argument('--E',type=float,required=True,help="Young's modulus (MPa)")
+    parser.add_argument('--nu',type=float,required=True,help="Poisson's ratio")
+    parser.add_argument('--gauge',action='append',required=True,metavar='[NAME=]A,B,C',
+    help='channels of one rosette in gauge angle order, repeat for more rosettes')
+    parser.add_argument('--layout',choices=ROSETTES,default='rectangular',help='rosette layout '
+    '(rectangular 0/45/90, delta 0/60/120, default %(default)s)')
+    parser.add_argument('--angles',type=float,nargs=3,help='custom gauge angles (degrees), overrides --layout')
+    parser.add_argument('--microstrain',action='store_true',help='channels are in microstrain')
+    parser.add_argument('--time-column',help='channel copied to the output as the first column')
+    parser.add_argument('--chunk-size',type=int,default=CHUNK_SIZE,help='samples per chunk (default %(default)s)')
+    parser.add_argument('--float32',action='store_true',help='compute and write in single precision')
+    parser.add_argument('--quiet',action='store_true',help='no progress report')
+    args=parser.parse_args(argv)
+
+    try:
+        gauges=dict(parse_gauge(text,i) for i,text in enumerate(args.gauge))
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if len(gauges)!=len(args.gauge):
+        parser.error('rosette names must be unique')
+    if not -1<args.nu<1:
+        parser.error("Poisson's ratio must be between -1 and 1")
+
+    start=time.perf_counter()
+    rows=run_rosette(args.input,args.output,gauges,args.E,args.nu,
+    args.angles or ROSETTES[args.layout],MICROSTRAIN if args.microstrain else 1.0,
+    args.time_column,args.chunk_size,np.float32 if args.float32 else np.float64,
+    None if args.quiet else print_progress)
+    if not args.quiet:
+        print(f"\n{rows:,} samples written to {args.output} in {time.perf_counter()-start:.2f} s",file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,447 @@
+import argparse
+import collections
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future,ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler,ThreadingHTTPServer
+from urllib.parse import parse_qs,urlsplit
+import numpy as np
+from mohr_batch import (OUT_OF_PLANE_FIELDS,RESULT_FIELDS,RESULT_FIELDS_3D,STRESS_FIELDS,
+UTILIZATION_FIELDS,solve_chunk,utilization_chunk,utilization_criteria)
+from mohr_cache import LRUCache,state_key
+from mohr_render import FORMATS,_init_worker,render_images
+
+#Local HTTP/JSON service for dashboards. The solver is served as JSON for one
+# state or many (solved in one vectorized pass), figures are served as PNG, SVG
+# or PDF by a pool of warm Agg worker processes that each keep a template
+# MohrFigure (see mohr_render). Render requests are queued, coalesced when
+# identical, cached and sent to the workers in small batches; a bounded number
+# may be pending, beyond that the service answers 503.
+#
+#   python mohrs_circle_gui.py serve --port 8350 --workers 4
+#   curl -d '{"sigma_xx":80,"sigma_yy":-40,"tau_xy":25}' localhost:8350/solve
+#   curl 'localhost:8350/render?sigma_xx=80&sigma_yy=-40&tau_xy=25&format=svg' -o case.svg
+#
+#Endpoints:
+# GET  /health    liveness check
+# GET  /metrics   request counts and latency percentiles per endpoint, pool and cache stats
+# POST /solve     {"sigma_xx":80,"sigma_yy":-40,"tau_xy":25}, arrays of components for
+#                 many states or {"states":[{...},...]}. sigma_zz, tau_xz, tau_yz make
+#                 3D states and yield_strength, tensile_strength, compressive_strength
+#                 add utilizations. Gives the batch mode result fields.
+# GET  /render    one state as query parameters, plus format (png, svg, pdf) and dpi
+# POST /render    the same as a JSON object
+#
+#The service binds to localhost by default and has no authentication.
+
+MIME_TYPES={'png':'image/png','svg':'image/svg+xml','pdf':'application/pdf'}
+STRENGTH_FIELDS=('yield_strength','tensile_strength','compressive_strength')
+
+#request limits
+MAX_BODY=64*2**20
+MAX_STATES=1_000_000
+DPI_RANGE=(10,600)
+
+#render pool defaults: pending renders, renders per worker job and the time the
+# dispatcher waits for a batch to fill (s)
+MAX_PENDING=64
+BATCH_SIZE=8
+BATCH_WAIT=0.002
+
+#recent latencies kept per endpoint for the percentiles
+LATENCY_WINDOW=2048
+
+#the render queue is full
+class Busy(Exception):
+    pass
+
+########################## BEGIN SOLVER #####################
+
+#stress component arrays of a /solve request, {name:array} with every array 1D
+# and of one length, and whether the request was a single state
+def parse_states(body):
+    if not isinstance(body,dict):
+        raise ValueError("expected a JSON object")
+    fields=STRESS_FIELDS+OUT_OF_PLANE_FIELDS
+    if 'states' in body:
+        states=body['states']
+        if not isinstance(states,list) or not all(isinstance(s,dict) for s in states):
+            raise ValueError("states must be a list of objects")
+        #only the out of plane components may be left out of a state
+        for i,state in enumerate(states):
+            missing=[name for name in STRESS_FIELDS if name not in state]
+            if missing:
+                raise ValueError(f"state {i}: missing {', '.join(missing)}")
+        present=[name for name in fields if any(name in s for s in states)]
+        columns={name:[s.get(name,0) for s in states] for name in present}
+        single=False
+    else:
+        columns={name:body[name] for name in fields if name in body}
+        single=all(np.ndim(value)==0 for value in columns.values())
+
+    missing=[name for name in STRESS_FIELDS if name not in columns]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    try:
+        arrays=np.broadcast_arrays(*(np.atleast_1d(np.asarray(value,dtype=np.float64))
+        for value in columns.values()))
+    except (TypeError,ValueError):
+        raise ValueError("stress components must be numbers or equal length arrays of numbers") from None
+    if arrays[0].ndim!=1:
+        raise ValueError("stress component arrays must be one dimensional")
+    if len(arrays[0])>MAX_STATES:
+        raise ValueError(f"at most {MAX_STATES:,} states per request")
+    if not all(np.isfinite(a).all() for a in arrays):
+        raise ValueError("stress components must be finite")
+    return dict(zip(columns,arrays)),single
+
+
+#material strengths of a request, positive numbers or None
+def parse_strengths(body):
+    strengths={}
+    for name in STRENGTH_FIELDS:
+        value=body.get(name) if isinstance(body,dict) else None
+        if value is not None and (isinstance(value,bool) or not isinstance(value,(int,float)) or value<=0):
+            raise ValueError(f"{name} must be a positive number")
+        strengths[name]=value
+    return strengths
+
+
+#solve the states of a /solve request, {field:list} or {field:number} for a single state
+def solve_states(columns,single=False,strengths=None):
+    stress=[columns[name] for name in STRESS_FIELDS]
+    is_3d=any(name in columns for name in OUT_OF_PLANE_FIELDS)
+    if is_3d:
+        stress+=[columns.get(name,np.zeros_like(stress[0])) for name in OUT_OF_PLANE_FIELDS]
+    results=solve_chunk(*stress)
+    out={name:results[:,i] for i,name in enumerate(RESULT_FIELDS_3D if is_3d else RESULT_FIELDS)}
+
+    strengths=strengths or {}
+    criteria=utilization_criteria(**strengths)
+    if criteria:
+        utilizations,rank=utilization_chunk(results,is_3d,criteria,strengths)
+        out.update({UTILIZATION_FIELDS[name]:utilizations[:,i] for i,name in enumerate(criteria)})
+    if single:
+        return {name:float(values[0]) for name,values in out.items()}
+    return {'count':len(results),**{name:values.tolist() for name,values in out.items()}}
+
+########################## END SOLVER #####################
+
+########################## BEGIN RENDER POOL #####################
+
+class RenderPool:
+
+    def __init__(self,workers=None,max_pending=MAX_PENDING,batch_size=BATCH_SIZE,
+    batch_wait=BATCH_WAIT,cache_entries=256,cache_bytes=64*2**20):
+        self.workers=workers or os.cpu_count() or 1
+        self.max_pending=max_pending
+        self.batch_size=batch_size
+        self.batch_wait=batch_wait
+        self.cache=LRUCache(cache_entries,cache_bytes)  #finished images by (state,format,dpi)
+        self.batches=0
+        self.rendered=0
+        self.coalesced=0
+        self.rejected=0
+        self._pending={}           #key -> Future of a queued or running render
+        self._lock=threading.Lock()
+        self._queue=queue.Queue()
+        self._executor=ProcessPoolExecutor(self.workers,initializer=_init_worker)
+
+        #start every worker and draw one figure in each before the first request
+        warm=[self._executor.submit(render_images,[((0,0,0),'png',DPI_RANGE[0])])
+        for _ in range(self.workers)]
+        for future in warm:
+            future.result()
+        self._thread=threading.Thread(target=self._dispatch,daemon=True)
+        self._thread.start()
+
+    #image bytes of one state, blocks until rendered. Raises Busy when
+    # max_pending renders are already waiting.
+    def render(self,stress,fmt='png',dpi=100,timeout=None):
+        key=(state_key(*stress),fmt,dpi)
+        image=self.cache.get(key)
+        if image is not None:
+            return image
+        with self._lock:
+            future=self._pending.get(key)
+            if future is not None:
+                self.coalesced+=1
+            else:
+                if len(self._pending)>=self.max_pending:
+                    self.rejected+=1
+                    raise Busy(f"{len(self._pending)} renders pending")
+                future=self._pending[key]=Future()
+                self._queue.put((key,tuple(stress),fmt,dpi,future))
+        return future.result(timeout)
+
+    #pool counters for /metrics
+    def stats(self):
+        cache=self.cache.stats()
+        with self._lock:
+            pending=len(self._pending)
+        return dict(workers=self.workers,pending=pending,max_pending=self.max_pending,
+        rendered=self.rendered,batches=self.batches,
+        mean_batch=round(self.rendered/self.batches,3) if self.batches else 0.0,
+        coalesced=self.coalesced,rejected=self.rejected,
+        cache=dict(cache._asdict(),hit_rate=round(cache.hit_rate,4)))
+
+    #stop the dispatcher and the worker processes
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._executor.shutdown(cancel_futures=True)
+
+    #collect queued renders into batches and hand them to the workers
+    def _dispatch(self):
+        while True:
+            item=self._queue.get()
+            if item is None:
+                return
+            batch=[item]
+            due=time.monotonic()+self.batch_wait
+            while len(batch)<self.batch_size:
+                try:
+                    item=self._queue.get(timeout=max(due-time.monotonic(),0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            try:
+                job=self._executor.submit(render_images,[(stress,fmt,dpi) for key,stress,fmt,dpi,future in batch])
+            except RuntimeError as e:
+                self._finish(batch,None,e)
+                continue
+            job.add_done_callback(lambda job,batch=batch: self._finish(batch,*self._outcome(job)))
+
+    @staticmethod
+    def _outcome(job):
+        try:
+            return job.result(),None
+        except BaseException as e:  #including the CancelledError of a pool shut down
+            return None,e
+
+    #deliver the images of a finished batch
+    def _finish(self,batch,images,error):
+        with self._lock:
+            self.batches+=1
+            for i,(key,stress,fmt,dpi,future) in enumerate(batch):
+                del self._pending[key]
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    self.rendered+=1
+                    self.cache.put(key,images[i])
+                    future.set_result(images[i])
+
+########################## END RENDER POOL #####################
+
+########################## BEGIN HTTP #####################
+
+#request counts and latency percentiles per endpoint over a window of recent requests
+class LatencyStats:
+
+    def __init__(self,window=LATENCY_WINDOW):
+        self.window=window
+        self._endpoints={}  #name -> [count,errors,deque of seconds]
+        self._lock=threading.Lock()
+
+    def add(self,endpoint,seconds,error=False):
+        with self._lock:
+            entry=self._endpoints.setdefault(endpoint,[0,0,collections.deque(maxlen=self.window)])
+            entry[0]+=1
+            entry[1]+=bool(error)
+            entry[2].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            entries={name:(count,errors,np.array(recent)) for name,(count,errors,recent) in self._endpoints.items()}
+        out={}
+        for name,(count,errors,recent) in entries.items():
+            p50,p95,p99=np.percentile(recent,(50,95,99))*1e3
+            out[name]=dict(count=count,errors=errors,mean_ms=round(recent.mean()*1e3,3),
+            p50_ms=round(p50,3),p95_ms=round(p95,3),p99_ms=round(p99,3),max_ms=round(recent.max()*1e3,3))
+        return out
+
+
+#(stress,format,dpi) of a render request given as query parameters or JSON
+def parse_render(params):
+    try:
+        stress=[float(params[name]) for name in STRESS_FIELDS]
+        stress+=[float(params.get(name,0)) for name in OUT_OF_PLANE_FIELDS]
+        dpi=int(params.get('dpi',100))
+    except KeyError as e:
+        raise ValueError(f"missing {e.args[0]}") from None
+    except (TypeError,ValueError):
+        raise ValueError("stress components and dpi must be numbers") from None
+    if not np.isfinite(stress).all():
+        raise ValueError("stress components must be finite")
+    fmt=params.get('format','png')
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if not DPI_RANGE[0]<=dpi<=DPI_RANGE[1]:
+        raise ValueError(f"dpi must be between {DPI_RANGE[0]} and {DPI_RANGE[1]}")
+    #plane states keep their three arguments so they share cache entries with 3-value requests
+    if not any(stress[3:]):
+        stress=stress[:3]
+    return stress,fmt,dpi
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version='HTTP/1.1'  #keep-alive, dashboards poll over one connection
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def log_message(self,format,*args):
+        if self.server.verbose:
+            super().log_message(format,*args)
+
+    def _handle(self,method):
+        start=time.perf_counter()
+        url=urlsplit(self.path)
+        route=self.ROUTES.get((method,url.path))
+        status=200
+        try:
+            if route is None:
+                status=405 if any(path==url.path for m,path in self.ROUTES) else 404
+                self._send_json(status,{'error':f"no {method} {url.path}"})
+                return
+            getattr(self,route)(url)
+        except Busy as e:
+            status=503
+            self._send_json(status,{'error':f"render queue full ({e})"},{'Retry-After':'1'})
+        except ValueError as e:
+            status=400
+            self._send_json(status,{'error':str(e)})
+        except Exception as e:
+            status=500
+            self._send_json(status,{'error':f"{type(e).__name__}: {e}"})
+        finally:
+            if route is not None:
+                self.server.latency.add(route.strip('_'),time.perf_counter()-start,status>=400)
+
+    #JSON body of a POST request
+    def _read_json(self):
+        length=int(self.headers.get('Content-Length') or 0)
+        if length<0:
+            self.close_connection=True
+            raise ValueError("negative Content-Length")
+        if length>MAX_BODY:
+            self.close_connection=True
+            raise ValueError(f"request body over {MAX_BODY} bytes")
+        try:
+            return json.loads(self.rfile.read(length) or b'{}')
+        except (UnicodeDecodeError,json.JSONDecodeError) as e:
+            raise ValueError(f"invalid JSON: {e}") from None
+
+    def _send(self,status,body,content_type,headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type',content_type)
+        self.send_header('Content-Length',str(len(body)))
+        for name,value in (headers or {}).items():
+            self.send_header(name,value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self,status,data,headers=None):
+        self._send(status,json.dumps(data).encode(),'application/json',headers)
+
+    def _health(self,url):
+        self._send_json(200,{'status':'ok'})
+
+    def _metrics(self,url):
+        self._send_json(200,{'uptime_s':round(time.monotonic()-self.server.started,3),
+        'endpoints':self.server.latency.snapshot(),'render_pool':self.server.pool.stats()})
+
+    def _solve(self,url):
+        body=self._read_json()
+        columns,single=parse_states(body)
+        self._send_json(200,solve_states(columns,single,parse_strengths(body)))
+
+    def _render_get(self,url):
+        params={name:values[-1] for name,values in parse_qs(url.query).items()}
+        self._render(*parse_render(params))
+
+    def _render_post(self,url):
+        body=self._read_json()
+        if not isinstance(body,dict):
+            raise ValueError("expected a JSON object")
+        self._render(*parse_render(body))
+
+    def _render(self,stress,fmt,dpi):
+        image=self.server.pool.render(stress,fmt,dpi,self.server.render_timeout)
+        self._send(200,image,MIME_TYPES[fmt],{'Cache-Control':'max-age=3600'})
+
+    ROUTES={('GET','/health'):'_health',('GET','/metrics'):'_metrics',('POST','/solve'):'_solve',
+    ('GET','/render'):'_render_get',('POST','/render'):'_render_post'}
+
+
+class MohrServer(ThreadingHTTPServer):
+
+    daemon_threads=True
+
+    def __init__(self,address,pool,render_timeout=60,verbose=False):
+        super().__init__(address,Handler)
+        self.pool=pool
+        self.render_timeout=render_timeout
+        self.verbose=verbose
+        self.latency=LatencyStats()
+        self.started=time.monotonic()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+
+########################## END HTTP #####################
+
+#start a server with a warm render pool, port 0 picks a free port (see server_address)
+def serve(host='127.0.0.1',port=8350,workers=None,max_pending=MAX_PENDING,batch_size=BATCH_SIZE,
+batch_wait=BATCH_WAIT,verbose=False):
+    pool=RenderPool(workers,max_pending,batch_size,batch_wait)
+    try:
+        return MohrServer((host,port),pool,verbose=verbose)
+    except Exception:
+        pool.close()
+        raise
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py serve',
+    description="Serve the Mohr's circle solver as JSON and its figures as images over HTTP.")
+    parser.add_argument('--host',default='127.0.0.1',help='address to bind (default %(default)s)')
+    parser.add_argument('--port',type=int,default=8350,help='port, 0 for any free port (default %(default)s)')
+    parser.add_argument('--workers',type=int,help='render worker processes (default: one per core)')
+    parser.add_argument('--max-pending',type=int,default=MAX_PENDING,help='renders that may wait before '
+    'requests are refused with 503 (default %(default)s)')
+    parser.add_argument('--batch-size',type=int,default=BATCH_SIZE,help='renders per worker job (default %(default)s)')
+    parser.add_argument('--batch-wait',type=float,default=BATCH_WAIT*1e3,help='time a batch may wait to fill '
+    '(ms, default %(default)s)')
+    parser.add_argument('--verbose',action='store_true',help='log every request')
+    args=parser.parse_args(argv)
+
+    server=serve(args.host,args.port,args.workers,args.max_pending,args.batch_size,
+    args.batch_wait/1e3,args.verbose)
+    host,port=server.server_address[:2]
+    print(f"serving on http://{host}:{port} with {server.pool.workers} render workers",file=sys.stderr,flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
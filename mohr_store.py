@@ -0,0 +1,307 @@
+import argparse
+import contextlib
+import csv
+import itertools
+import sqlite3
+import sys
+import time
+from typing import NamedTuple
+import numpy as np
+from mohr_batch import solve_chunk
+
+#Persistent SQLite store of solved stress states. Every state keeps its inputs
+# and the derived quantities: sigma1, sigma2 (and sigma3 for 3D states),
+# tau_max, which gives the maximum shear points T1/T2 at (center,+-tau_max),
+# and the principal angle of plane states. States belong to runs, one per batch
+# file or GUI session. Batch runs are inserted in one transaction with
+# executemany per chunk, so a run is stored completely or not at all.
+#
+#sigma1, sigma2 and tau_max are indexed, range queries such as sigma1 > 250 MPa
+# read only the matching rows:
+#
+#   python mohrs_circle_gui.py batch states.csv results.csv --store results.db
+#   python mohrs_circle_gui.py store results.db --sigma1-min 250 --limit 20
+#
+#Stored plane states reload into the figure from their stored values, see
+# StoredState.points.
+
+STRESS_COLUMNS=('sigma_xx','sigma_yy','tau_xy','sigma_zz','tau_xz','tau_yz')
+RESULT_COLUMNS=('sigma1','sigma2','sigma3','tau_max','theta')
+
+#columns with a range filter in query(), all of them indexed
+RANGE_COLUMNS=('sigma1','sigma2','tau_max')
+
+SCHEMA="""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS states (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    label TEXT,
+    sigma_xx REAL NOT NULL,
+    sigma_yy REAL NOT NULL,
+    tau_xy REAL NOT NULL,
+    sigma_zz REAL NOT NULL DEFAULT 0,
+    tau_xz REAL NOT NULL DEFAULT 0,
+    tau_yz REAL NOT NULL DEFAULT 0,
+    sigma1 REAL NOT NULL,
+    sigma2 REAL NOT NULL,
+    sigma3 REAL,            --3D states only
+    tau_max REAL NOT NULL,
+    theta REAL              --plane states only (degrees)
+);
+"""
+
+#index name -> column. A run at least as large as the stored states drops these
+# and rebuilds them before its commit, one sort per index is several times
+# faster than inserting a million random keys into each B-tree.
+INDEXES={'states_sigma1':'sigma1','states_sigma2':'sigma2','states_tau_max':'tau_max','states_run':'run'}
+
+#SQLite page cache (KiB), index inserts of large runs are much faster when the
+# indexes stay in memory
+CACHE_KIB=65536
+
+_INSERT=(f"INSERT INTO states (run,label,{','.join(STRESS_COLUMNS)},{','.join(RESULT_COLUMNS)}) "
+f"VALUES ({','.join('?'*(2+len(STRESS_COLUMNS)+len(RESULT_COLUMNS)))})")
+
+
+class StoredState(NamedTuple):
+    id: int
+    run: int
+    label: str
+    stress: tuple       #sigma_xx, sigma_yy, tau_xy, sigma_zz, tau_xz, tau_yz (MPa)
+    sigma1: float
+    sigma2: float
+    sigma3: float       #None for plane states
+    tau_max: float
+    theta: float        #None for 3D states
+
+    @property
+    def is_3d(self):
+        return self.sigma3 is not None
+
+    #critical points of a plane state from the stored values, as mohr_points
+    # returns them
+    def points(self):
+        if self.is_3d:
+            raise ValueError(f"state {self.id} is a 3D state, its in-plane points are not stored")
+        sigma_xx,sigma_yy,tau_xy=self.stress[:3]
+        center=0.5*(self.sigma1+self.sigma2)
+        return {'A':(sigma_xx,-tau_xy),'B':(sigma_yy,tau_xy),'C':(center,0.0),
+        'S1':(self.sigma1,0.0),'S2':(self.sigma2,0.0),'T1':(center,self.tau_max),
+        'T2':(center,-self.tau_max),'radius':self.tau_max,'angle':self.theta}
+
+
+_SELECT=f"SELECT id,run,label,{','.join(STRESS_COLUMNS)},{','.join(RESULT_COLUMNS)} FROM states"
+
+def _stored_state(row):
+    return StoredState(row[0],row[1],row[2],tuple(row[3:9]),*row[9:])
+
+
+#bulk writer of one run, takes chunks as run_batch solves them
+class RunWriter:
+
+    def __init__(self,conn,run):
+        self.conn=conn
+        self.run=run
+        self.rows=0
+
+    #ids may be None, stresses are 3 or 6 arrays and results the solve_chunk array
+    def write(self,ids,stresses,results):
+        n=len(stresses[0])
+        columns=[itertools.repeat(self.run,n),
+        itertools.repeat(None,n) if ids is None else (str(i) for i in np.asarray(ids).tolist())]
+        columns+=[np.asarray(s,dtype=np.float64).tolist() for s in stresses]
+        columns+=[itertools.repeat(0.0,n) for _ in range(len(STRESS_COLUMNS)-len(stresses))]
+        results=np.asarray(results[:,:4],dtype=np.float64)
+        if len(stresses)>3:  #sigma1, sigma2, sigma3, tau_max
+            columns+=[results[:,i].tolist() for i in range(4)]+[itertools.repeat(None,n)]
+        else:                #sigma1, sigma2, tau_max, theta
+            columns+=[results[:,0].tolist(),results[:,1].tolist(),itertools.repeat(None,n),
+            results[:,2].tolist(),results[:,3].tolist()]
+        self.conn.executemany(_INSERT,zip(*columns))
+        self.rows+=n
+
+
+class ResultStore:
+
+    def __init__(self,path):
+        self.path=str(path)
+        self.conn=sqlite3.connect(self.path,isolation_level=None,check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.execute(f'PRAGMA cache_size=-{CACHE_KIB}')
+        self.conn.executescript(SCHEMA)
+        self._create_indexes()
+        self._session=None  #run of single states added with add()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    #new run, returns its id
+    def begin_run(self,source):
+        cursor=self.conn.execute('INSERT INTO runs (created,source) VALUES (?,?)',
+        (time.strftime('%Y-%m-%dT%H:%M:%S'),str(source)))
+        return cursor.lastrowid
+
+    #BEGIN ... COMMIT, rolled back on errors
+    @contextlib.contextmanager
+    def transaction(self):
+        self.conn.execute('BEGIN')
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def _create_indexes(self):
+        for name,column in INDEXES.items():
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON states({column})')
+
+    #one transaction for a whole run, yields a RunWriter. rows is the expected
+    # number of states, large runs rebuild the indexes at the end.
+    @contextlib.contextmanager
+    def bulk(self,source,rows=None):
+        with self.transaction():
+            stored=self.conn.execute('SELECT max(id) FROM states').fetchone()[0] or 0
+            reindex=rows is not None and rows>=stored
+            if reindex:
+                for name in INDEXES:
+                    self.conn.execute(f'DROP INDEX IF EXISTS {name}')
+            yield RunWriter(self.conn,self.begin_run(source))
+            if reindex:
+                self._create_indexes()
+
+    #solve and store a single state, returns its id. The single states of one
+    # store object share a run.
+    def add(self,sigma_xx,sigma_yy,tau_xy,sigma_zz=0,tau_xz=0,tau_yz=0,label=None,source='gui'):
+        stress=[np.atleast_1d(np.float64(s)) for s in (sigma_xx,sigma_yy,tau_xy,sigma_zz,tau_xz,tau_yz)]
+        if not (sigma_zz or tau_xz or tau_yz):
+            stress=stress[:3]
+        with self.transaction():
+            run=self._session or self.begin_run(source)
+            RunWriter(self.conn,run).write(None if label is None else [label],stress,solve_chunk(*stress))
+            state_id=self.conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        self._session=run
+        return state_id
+
+    #stored state by id, None if there is none
+    def get(self,state_id):
+        row=self.conn.execute(_SELECT+' WHERE id=?',(int(state_id),)).fetchone()
+        return None if row is None else _stored_state(row)
+
+    #WHERE clause and parameters of a range query, bounds are inclusive
+    @staticmethod
+    def _where(ranges,run):
+        clauses,params=[],[]
+        for name,(low,high) in ranges.items():
+            if name not in RANGE_COLUMNS:
+                raise ValueError(f"no range filter on {name!r}, expected one of {', '.join(RANGE_COLUMNS)}")
+            if low is not None:
+                clauses.append(f'{name}>=?')
+                params.append(float(low))
+            if high is not None:
+                clauses.append(f'{name}<=?')
+                params.append(float(high))
+        if run is not None:
+            clauses.append('run=?')
+            params.append(int(run))
+        return (' WHERE '+' AND '.join(clauses) if clauses else ''),params
+
+    #states within ranges, e.g. query(sigma1=(250,None)) for sigma1 >= 250 MPa.
+    # Ordered by order_by (a RANGE_COLUMNS name, largest first) or by id.
+    def query(self,run=None,order_by=None,limit=None,**ranges):
+        where,params=self._where(ranges,run)
+        if order_by is not None and order_by not in RANGE_COLUMNS:
+            raise ValueError(f"cannot order by {order_by!r}, expected one of {', '.join(RANGE_COLUMNS)}")
+        sql=_SELECT+where+(f' ORDER BY {order_by} DESC' if order_by else ' ORDER BY id')
+        if limit is not None:
+            sql+=' LIMIT ?'
+            params.append(int(limit))
+        return [_stored_state(row) for row in self.conn.execute(sql,params)]
+
+    #number of states within ranges
+    def count(self,run=None,**ranges):
+        where,params=self._where(ranges,run)
+        return self.conn.execute('SELECT count(*) FROM states'+where,params).fetchone()[0]
+
+    #(id,created,source,states) of every run
+    def runs(self):
+        return self.conn.execute('SELECT runs.id,created,source,count(states.id) FROM runs '
+        'LEFT JOIN states ON states.run=runs.id GROUP BY runs.id ORDER BY runs.id').fetchall()
+
+    #delete a run and its states
+    def delete_run(self,run):
+        with self.transaction():
+            self.conn.execute('DELETE FROM states WHERE run=?',(int(run),))
+            self.conn.execute('DELETE FROM runs WHERE id=?',(int(run),))
+        if run==self._session:
+            self._session=None
+
+
+#write stored states as CSV
+def write_states(states,f):
+    writer=csv.writer(f,lineterminator='\n')
+    writer.writerow(('id','run','label')+STRESS_COLUMNS+RESULT_COLUMNS)
+    for state in states:
+        writer.writerow((state.id,state.run,state.label,*state.stress,
+        *('' if value is None else value for value in state[4:])))
+
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py store',
+    description="Query a result store written by batch --store or the GUI.")
+    parser.add_argument('database',help='SQLite result store')
+    for name in RANGE_COLUMNS:
+        flag=name.replace('_','-')
+        parser.add_argument(f'--{flag}-min',type=float,help=f'smallest {name} (MPa)')
+        parser.add_argument(f'--{flag}-max',type=float,help=f'largest {name} (MPa)')
+    parser.add_argument('--run',type=int,help='only states of this run')
+    parser.add_argument('--order-by',choices=RANGE_COLUMNS,help='sort largest first (default: by id)')
+    parser.add_argument('--limit',type=int,help='at most this many states')
+    parser.add_argument('--output',help='CSV file for the states (default stdout)')
+    parser.add_argument('--count',action='store_true',help='only print the number of matching states')
+    parser.add_argument('--runs',action='store_true',help='list the stored runs')
+    parser.add_argument('--delete-run',type=int,metavar='RUN',help='delete a run and its states')
+    args=parser.parse_args(argv)
+
+    ranges={name:(getattr(args,f'{name}_min'),getattr(args,f'{name}_max')) for name in RANGE_COLUMNS}
+    with ResultStore(args.database) as store:
+        if args.delete_run is not None:
+            store.delete_run(args.delete_run)
+            return 0
+        if args.runs:
+            print('run,created,source,states')
+            for run in store.runs():
+                print(','.join(str(value) for value in run))
+            return 0
+        if args.count:
+            print(store.count(args.run,**ranges))
+            return 0
+
+        start=time.perf_counter()
+        states=store.query(args.run,args.order_by,args.limit,**ranges)
+        f=sys.stdout if args.output is None else open(args.output,'w',newline='')
+        try:
+            write_states(states,f)
+        finally:
+            if f is not sys.stdout:
+                f.close()
+        print(f"{len(states):,} states in {time.perf_counter()-start:.3f} s",file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,426 @@
+import argparse
+import itertools
+import math
+import sys
+import time
+from typing import NamedTuple
+import numpy as np
+from matplotlib.figure import Figure
+from mohr_batch import RESULT_FIELDS,STRESS_FIELDS
+from mohr_cache import LRUCache,state_key
+from mohr_core import mohr_solve
+
+#Parameter sweeps over one or two of sigma_xx, sigma_yy and tau_xy, the other
+# components held at a base state. A grid is solved in one broadcasted
+# mohr_solve call, (n,1) against (1,m) inputs, and shown as a heatmap or filled
+# contours (line plots for one swept component).
+#
+#Grids are cached in tiles on a lattice: along every swept axis the points are
+# integer multiples of a power of 2 step, chosen from the view range and the
+# requested point count. Panning reuses the tiles already solved and only
+# solves the new ones. Halving the step of an axis (refining) keeps every
+# other lattice point along it, so a refined tile copies those from a cached
+# parent tile one level up on that axis, or on both axes, and solves only the
+# new points. The axes of a 2D sweep usually change level on different zoom
+# steps.
+#
+#   python mohrs_circle_gui.py sweep --base 80 -40 30 --axis sigma_xx -100 100 \
+#       --axis tau_xy -50 50 --points 1000 --quantity sigma1 --output sweep.png
+
+#swept components and solved quantities
+SWEEP_FIELDS=STRESS_FIELDS
+QUANTITIES=RESULT_FIELDS
+
+#lattice points per tile side for 1D and 2D sweeps
+TILE={1:4096,2:256}
+
+#tile cache memory limit
+CACHE_BYTES=512*2**20
+
+#default points per axis for 1D and 2D sweeps
+SWEEP_POINTS={1:10_000,2:1000}
+
+#level steps of the parent tiles tried for a refined tile, most shared points first
+PARENTS={1:[(1,)],2:[(1,0),(0,1),(1,1)]}
+
+#most points solved in one broadcasted call
+BATCH_POINTS=2**22
+
+VIEWS=('heatmap','contour')
+CONTOUR_LEVELS=20
+
+#filled contours are drawn from at most this many points per axis
+CONTOUR_POINTS=400
+
+########################## BEGIN GRID #####################
+
+#solved sweep, values has shape (quantities,)+(points per axis)
+class SweepGrid(NamedTuple):
+    base: tuple             #stress state of the fixed components (MPa)
+    axes: tuple             #swept component names
+    coords: tuple           #1D coordinates of every swept axis (MPa)
+    values: np.ndarray
+    solved: int             #points solved for this grid, whole tiles
+    reused: int             #points taken from the cache, whole tiles
+    elapsed: float
+
+    def quantity(self,name):
+        return self.values[QUANTITIES.index(name)]
+
+
+#check the swept component names
+def check_axes(axes):
+    axes=tuple(axes)
+    if len(axes) not in (1,2) or len(set(axes))!=len(axes):
+        raise ValueError("sweep one or two different stress components")
+    for name in axes:
+        if name not in SWEEP_FIELDS:
+            raise ValueError(f"unknown component {name}, use {', '.join(SWEEP_FIELDS)}")
+    return axes
+
+
+#solved quantities of the base state with the swept components replaced by
+# broadcastable coordinate arrays, shape (quantities,)+broadcast shape
+def solve_grid(base,axes,coords):
+    stress=list(base)
+    for name,values in zip(axes,coords):
+        stress[SWEEP_FIELDS.index(name)]=values
+    res=mohr_solve(*stress,dtype=np.float64)
+    shape=np.broadcast_shapes(*(np.shape(values) for values in coords))
+    return np.stack([np.broadcast_to(getattr(res,name),shape) for name in QUANTITIES])
+
+
+#uncached sweep on evenly spaced points, ranges are (lo,hi) per axis
+def sweep(base,axes,ranges,points):
+    start=time.perf_counter()
+    axes=check_axes(axes)
+    coords=tuple(np.linspace(lo,hi,points) for lo,hi in ranges)
+    grids=np.meshgrid(*coords,indexing='ij',sparse=True)
+    values=solve_grid(base,axes,grids)
+    return SweepGrid(tuple(base),axes,coords,values,values[0].size,0,time.perf_counter()-start)
+
+
+#lattice level (step 2**level) and first and last lattice index covering lo..hi
+# with at least points points
+def lattice(lo,hi,points):
+    if not hi>lo:
+        raise ValueError(f"empty sweep range {lo:g}..{hi:g}")
+    level=math.floor(math.log2((hi-lo)/max(points-1,1)))
+    step=2.0**level
+    return level,math.ceil(lo/step),math.floor(hi/step)
+
+
+#Tile cache of lattice sweeps, shared by any number of views. Tiles are keyed
+# by the swept axes, the fixed components, the lattice levels and the tile index.
+class GridCache:
+
+    def __init__(self,max_bytes=CACHE_BYTES):
+        self.tiles=LRUCache(None,max_bytes)
+
+    #sweep on the lattice points covering ranges, points per axis or at most
+    # twice that
+    def sweep(self,base,axes,ranges,points):
+        start=time.perf_counter()
+        axes=check_axes(axes)
+        ndim=len(axes)
+        size=TILE[ndim]
+        fixed=state_key(*(s for name,s in zip(SWEEP_FIELDS,base) if name not in axes))
+        lattices=[lattice(lo,hi,points) for lo,hi in ranges]
+        levels=tuple(level for level,_,_ in lattices)
+        steps=[2.0**level for level in levels]
+        prefix=(axes,fixed)
+
+        #cached tiles, refined parents and the tiles left to solve
+        tiles={}
+        missing=[]
+        solved=reused=0
+        for index in itertools.product(*(range(i0//size,i1//size+1) for _,i0,i1 in lattices)):
+            tile=self.tiles.get((prefix,levels,index))
+            if tile is not None:
+                reused+=tile[0].size
+            else:
+                tile,copied=self._refine(base,axes,prefix,levels,steps,index,size)
+                if tile is None:
+                    missing.append(index)
+                    continue
+                reused+=copied
+                solved+=tile[0].size-copied
+                self.tiles.put((prefix,levels,index),tile)
+            tiles[index]=tile
+
+        #new tiles in batches of one broadcasted call each
+        per_batch=max(1,BATCH_POINTS//size**ndim)
+        for first in range(0,len(missing),per_batch):
+            batch=missing[first:first+per_batch]
+            coords=[]
+            for k in range(ndim):
+                values=(np.array([index[k] for index in batch])[:,None]*size+np.arange(size))*steps[k]
+                shape=[len(batch)]+[1]*ndim
+                shape[k+1]=size
+                coords.append(values.reshape(shape))
+            values=solve_grid(base,axes,coords)
+            for j,index in enumerate(batch):
+                tile=values[:,j].copy()
+                tiles[index]=tile
+                self.tiles.put((prefix,levels,index),tile)
+            solved+=values[0].size
+
+        #copy the requested part of every tile
+        out=np.empty((len(QUANTITIES),)+tuple(i1-i0+1 for _,i0,i1 in lattices))
+        for index,tile in tiles.items():
+            src=[slice(None)]
+            dst=[slice(None)]
+            for t,(_,i0,i1) in zip(index,lattices):
+                a,b=max(i0,t*size),min(i1+1,(t+1)*size)
+                src.append(slice(a-t*size,b-t*size))
+                dst.append(slice(a-i0,b-i0))
+            out[tuple(dst)]=tile[tuple(src)]
+        coords=tuple(np.arange(i0,i1+1)*step for (_,i0,i1),step in zip(lattices,steps))
+        return SweepGrid(tuple(base),axes,coords,out,solved,reused,time.perf_counter()-start)
+
+    #tile refined from a cached parent one level up on some of the axes: the
+    # points with even lattice indices along those axes are copied, the others
+    # solved. Returns the tile and the copied point count, (None,0) when no
+    # parent is cached.
+    def _refine(self,base,axes,prefix,levels,steps,index,size):
+        for deltas in PARENTS[len(index)]:
+            parent=self.tiles.get((prefix,tuple(level+d for level,d in zip(levels,deltas)),
+            tuple(i//2 if d else i for i,d in zip(index,deltas))),None)
+            if parent is not None:
+                break
+        else:
+            return None,0
+        half=size//2
+        coords=[(i*size+np.arange(size))*step for i,step in zip(index,steps)]
+        tile=np.empty_like(parent)
+        tile[(slice(None),)+tuple(slice(0,None,2) if d else slice(None) for d in deltas)]=parent[
+        (slice(None),)+tuple(slice((i%2)*half,(i%2)*half+half) if d else slice(None)
+        for i,d in zip(index,deltas))]
+
+        #points odd along a refined axis and even along the refined axes before it
+        refined=[k for k,d in enumerate(deltas) if d]
+        for n,k in enumerate(refined):
+            select=[slice(None)]*len(index)
+            for j in refined[:n]:
+                select[j]=slice(0,None,2)
+            select[k]=slice(1,None,2)
+            tile[(slice(None),)+tuple(select)]=solve_grid(base,axes,
+            np.ix_(*(c[sel] for c,sel in zip(coords,select))))
+        return tile,tile[0].size>>len(refined)
+
+    def clear(self):
+        self.tiles.clear()
+
+########################## END GRID #####################
+
+########################## BEGIN MATPLOTLIB #####################
+
+#axis labels of components and quantities
+LABELS={'sigma_xx':'\u03C3xx (MPa)','sigma_yy':'\u03C3yy (MPa)','tau_xy':'\u03C4xy (MPa)',
+'sigma1':'\u03C31 (MPa)','sigma2':'\u03C32 (MPa)','tau_max':'\u03C4max (MPa)','theta':'\u03B8p (deg)'}
+
+#Sweep view, a heatmap or filled contours of one quantity over a 2D sweep, or
+# the principal stresses and angle along a 1D sweep. The heatmap and the lines
+# are updated in place; filled contours can not be, they are drawn again on
+# every update.
+class SweepFigure:
+
+    def __init__(self,ndim,fig=None,view='heatmap'):
+        if view not in VIEWS:
+            raise ValueError(f"view must be one of {', '.join(VIEWS)}")
+        if fig is None:
+            fig=Figure(figsize=(10,6))
+        self.fig=fig
+        self.ndim=ndim
+        self.view=view
+        self.contours=None
+        ax=self.ax=fig.add_subplot()
+        self.title=ax.set_title('')
+        if ndim==2:
+            self.image=ax.imshow(np.zeros((2,2)),origin='lower',extent=(0,1,0,1),cmap='viridis',
+            interpolation='nearest',aspect='auto',visible=view=='heatmap')
+            self.colorbar=fig.colorbar(self.image,ax=ax)
+        else:
+            ax.grid(True)
+            self.lines={name:ax.plot([],[],label=LABELS[name])[0] for name in QUANTITIES[:3]}
+            self.theta_ax=ax.twinx()
+            self.lines['theta'],=self.theta_ax.plot([],[],'k--',label=LABELS['theta'])
+            self.theta_ax.set_ylabel(LABELS['theta'])
+            ax.set_ylabel('Stress (MPa)')
+            ax.legend(handles=list(self.lines.values()),loc='upper left')
+
+    #show a SweepGrid, quantity is the 2D sweep quantity
+    def update(self,grid,quantity='sigma1'):
+        ax=self.ax
+        x=grid.coords[0]
+        ax.set_xlabel(LABELS[grid.axes[0]])
+        fixed=', '.join(f'{name} = {s:g}' for name,s in zip(SWEEP_FIELDS,grid.base) if name not in grid.axes)
+        if self.ndim==1:
+            for name,line in self.lines.items():
+                line.set_data(x,grid.quantity(name))
+            for a in (ax,self.theta_ax):
+                a.relim()
+                a.autoscale_view()
+            ax.set_xlim(x[0],x[-1])
+            self.title.set_text(f"{len(x):,} points, {fixed} MPa")
+            self.fig.stale=True
+            return self.fig
+
+        y=grid.coords[1]
+        values=grid.quantity(quantity)
+        low,high=float(values.min()),float(values.max())
+        if high<=low:
+            high=low+1e-9*(1+abs(low))
+        self.image.set_clim(low,high)
+        if self.view=='heatmap':
+            dx,dy=(x[1]-x[0] if len(x)>1 else 1)/2,(y[1]-y[0] if len(y)>1 else 1)/2
+            self.image.set_data(values.T)
+            self.image.set_extent((x[0]-dx,x[-1]+dx,y[0]-dy,y[-1]+dy))
+        else:
+            if self.contours is not None:
+                self.contours.remove()
+            sx=max(1,len(x)//CONTOUR_POINTS)
+            sy=max(1,len(y)//CONTOUR_POINTS)
+            self.contours=ax.contourf(x[::sx],y[::sy],values[::sx,::sy].T,
+            levels=np.linspace(low,high,CONTOUR_LEVELS+1),cmap=self.image.get_cmap(),norm=self.image.norm)
+        ax.set_xlim(x[0],x[-1])
+        ax.set_ylim(y[0],y[-1])
+        ax.set_ylabel(LABELS[grid.axes[1]])
+        self.colorbar.set_label(LABELS[quantity])
+        self.title.set_text(f"{values.size:,} points, {fixed} MPa")
+        self.fig.stale=True
+        return self.fig
+
+
+#Interactive sweep: the mouse wheel zooms about the cursor and dragging pans.
+# The view is solved again from the GridCache after every zoom step and at
+# the end of every drag, so only new lattice points are solved.
+# on_update(grid) is called after every update.
+class SweepExplorer:
+
+    #zoom factor of one mouse wheel step
+    ZOOM=0.8
+
+    def __init__(self,sweep_fig,cache,base,axes,ranges,points,quantity='sigma1',on_update=None):
+        self.sweep_fig=sweep_fig
+        self.cache=cache
+        self.base=tuple(base)
+        self.axes=check_axes(axes)
+        self.ranges=[tuple(r) for r in ranges]
+        self.points=points
+        self.quantity=quantity
+        self.on_update=on_update
+        self.grid=None
+        self.press=None
+        canvas=sweep_fig.fig.canvas
+        self.cids=[canvas.mpl_connect('scroll_event',self._on_scroll),
+        canvas.mpl_connect('button_press_event',self._on_press),
+        canvas.mpl_connect('motion_notify_event',self._on_motion),
+        canvas.mpl_connect('button_release_event',self._on_release)]
+        self.refresh()
+
+    def refresh(self):
+        self.grid=self.cache.sweep(self.base,self.axes,self.ranges,self.points)
+        self.show()
+
+    def show(self):
+        self.sweep_fig.update(self.grid,self.quantity)
+        self.sweep_fig.fig.canvas.draw_idle()
+        if self.on_update is not None:
+            self.on_update(self.grid)
+
+    def set_quantity(self,quantity):
+        self.quantity=quantity
+        self.show()
+
+    def disconnect(self):
+        for cid in self.cids:
+            self.sweep_fig.fig.canvas.mpl_disconnect(cid)
+
+    #cursor position per swept axis, None outside the axes
+    def _position(self,event):
+        if event.inaxes not in (self.sweep_fig.ax,getattr(self.sweep_fig,'theta_ax',None)):
+            return None
+        x,y=self.sweep_fig.ax.transData.inverted().transform((event.x,event.y))
+        return (x,y)[:len(self.axes)]
+
+    def _on_scroll(self,event):
+        position=self._position(event)
+        if position is None:
+            return
+        factor=self.ZOOM if event.button=='up' else 1/self.ZOOM
+        self.ranges=[(c-(c-lo)*factor,c+(hi-c)*factor) for c,(lo,hi) in zip(position,self.ranges)]
+        self.refresh()
+
+    #the pixel to data transform is frozen at the press, so the drag is measured
+    # against the limits it started from
+    def _on_press(self,event):
+        if event.button==1 and self._position(event) is not None:
+            to_data=self.sweep_fig.ax.transData.frozen().inverted()
+            self.press=to_data,to_data.transform((event.x,event.y)),list(self.ranges)
+
+    #the view follows the drag, the grid is solved on release
+    def _on_motion(self,event):
+        if self.press is None or event.x is None:
+            return
+        to_data,start,ranges=self.press
+        shift=to_data.transform((event.x,event.y))-start
+        shifted=[(lo-d,hi-d) for d,(lo,hi) in zip(shift,ranges)]
+        self.sweep_fig.ax.set_xlim(*shifted[0])
+        if len(shifted)>1:
+            self.sweep_fig.ax.set_ylim(*shifted[1])
+        self.sweep_fig.fig.canvas.draw_idle()
+
+    def _on_release(self,event):
+        if self.press is None:
+            return
+        press,self.press=self.press,None
+        ax=self.sweep_fig.ax
+        ranges=[ax.get_xlim(),ax.get_ylim()][:len(self.axes)]
+        if ranges!=press[2]:
+            self.ranges=[tuple(map(float,r)) for r in ranges]
+            self.refresh()
+
+###################### END MATPLOTLIB ########################
+
+#command line entry point
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='mohrs_circle_gui.py sweep',
+    description="Sweep one or two stress components and map the principal stresses and angle.")
+    parser.add_argument('--base',nargs=3,type=float,default=(0,0,0),metavar=('SXX','SYY','TXY'),
+    help='base state, the swept components are replaced (MPa, default 0 0 0)')
+    parser.add_argument('--axis',nargs=3,action='append',required=True,metavar=('NAME','LO','HI'),
+    help=f"swept component ({', '.join(SWEEP_FIELDS)}) and range (MPa), once or twice")
+    parser.add_argument('--points',type=int,help='least points per axis, the lattice has below twice '
+    'that (default 10000 for 1D, 1000 for 2D)')
+    parser.add_argument('--exact',action='store_true',help='exactly POINTS evenly spaced points from LO '
+    'to HI instead of the cache lattice')
+    parser.add_argument('--quantity',choices=QUANTITIES,default='sigma1',help='2D map quantity (default %(default)s)')
+    parser.add_argument('--view',choices=VIEWS,default='heatmap',help='2D map view (default %(default)s)')
+    parser.add_argument('--output',help='image file of the sweep')
+    parser.add_argument('--save',help='.npz file of the coordinates and solved quantities')
+    parser.add_argument('--dpi',type=int,default=100,help='raster resolution (default %(default)s)')
+    args=parser.parse_args(argv)
+
+    try:
+        axes=check_axes(name for name,_,_ in args.axis)
+        ranges=[(float(lo),float(hi)) for _,lo,hi in args.axis]
+        points=args.points or SWEEP_POINTS[len(axes)]
+        if args.exact:
+            grid=sweep(args.base,axes,ranges,points)
+        else:
+            grid=GridCache().sweep(args.base,axes,ranges,points)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{grid.values[0].size:,} points solved in {grid.elapsed:.3f} s",file=sys.stderr)
+
+    if args.save:
+        np.savez(args.save,**{name:c for name,c in zip(axes,grid.coords)},
+        **{name:grid.quantity(name) for name in QUANTITIES})
+    if args.output:
+        SweepFigure(len(axes),view=args.view).update(grid,args.quantity).savefig(args.output,dpi=args.dpi)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import threading
+import time
+
+#Background worker used by the GUI so that solving and preparing a figure never
+# runs on the Tk thread. Only the newest request matters: submitting a new one
+# replaces any request that has not started yet, and results of requests that
+# were superseded while running are dropped instead of delivered.
+
+class DebouncedWorker:
+
+    def __init__(self,func,callback,delay=0.25):
+        self.func=func            #work to run, func(*args) -> result
+        self.callback=callback    #callback(generation,result,error), called on the worker thread
+        self.delay=delay          #quiet time (s) required before a request runs
+        self.generation=0
+        self._request=None
+        self._closed=False
+        self._cond=threading.Condition()
+        self._thread=threading.Thread(target=self._run,daemon=True)
+        self._thread.start()
+
+    #queue a request, returns its generation number
+    def submit(self,*args,delay=None):
+        if delay is None:
+            delay=self.delay
+        with self._cond:
+            self.generation+=1
+            self._request=(self.generation,args,time.monotonic()+delay)
+            self._cond.notify()
+            return self.generation
+
+    #drop the pending request and any result still in flight
+    def cancel(self):
+        with self._cond:
+            self.generation+=1
+            self._request=None
+
+    #true if no newer request was submitted or cancelled after this one
+    def is_current(self,generation):
+        return generation==self.generation
+
+    #stop the worker thread
+    def close(self,timeout=None):
+        with self._cond:
+            self._closed=True
+            self._request=None
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._request is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+
+                #debounce, a newer submit() restarts the wait
+                generation,args,due=self._request
+                remaining=due-time.monotonic()
+                if remaining>0:
+                    self._cond.wait(remaining)
+                    continue
+                self._request=None
+
+            try:
+                result,error=self.func(*args),None
+            except Exception as e:
+                result,error=None,e
+
+            #a newer request is already queued, the result is stale
+            if self.is_current(generation):
+                self.callback(generation,result,error)
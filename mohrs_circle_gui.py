@@ -1,557 +1,773 @@
-import numpy as np
-import matplotlib.pyplot as plt
-import math
-import matplotlib.transforms as trans
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import PySimpleGUI as sg
-import matplotlib
+import importlib
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+#cold start reference, used to report time to first window
+START_TIME=time.perf_counter()
+
+from mohr_cache import LRUCache,state_key
+from mohr_core import mohr_solve,mohr_points
+from mohr_plot import (AngleScrubber,CriticalPlaneOverlay,FailureOverlay,MohrFigure,mohrs_circle,
+prepare_frame)
+from mohr_profile import TIMER,capture,stage
+from mohr_worker import DebouncedWorker
+
+#Importing this module is cheap and headless: the solver (mohr_core) and the
+# figure builder (mohr_plot) never touch Tk. PySimpleGUI and the TkAgg canvas
+# are only imported once main() starts the GUI, and the feature modules (sweep,
+# Monte Carlo, field, store, export...) by the window or handler that uses them.
 
-#The following line allows PySimpleGUI to work on Mac, you may have to remove 
-# this if you are using a windows system.
-matplotlib.use("TkAgg")
+###################### BEGIN PYSIMPLEGUI ###########################
 
-#set GUI theme
-sg.theme('NeutralBlue')
+#stress input keys, in mohrs_circle argument order
+STRESS_KEYS=('-sigma_xx-','-sigma_yy-','-tau_xy-')
 
-########################## BEGIN MATPLOTLIB #####################
+#optional out of plane inputs for 3D states, blank means zero
+OUT_OF_PLANE_KEYS=('-sigma_zz-','-tau_xz-','-tau_yz-')
 
-######### initial plot ##########
+#quiet time after the last keystroke before a live recalculation starts (s)
+LIVE_DELAY=0.25
 
-#plot initialization
-fig,(ax1,ax2)=plt.subplots(ncols=2)
-fig.set_size_inches(12,6)
-ax1.grid(True)
+#cache limits, prepared frames by count and rendered figures by count and memory
+FRAME_CACHE_SIZE=256
+RENDER_CACHE_SIZE=32
+RENDER_CACHE_BYTES=256*2**20
 
-#mark axes
-ax1.axhline(color='k')
-ax1.axvline(color='k')
+#stress states closer than this (MPa) share cache entries, None for exact keys
+CACHE_QUANTUM=None
 
-#set aspect ratios of subplots to 1, add artists
-ax1.set_aspect(1)
-ax2.set_aspect(1)
+#stage timings of every recalculation are appended here while Timings is checked
+TIMINGS_LOG='mohr_timings.jsonl'
 
-#plot title, axis labels
-fig.suptitle("Mohr's Circle for Stress",y=0.93)
-ax1.set_xlabel('Sigma (MPa)')
-ax1.set_ylabel('Tau (MPa)')
-ax2.get_xaxis().set_visible(False)
-ax2.get_yaxis().set_visible(False)
+#set to time the start up and check Timings from the start
+TIMINGS_ENV='MOHR_TIMINGS'
 
-###############################
+#profilers for a single recalculation, GUI name -> capture() mode and file suffix
+PROFILE_MODES={'cProfile':('cprofile','prof'),'tracemalloc':('tracemalloc','txt')}
 
-#mohrs circle callback function
-def mohrs_circle(sigma_xx,sigma_yy,tau_xy):
+#optional material strengths for the failure criteria, blank leaves a criterion out
+STRENGTH_KEYS=('-yield_strength-','-tensile_strength-','-compressive_strength-')
 
-    #calculate A,B
-    A=(sigma_xx,-tau_xy)
-    B=(sigma_yy,tau_xy)
+#rosette inputs: gauge strains (microstrain) in gauge angle order, E (MPa) and nu
+ROSETTE_KEYS=('-eps_a-','-eps_b-','-eps_c-','-E-','-nu-')
 
-    #calculate AB line and line length
+#plane stress state of the rosette inputs, None if any is missing or not a number,
+# ValueError if nu is out of range
+def read_rosette(values):
+    from mohr_rosette import MICROSTRAIN,ROSETTES,rosette_stress
     try:
-        AB_slope=(B[1]-A[1])/(B[0]-A[0])
-    except:
-        AB_slope='undefined'
-
-    if AB_slope == 'undefined':
-        AB_linspace=np.linspace(1,1)
-        AB_line=np.linspace(A[1],B[1])
-        AB_length=math.sqrt(((B[1]-A[1])**2)+((B[0]-A[0])**2))
-    else:
-        AB_linspace=np.linspace(A[0],B[0])
-        y_intercept=A[1]-AB_slope*A[0]
-        AB_line=(AB_slope*AB_linspace)+y_intercept
-        AB_length=math.sqrt(((B[1]-A[1])**2)+((B[0]-A[0])**2))
-
-    #calculate center
-    centerx=(B[0]+A[0])/2
-    centery=(B[1]+A[1])/2
-    center=(centerx,centery)
-
-    #calculate principal stresses and points
-    S1x=centerx+(0.5*AB_length)
-    S2x=centerx-(0.5*AB_length)
-    S1=[S1x,0]
-    S2=[S2x,0]
-
-    #calculate points of maximum shear stress
-    T1=[centerx,centery+(0.5*AB_length)]
-    T2=[centerx,centery-(0.5*AB_length)]
-
-    #calculate principal angle (obtained from kite.com "how to get the angle between two vectors")
-    vector_1 = [A[0]-centerx, A[1]-centery]
-    vector_2 = [S1[0]-centerx, 0]
-
-    unit_vector_1 = vector_1 / np.linalg.norm(vector_1)
-    unit_vector_2 = vector_2 / np.linalg.norm(vector_2)
-    dot_product = np.dot(unit_vector_1, unit_vector_2)
-    mohr_theta = math.degrees(np.arccos(dot_product))
-
-    #stress element angle
-    if tau_xy < 0:
-        angle=-mohr_theta/2
-    elif tau_xy > 0:
-        angle=mohr_theta/2
-
-
-    ########################  subplot 1   #####################
-
-    #plot initialization
-    fig,(ax1,ax2)=plt.subplots(ncols=2)
-    fig.set_size_inches(12,6)
-    ax1.grid(True)
-
-    #create circle
-    circle=plt.Circle(center,(0.5*AB_length),facecolor='yellow',
-    edgecolor='black',zorder=5)
-
-    #mark axes
-    ax1.axhline(color='k')
-    ax1.axvline(color='k')
-
-    #plot A
-    ax1.plot(A[0],A[1],'bo',B[0],B[1],'bo',zorder=10)
-    #annotate A
-    ax1.annotate('A',(A[0],A[1]),xytext=(30,-15),xycoords=ax1.transData,
-    textcoords='offset pixels',bbox=dict(boxstyle="round,pad=0.3",
-    color='w',ec='k'),zorder=15)
-    #A arrow
-    ax1.annotate('',xy=(A[0],A[1]),xytext=(30,-15),xycoords=ax1.transData,
-    textcoords='offset pixels',arrowprops=dict(arrowstyle='->',
-    connectionstyle='arc3'),zorder=12)
-
-    #annotate B
-    ax1.annotate('B',(B[0],B[1]),xytext=(30,-15),xycoords=ax1.transData,
-    textcoords='offset pixels',bbox=dict(boxstyle="round,pad=0.3",
-    color='w',ec='k'),zorder=15)
-    #B arrow
-    ax1.annotate('',xy=(B[0],B[1]),xytext=(30,-15),xycoords=ax1.transData,
-    textcoords='offset pixels',arrowprops=dict(arrowstyle='->',
-    connectionstyle='arc3'),zorder=12)
-
-    #plot sigma_1,sigma_2
-    ax1.plot(S1[0],S1[1],'ro',S2[0],S2[1],'ro',zorder=10)
-
-    #annotate sigma_1,sigma_2
-    ax1.annotate('\u03C3'+'1',(S1[0],S1[1]),xytext=(20,-8),xycoords=ax1.transData,
-    textcoords='offset pixels',bbox=dict(boxstyle='round,pad=0.3',color='w',ec='k'),
-    zorder=12)
-    ax1.annotate('\u03C3'+'2',(S2[0],S2[1]),xytext=(-30,-8),xycoords=ax1.transData,
-    textcoords='offset pixels',bbox=dict(boxstyle='round,pad=0.3',color='w',ec='k'),
-    zorder=12)
-
-    #plot center and AB line
-    ax1.plot(center[0],center[1],'bo',zorder=10)
-    if AB_slope == 'undefined':
-        ax1.plot(AB_linspace*A[0],AB_line,'r',zorder=9)
-    else:
-        ax1.plot(AB_linspace,AB_line,'r',zorder=9)
-
-    #plot line across principal stress points
-    S_linspace=np.linspace(S2,S1)
-    ax1.plot(S_linspace,0*S_linspace,'cornflowerblue',zorder=9)
-
-    #plot maximum/minimum shear stress
-    ax1.plot(T1[0],T1[1],'ro',zorder=10)
-    #annotate maximum shear stress
-    ax1.annotate('\u03C4'+'1',(T1[0],T1[1]),xytext=(-10,20),xycoords=ax1.transData,
-    textcoords='offset pixels',bbox=dict(boxstyle='round,pad=0.3',color='w',ec='k'),
-    zorder=12)
-    ax1.plot(T2[0],T2[1],'ro',zorder=10)
-    #annotate minimum shear stress
-    ax1.annotate('\u03C4'+'2',(T2[0],T2[1]),xytext=(-10,-30),xycoords=ax1.transData,
-    textcoords='offset pixels',bbox=dict(boxstyle='round,pad=0.3',color='w',ec='k'),
-    zorder=12)
-
-    #sigma_xx
-    ax1.text(0.03,0.95,'\u03C3'+'xx = '+str(round(sigma_xx,2))+' MPa',transform=ax1.transAxes,
-    bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=12,fontsize='small')
-
-    #sigma_yy
-    ax1.text(0.03,0.9,'\u03C3'+'yy = '+str(round(sigma_yy,2))+' MPa',transform=ax1.transAxes,
-    bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=12,fontsize='small')
-
-    #tau_xy
-    ax1.text(0.03,0.85,'\u03C4'+'xy = '+str(round(tau_xy,2))+' MPa',transform=ax1.transAxes,
-    bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=12,fontsize='small')
-
-    #critical points
-    ax1.text(0.7,0.75,'Critical Points:\nA: ('
-    +str(round(A[0],2))+', '+str(round(A[1],2))+')\nB: ('+str(round(B[0],2))+', '+
-    str(round(B[1],2))+')\n\u03C3'+'1: ('+str(round(S1[0],2))+', '+
-    str(round(S1[1],2))+')\n\u03C3'+'2: ('+str(round(S2[0],2))+', '+
-    str(round(S2[1],2))+')\n\u03C4'+'1: ('+str(round(T1[0],2))+', '+
-    str(round(T1[1],2))+')\n\u03C4'+'2: ('+str(round(T2[0],2))+', '+
-    str(round(T2[1],2))+')',bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),
-    transform=ax1.transAxes,fontsize='small')
-
-    #principal Stresses
-    ax1.text(0.05,0.05,'Principal Stresses:\n\u03C3'+'1'+'= '
-    +str(round(S1[0],2))+' MPa\n\u03C3'+'2'+'= '+str(round(S2[0],2))+' MPa',
-    bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),transform=ax1.transAxes,
-    fontsize='small')
-
-    #maximum shear stresses
-    ax1.text(0.6,0.05,'Max Shear Stresses:\n\u03C4'+'1'+'= '
-    +str(round(T1[1],2))+' MPa\n\u03C4'+'2'+'= '+str(round(T2[1],2))+' MPa',
-    bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),transform=ax1.transAxes,
-    fontsize='small')
-
-
-    ####################    subplot 2 plotting     #####################
-
-
-    ########## Element 1 ##########
-
-    #element 1 label
-    ax2.text(0.05,0.95,'Given State of Stress',bbox=dict(color='w',ec='k',
-    boxstyle='roundtooth'))
-    stress_element1=plt.Rectangle((0.65,0.65),width=0.2,height=0.2,
-    facecolor="yellow",edgecolor="black",zorder=10)
-
-    #plot element1 center dot
-    ax2.plot(0.75,0.75,'bo',scalex=False,scaley=False,zorder=15)
-
-    #element1 axes
-    xaxis1=np.linspace(.75,.975)
-    yaxis1=np.linspace(.75,.975)
-
-    #plot element1 axes
-    ax2.plot(xaxis1,0*xaxis1+0.75,'r',scalex=False,scaley=False,zorder=11,
-    linestyle='--',linewidth=2.0)
-    ax2.plot(0*yaxis1+0.75,yaxis1,'r',scalex=False,scaley=False,zorder=11,
-    linestyle='--',linewidth=2.0)
-
-    #sigma_xx
-    if sigma_xx>0:
-        #right
-        ax2.annotate("",xy=(0.975,0.75),xytext=(0.85,0.75),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #left
-        ax2.annotate("",xy=(0.525,0.75),xytext=(0.65,0.75),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        ax2.text(0.05,0.875,'\u03C3'+'xx = '+str(round(sigma_xx,2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    elif sigma_xx<0:
-        #right
-        ax2.annotate("",xy=(0.85,0.75),xytext=(0.975,0.75),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #left
-        ax2.annotate("",xy=(0.65,0.75),xytext=(0.525,0.75),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        ax2.text(0.05,0.875,'\u03C3'+'xx = '+str(round(sigma_xx,2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    else:
-        pass
-
-    #sigma_yy
-    if sigma_yy>0:
-        #top
-        ax2.annotate("",xy=(0.75,0.975),xytext=(0.75,0.85),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #bottom
-        ax2.annotate("",xy=(0.75,0.525),xytext=(0.75,0.65),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        ax2.text(0.05,0.8,'\u03C3'+'yy = '+str(round(sigma_yy,2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    elif sigma_yy<0:
-        #top
-        ax2.annotate("",xy=(0.75,0.85),xytext=(0.75,0.975),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #bottom
-        ax2.annotate("",xy=(0.75,0.65),xytext=(0.75,0.525),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        ax2.text(0.05,0.8,'\u03C3'+'yy = '+str(round(sigma_yy,2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    else:
-        pass
-
-    #tau_xy
-    if tau_xy>0:
-        #top
-        ax2.annotate("",xy=(0.85,0.885),xytext=(0.65,0.885),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #right
-        ax2.annotate("",xy=(0.885,0.85),xytext=(0.885,0.65),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #bottom
-        ax2.annotate("",xy=(0.65,0.615),xytext=(0.85,0.615),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #left
-        ax2.annotate("",xy=(0.615,0.65),xytext=(0.615,0.85),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        ax2.text(0.05,0.725,'\u03C4'+'xy = '+str(round(tau_xy,2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    elif tau_xy<0:
-        #top
-        ax2.annotate("",xy=(0.85,0.885),xytext=(0.65,0.885),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #right
-        ax2.annotate("",xy=(0.885,0.65),xytext=(0.885,0.85),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #bottom
-        ax2.annotate("",xy=(0.65,0.615),xytext=(0.85,0.615),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        #left
-        ax2.annotate("",xy=(0.615,0.85),xytext=(0.615,0.65),
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=15)
-        ax2.text(0.05,0.725,'\u03C4'+'xy = '+str(round(tau_xy,2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    else:
-        pass
-
-    ######## element 2 ########
-
-    #element 2 label
-    ax2.text(0.05,0.5,'Principal Stresses',bbox=dict(color='w',ec='k',
-    boxstyle='roundtooth'))
-
-    #create rectangle
-    stress_element2=plt.Rectangle((0.65,0.125),width=0.2,height=0.2,
-    transform=trans.Affine2D().rotate_deg_around(*(0.75,0.225),angle)+ax2.transAxes,
-    facecolor="yellow",edgecolor="black",zorder=10)
-
-    #element2 middle dot
-    ax2.plot(0.75,0.225,'bo',scalex=False,scaley=False,zorder=15)
-
-    #element2 axes
-    xaxis2=np.linspace(.75,.975)
-    yaxis2=np.linspace(.225,.455)
-
-    #plot element2 axes
-    ax2.plot(xaxis2,0*xaxis2+0.225,'r',scalex=False,scaley=False,zorder=11,
-    linestyle='--',linewidth=2.0)
-    ax2.plot(0*yaxis2+0.75,yaxis2,'r',scalex=False,scaley=False,zorder=11,
-    linestyle='--',linewidth=2.0)
-
-    #S1 arrow
-    s=trans.Affine2D().rotate_deg(angle).translate(0.75,0.225)+ax2.transAxes
-
-    #element2 new axes
-    axis3=np.linspace(0,.225)
-
-    #plot element2 new axes
-    ax2.plot(axis3,0*axis3,'cornflowerblue',scalex=False,scaley=False,transform=s,
-    zorder=11,linestyle='--',linewidth=2.0)
-    ax2.plot(0*axis3,axis3,'cornflowerblue',scalex=False,scaley=False,transform=s,
-    zorder=11,linestyle='--',linewidth=2.0)
-
-    if S1[0]>0:
-        #right
-        ax2.annotate('',xy=(0.225,0),xytext=(0.1,0),
-        xycoords=s, 
-        textcoords=s,
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=11)
-        #left
-        ax2.annotate('',xy=(-0.225,0),xytext=(-0.1,0),
-        xycoords=s, 
-        textcoords=s,
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=11)
-        ax2.text(0.05,0.4,'\u03C3'+'1 = '+str(round(S1[0],2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    elif S1[0]<0:
-        #right
-        ax2.annotate('',xy=(0,0.1),xytext=(0,0.225),
-        xycoords=s, 
-        textcoords=s,
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=11)
-        #left
-        ax2.annotate('',xy=(0,-0.1),xytext=(0,-0.225),
-        xycoords=s, 
-        textcoords=s,
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=11)
-        ax2.text(0.05,0.4,'\u03C3'+'1 = '+str(round(S1[0],2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    else:
-        pass
-
-    #S2 arrow
-    t=trans.Affine2D().rotate_deg(angle).translate(0.75,0.225)+ax2.transAxes
-
-    if S2[0]>0:
-        #top
-        ax2.annotate('',xy=(0,0.225),xytext=(0,0.1),
-        xycoords=t, 
-        textcoords=t,
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=11)
-        #bottom
-        ax2.annotate('',xy=(0,-0.225),xytext=(0,-0.1),
-        xycoords=t, 
-        textcoords=t,
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=11)
-        ax2.text(0.05,0.3,'\u03C3'+'2 = '+str(round(S2[0],2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    elif S2[0]<0:
-        #top
-        ax2.annotate('',xy=(0,0.1),xytext=(0,0.225),
-        xycoords=t, 
-        textcoords=t,
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=11)
-        #bottom
-        ax2.annotate('',xy=(0,-0.1),xytext=(0,-0.225),
-        xycoords=t, 
-        textcoords=t,
-        arrowprops=dict(arrowstyle='->',connectionstyle='arc3'),zorder=11)
-        ax2.text(0.05,0.3,'\u03C3'+'2 = '+str(round(S2[0],2))+' MPa',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10)
-    else:
-        pass
-
-    #theta arrow
-    if angle < 0:
-        ax2.annotate('',xy=(0,0.225),xytext=(0.75,0.45),
-            xycoords=t,
-            textcoords=ax2.transAxes, 
-            arrowprops=dict(arrowstyle='->',
-            connectionstyle=f'angle3,angleA=0,angleB={angle}',zorder=11))
-        
-        #theta text
-        ax2.text(0.775,0.475,r'$\theta$'+' = '+str(round(angle,2))+u'\N{DEGREE SIGN}',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10,
-        size='small')
-
-    elif angle > 0:
-        ax2.annotate('',xy=(0,0.225),xytext=(0.75,0.45),
-            xycoords=t,
-            textcoords=ax2.transAxes, 
-            arrowprops=dict(arrowstyle='->',
-            connectionstyle=f'angle3,angleB={angle},angleA=0',zorder=11))
-        
-        #theta text
-        ax2.text(0.575,0.475,r'$\theta$'+' = '+str(round(angle,2))+u'\N{DEGREE SIGN}',
-        bbox=dict(boxstyle="round,pad=0.3",color='w',ec='k'),zorder=10,
-        size='small')
-
-
-    ###########   plot adjustments   ##############
-
-    #center mohr's circle and define data limits
-    ax1.margins(0.7)
-
-    #set aspect ratios of subplots to 1, add artists
-    ax1.set_aspect(1)
-    ax2.set_aspect(1)
-    ax1.add_artist(circle)
-    ax2.add_artist(stress_element1)
-    ax2.add_artist(stress_element2)
-
-    #plot title, axis labels
-    fig.suptitle("Mohr's Circle for Stress",y=0.93)
-    ax1.set_xlabel('Sigma (MPa)')
-    ax1.set_ylabel('Tau (MPa)')
-    ax2.get_xaxis().set_visible(False)
-    ax2.get_yaxis().set_visible(False)
-
-    fig2=plt.gcf()
-    return fig2
-
-###################### END MATPLOTLIB ########################
+        eps_a,eps_b,eps_c,E,nu=(float(values[key]) for key in ROSETTE_KEYS)
+    except ValueError:
+        return None
+    stress=rosette_stress(eps_a*MICROSTRAIN,eps_b*MICROSTRAIN,eps_c*MICROSTRAIN,E,nu,
+    ROSETTES[values['-ROSETTE-']])
+    return tuple(float(s) for s in stress)
 
-###################### BEGIN PYSIMPLEGUI ###########################
+#standard deviations of the stress inputs (MPa) for Monte Carlo, blank means exact
+UNCERTAINTY_KEYS=('-std_sigma_xx-','-std_sigma_yy-','-std_tau_xy-')
 
-#draw figure
-def draw_figure(canvas, figure):
-    figure_canvas_agg = FigureCanvasTkAgg(figure, canvas)
-    figure_canvas_agg.draw()
-    figure_canvas_agg.get_tk_widget().pack(side="top", fill="both", expand=1)
-    return figure_canvas_agg
+#Monte Carlo sample counts offered
+MC_SAMPLES=(10**5,10**6,10**7)
 
-#input layout
-input_layout=[[sg.T("\u03C3xx (MPa):"),sg.Input(size=(10,50),key="-sigma_xx-",enable_events=True)],
-            [sg.T("\u03C3yy (MPa):"),sg.Input(size=(10,50),key="-sigma_yy-",enable_events=True)],
-            [sg.T("\u03C4xy (MPa):"),sg.Input(size=(10,50),key="-tau_xy-",enable_events=True)],
-            [sg.Button("Calculate"),sg.Exit()]]
+#sweep range inputs (MPa) of the first and the optional second swept component
+SWEEP_RANGE_KEYS=('-SWEEP_X_LO-','-SWEEP_X_HI-','-SWEEP_Y_LO-','-SWEEP_Y_HI-')
 
-#contain inputs in frame
-input_frame=[[sg.Frame('Inputs',input_layout,pad=(0,0),element_justification='center')]]
+#result store file, set the environment variable to save every state from the start
+STORE_DB='mohr_results.db'
+STORE_ENV='MOHR_STORE'
 
-#column element for input layout
-input_column=sg.Column(input_frame, justification='center')
+#most states listed by Find
+FIND_LIMIT=200
 
-#project description
-description=[[sg.T("""This GUI takes inputs for a 2D state of stress and generates
-Mohr's circle, complete with principal stresses, maximum shear stresses, and 
-the principal angle. Please input float or integer values for your state of stress.""",expand_x=True)]]
+#default export file and resolutions offered for it
+EXPORT_PATH='mohrs_circle.png'
+EXPORT_DPIS=(100,200,300,600)
 
-#WINDOW LAYOUT
-layout=[
-    [sg.Canvas(key="-CANVAS-",expand_x=True,expand_y=True)],
-    [sg.Column(description,justification='center'),input_column],
-    [sg.T("Status:"),sg.StatusBar(size=(50,1),text="",key="-STATUS-",text_color='black',
-    background_color='white',auto_size_text=True,expand_x=True)]
-]
+#frame budget and rate of load history playback
+HISTORY_FRAMES=1000
+HISTORY_FPS=30
 
-#create the form and show it without the plot
-window = sg.Window(
-    "Python - Mohr's Circle Solver",
-    layout,
-    location=(0, 0),
-    finalize=True,
-    resizable=True,
-    element_justification="center",
-    font="Helvetica 18",
-)
-window.maximize()
-
-#add plot to window
-fig_agg=draw_figure(window["-CANVAS-"].TKCanvas, fig)
-
-
-while True:  #event loop
-    i=0 #reset counter
-    event, values = window.read()    
-    if event == sg.WIN_CLOSED or event == 'Exit': #close program
-        break 
-    elif event == '-sigma_xx-' and values['-sigma_xx-']: #check for non-float values
+#parse the strength inputs into FailureOverlay.update keywords
+def read_strengths(values):
+    strengths={}
+    for key in STRENGTH_KEYS:
         try:
-            float_check1=float(values['-sigma_xx-'])
-        except:
-            if len(values['-sigma_xx-']) == 1 and values['-sigma_xx-'][0] == '-':
+            strengths[key.strip('-')]=float(values[key]) or None
+        except ValueError:
+            strengths[key.strip('-')]=None
+    return strengths
+
+#parse the stress inputs, None if any is missing or not a number
+def read_stress(values):
+    try:
+        return (tuple(float(values[key]) for key in STRESS_KEYS)
+        +tuple(float(values[key] or 0) for key in OUT_OF_PLANE_KEYS))
+    except ValueError:
+        return None
+
+#redraw the canvas, restoring the rendered figure from the cache when this key
+# was drawn before. The cached buffer is the scrubber background (everything but
+# the animated overlay), returns True on a cache hit.
+def redraw(fig_agg,scrubber,renders,key):
+    background=renders.get(key)
+    if background is None:
+        with stage('draw'):
+            fig_agg.draw() #draws now so the scrubber caches the new background
+        renders.put(key,scrubber.background)
+        return False
+    with stage('restore'):
+        for ax in scrubber.mohr_fig.fig.axes:
+            ax.apply_aspect() #normally done by the draw, the overlay needs the new layout
+        scrubber.background=background
+        scrubber.set_angle(scrubber.theta)
+    return True
+
+#draw figure
+def draw_figure(canvas, figure):
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    with stage('canvas'):
+        figure_canvas_agg = FigureCanvasTkAgg(figure, canvas)
+    with stage('draw'):
+        figure_canvas_agg.draw()
+    with stage('pack'):
+        figure_canvas_agg.get_tk_widget().pack(side="top", fill="both", expand=1)
+    return figure_canvas_agg
+
+#create the form and show it without the plot
+def make_window():
+    import PySimpleGUI as sg
+    from mohr_critical import CRITERIA
+    from mohr_export import FORMATS
+    from mohr_rosette import ROSETTES
+    from mohr_sweep import SWEEP_FIELDS,VIEWS
+
+    #set GUI theme
+    sg.theme('NeutralBlue')
+
+    #input layout
+    input_layout=[[sg.T("\u03C3xx (MPa):"),sg.Input(size=(10,50),key="-sigma_xx-",enable_events=True),
+                sg.T("\u03C3zz:"),sg.Input(size=(10,50),key="-sigma_zz-",enable_events=True)],
+                [sg.T("\u03C3yy (MPa):"),sg.Input(size=(10,50),key="-sigma_yy-",enable_events=True),
+                sg.T("\u03C4xz:"),sg.Input(size=(10,50),key="-tau_xz-",enable_events=True)],
+                [sg.T("\u03C4xy (MPa):"),sg.Input(size=(10,50),key="-tau_xy-",enable_events=True),
+                sg.T("\u03C4yz:"),sg.Input(size=(10,50),key="-tau_yz-",enable_events=True)],
+                [sg.T("\u03B8 (deg):"),sg.Slider(range=(-90,90),default_value=0,resolution=0.5,
+                orientation='h',size=(20,15),key="-THETA-",enable_events=True)],
+                [sg.Button("Calculate"),sg.Checkbox("Live",key="-LIVE-",enable_events=True),sg.Exit()],
+                [sg.Checkbox("Timings",key="-TIMINGS-",enable_events=True),
+                sg.Combo(list(PROFILE_MODES),default_value='cProfile',key="-PROFILE_MODE-",readonly=True),
+                sg.Button("Profile")]]
+
+    #material strengths layout
+    strength_layout=[[sg.T("Sy:"),sg.Input(size=(8,50),key="-yield_strength-",enable_events=True),
+                sg.T("St:"),sg.Input(size=(8,50),key="-tensile_strength-",enable_events=True),
+                sg.T("Sc:"),sg.Input(size=(8,50),key="-compressive_strength-",enable_events=True)]]
+
+    #strain gauge rosette layout, converted into the stress inputs
+    rosette_layout=[[sg.Combo(list(ROSETTES),default_value='rectangular',key="-ROSETTE-",readonly=True),
+                sg.T("\u03B5a:"),sg.Input(size=(7,50),key="-eps_a-",enable_events=True),
+                sg.T("\u03B5b:"),sg.Input(size=(7,50),key="-eps_b-",enable_events=True),
+                sg.T("\u03B5c:"),sg.Input(size=(7,50),key="-eps_c-",enable_events=True)],
+                [sg.T("E (MPa):"),sg.Input(size=(9,50),key="-E-",enable_events=True),
+                sg.T("\u03BD:"),sg.Input(size=(5,50),key="-nu-",enable_events=True),
+                sg.Button("Convert")]]
+
+    #contain inputs in frame
+    input_frame=[[sg.Frame('Inputs',input_layout,pad=(0,0),element_justification='center')],
+                [sg.Frame('Strengths (MPa, optional)',strength_layout,pad=(0,0),element_justification='center')],
+                [sg.Frame('Rosette (\u03BC\u03B5)',rosette_layout,pad=(0,0),element_justification='center')],
+                [sg.Frame('Uncertainty (\u00B1 std, MPa)',[[sg.T("\u03C3xx:"),
+                sg.Input(size=(6,50),key="-std_sigma_xx-",enable_events=True),sg.T("\u03C3yy:"),
+                sg.Input(size=(6,50),key="-std_sigma_yy-",enable_events=True),sg.T("\u03C4xy:"),
+                sg.Input(size=(6,50),key="-std_tau_xy-",enable_events=True)],
+                [sg.Combo(list(MC_SAMPLES),default_value=MC_SAMPLES[1],key="-MC_SAMPLES-",readonly=True),
+                sg.Button("Monte Carlo")]],pad=(0,0),element_justification='center')],
+                [sg.Frame('Sweep (MPa)',[[sg.Combo(list(SWEEP_FIELDS),default_value='sigma_xx',
+                key="-SWEEP_X-",readonly=True),sg.Input(size=(6,50),key="-SWEEP_X_LO-",enable_events=True),
+                sg.Input(size=(6,50),key="-SWEEP_X_HI-",enable_events=True),sg.Combo(['']+list(SWEEP_FIELDS),
+                default_value='',key="-SWEEP_Y-",readonly=True),sg.Input(size=(6,50),key="-SWEEP_Y_LO-",
+                enable_events=True),sg.Input(size=(6,50),key="-SWEEP_Y_HI-",enable_events=True)],
+                [sg.Combo(list(VIEWS),default_value='heatmap',key="-SWEEP_VIEW-",readonly=True),
+                sg.Button("Sweep")]],pad=(0,0),element_justification='center')],
+                [sg.Frame('Result Store',[[sg.Checkbox("Save",key="-STORE-"),
+                sg.Input(os.environ.get(STORE_ENV) or STORE_DB,size=(25,50),key="-STORE_PATH-")],
+                [sg.T("\u03C31 \u2265"),sg.Input(size=(7,50),key="-STORE_SIGMA1-",enable_events=True),
+                sg.Button("Find"),sg.T("ID:"),sg.Input(size=(7,50),key="-STORE_ID-"),sg.Button("Load")]],
+                pad=(0,0),element_justification='center')],
+                [sg.Frame('Export',[[sg.Input(EXPORT_PATH,size=(25,50),key="-EXPORT_PATH-"),
+                sg.FileSaveAs(file_types=tuple((fmt.upper(),f"*.{fmt}") for fmt in FORMATS),
+                default_extension='.png'),sg.Combo(list(EXPORT_DPIS),default_value=EXPORT_DPIS[0],
+                key="-DPI-",readonly=True),sg.Button("Export")]],
+                pad=(0,0),element_justification='center')],
+                [sg.Frame('Stress Files',[[sg.Input(size=(25,50),key="-HISTORY-"),
+                sg.FileBrowse(file_types=(("Stress states","*.csv *.npy *.npz"),)),sg.Button("Play")],
+                [sg.Combo(list(CRITERIA),default_value='shear_range',key="-CRITERION-",readonly=True),
+                sg.Button("Critical Plane"),sg.Button("Overlay"),sg.Button("Field")]],
+                pad=(0,0),element_justification='center')]]
+
+    #column element for input layout
+    input_column=sg.Column(input_frame, justification='center')
+
+    #project description
+    description=[[sg.T("""This GUI takes inputs for a 2D state of stress and generates
+Mohr's circle, complete with principal stresses, maximum shear stresses, and
+the principal angle. Please input float or integer values for your state of stress.
+Fill in any of \u03C3zz, \u03C4xz, \u03C4yz for a 3D state with three Mohr's circles.
+Material strengths add the von Mises, Tresca and Coulomb-Mohr safety factors.
+Rosette gauge strains with E and \u03BD convert to the plane stress state.
+Play animates a load history file of plane states, one per step, and
+Critical Plane finds the plane with the largest damage parameter over it,
+Overlay draws the circles of every state in the file on one diagram and Field
+contours a 2D FE result, showing the circle of the node under the mouse.
+Save keeps every solved state in the result store, Find lists the stored states
+above a \u03C31 and Load shows a stored state again without solving it.
+Export writes the shown figure to a PNG, SVG or PDF file in the background.
+Monte Carlo samples the plane stress inputs with the given normal scatter and
+shows the principal stress histograms and percentile bands on the circle.
+Sweep maps the principal stresses and angle over a range of one or two of the
+stress components, the others held at their inputs; scroll to zoom, drag to pan.""",expand_x=True)]]
+
+    #WINDOW LAYOUT
+    layout=[
+        [sg.Canvas(key="-CANVAS-",expand_x=True,expand_y=True)],
+        [sg.Column(description,justification='center'),input_column],
+        [sg.T("Status:"),sg.StatusBar(size=(50,1),text="",key="-STATUS-",text_color='black',
+        background_color='white',auto_size_text=True,expand_x=True)]
+    ]
+
+    window = sg.Window(
+        "Python - Mohr's Circle Solver",
+        layout,
+        location=(0, 0),
+        finalize=True,
+        resizable=True,
+        element_justification="center",
+        font="Helvetica 18",
+    )
+    window.maximize()
+    return window
+
+#play a load history file in its own window, blitting one frame per tick
+def play_history(path):
+    import PySimpleGUI as sg
+    from mohr_history import HistoryPlayer,decimate,read_history
+
+    history=read_history(path)
+    indices=decimate(history.radius,HISTORY_FRAMES)
+    window=sg.Window(f"Load History - {path}",[[sg.Canvas(key="-CANVAS-")],
+        [sg.Button("Pause"),sg.Slider(range=(0,len(indices)-1),default_value=0,orientation='h',
+        size=(60,15),key="-FRAME-",enable_events=True,disable_number_display=True),sg.Button("Close"),
+        sg.T(f"{len(history.radius):,} steps, {len(indices):,} frames")]],finalize=True)
+    player=HistoryPlayer(history)
+    fig_agg=draw_figure(window["-CANVAS-"].TKCanvas,player.mohr_fig.fig)
+
+    frame,playing=0,True
+    while True:
+        event,values=window.read(timeout=int(1000/HISTORY_FPS) if playing else None)
+        if event in (sg.WIN_CLOSED,"Close"):
+            break
+        if event == "Pause":
+            playing=not playing
+            window["Pause"].update("Pause" if playing else "Play")
+        elif event == "-FRAME-":
+            frame=int(values["-FRAME-"])
+        elif playing:
+            frame=(frame+1)%len(indices)
+            window["-FRAME-"].update(frame)
+        player.show(int(indices[frame]))
+    player.disconnect()
+    window.close()
+
+#draw the circles of every state of a file in its own window
+def show_overlay(path):
+    import PySimpleGUI as sg
+    from mohr_overlay import OverlayFigure,read_states
+
+    overlay=OverlayFigure()
+    overlay.update(*read_states(path))
+    window=sg.Window(f"Overlay - {path}",[[sg.Canvas(key="-CANVAS-")],[sg.Button("Close")]],finalize=True)
+    draw_figure(window["-CANVAS-"].TKCanvas,overlay.fig)
+    while True:
+        event,values=window.read()
+        if event in (sg.WIN_CLOSED,"Close"):
+            break
+    window.close()
+
+#explore a 2D FE result field in its own window: the contour map and the
+# Mohr's circle of the node picked on it
+def show_field(path):
+    import PySimpleGUI as sg
+    from mohr_field import QUANTITIES,FieldExplorer,FieldFigure,read_field
+
+    field=read_field(path)
+    field_fig=FieldFigure(field)
+    window=sg.Window(f"Field - {path}",[[sg.Canvas(key="-FIELD-"),sg.Canvas(key="-CANVAS-")],
+        [sg.Combo(list(QUANTITIES),default_value=field_fig.quantity,key="-QUANTITY-",readonly=True,
+        enable_events=True),sg.Checkbox("Hover",default=True,key="-HOVER-",enable_events=True),
+        sg.T("Click or hover over the map to pick a node.",key="-NODE-",size=(90,1)),sg.Button("Close")]],
+        finalize=True)
+
+    def picked(node):
+        sigma_xx,sigma_yy,tau_xy=field_fig.stress(node)
+        window["-NODE-"].update(f"node {node} at ({field.x[node]:.4g}, {field.y[node]:.4g}): "
+        f"\u03C3xx {sigma_xx:.4g}, \u03C3yy {sigma_yy:.4g}, \u03C4xy {tau_xy:.4g}, "
+        f"\u03C31 {field.sigma1[node]:.4g}, \u03C32 {field.sigma2[node]:.4g}, "
+        f"\u03C4max {field.tau_max[node]:.4g} MPa")
+
+    explorer=FieldExplorer(field_fig,MohrFigure(),on_pick=picked)
+    field_agg=draw_figure(window["-FIELD-"].TKCanvas,field_fig.fig)
+    draw_figure(window["-CANVAS-"].TKCanvas,explorer.mohr_fig.fig)
+    while True:
+        event,values=window.read()
+        if event in (sg.WIN_CLOSED,"Close"):
+            break
+        if event == "-QUANTITY-":
+            field_fig.set_quantity(values["-QUANTITY-"])
+            field_agg.draw_idle()
+        elif event == "-HOVER-":
+            explorer.hover=values["-HOVER-"]
+    explorer.disconnect()
+    window.close()
+
+#show the percentile bands and histograms of a Monte Carlo result in its own window
+def show_montecarlo(result):
+    import PySimpleGUI as sg
+    from mohr_montecarlo import MonteCarloFigure
+
+    mc_fig=MonteCarloFigure()
+    mc_fig.update(result)
+    window=sg.Window("Monte Carlo",[[sg.Canvas(key="-CANVAS-")],[sg.Button("Close")]],finalize=True)
+    draw_figure(window["-CANVAS-"].TKCanvas,mc_fig.fig)
+    while True:
+        event,values=window.read()
+        if event in (sg.WIN_CLOSED,"Close"):
+            break
+    window.close()
+
+#explore a sweep in its own window, views are solved from the shared grid cache
+def show_sweep(cache,base,axes,ranges,view):
+    import PySimpleGUI as sg
+    from mohr_sweep import QUANTITIES as SWEEP_QUANTITIES,SWEEP_POINTS,SweepExplorer,SweepFigure
+
+    sweep_fig=SweepFigure(len(axes),view=view)
+    window=sg.Window(f"Sweep - {', '.join(axes)}",[[sg.Canvas(key="-CANVAS-")],
+        [sg.Combo(list(SWEEP_QUANTITIES),default_value='sigma1',key="-QUANTITY-",readonly=True,
+        enable_events=True,visible=len(axes)==2),sg.T("",key="-SOLVED-",size=(80,1)),sg.Button("Close")]],
+        finalize=True)
+    draw_figure(window["-CANVAS-"].TKCanvas,sweep_fig.fig)
+
+    def updated(grid):
+        window["-SOLVED-"].update(f"{grid.values[0].size:,} points: {grid.solved:,} solved, "
+        f"{grid.reused:,} from the cache, {grid.elapsed*1000:.0f} ms")
+
+    explorer=SweepExplorer(sweep_fig,cache,base,axes,ranges,SWEEP_POINTS[len(axes)],on_update=updated)
+    while True:
+        event,values=window.read()
+        if event in (sg.WIN_CLOSED,"Close"):
+            break
+        if event == "-QUANTITY-":
+            explorer.set_quantity(values["-QUANTITY-"])
+    explorer.disconnect()
+    window.close()
+
+#command line modes, python mohrs_circle_gui.py <command> --help
+COMMANDS={
+    'batch':'mohr_batch',
+    'render':'mohr_render',
+    'bench':'mohr_bench',
+    'rosette':'mohr_rosette',
+    'history':'mohr_history',
+    'critical':'mohr_critical',
+    'overlay':'mohr_overlay',
+    'serve':'mohr_server',
+    'store':'mohr_store',
+    'field':'mohr_field',
+    'export':'mohr_export',
+    'montecarlo':'mohr_montecarlo',
+    'sweep':'mohr_sweep',
+}
+
+#entry point, runs a command line mode or starts the GUI
+def main(argv=None):
+    if argv is None:
+        argv=sys.argv[1:]
+    if argv and argv[0] in COMMANDS:
+        return importlib.import_module(COMMANDS[argv[0]]).main(argv[1:])
+    if argv:
+        print(f"usage: mohrs_circle_gui.py [{'|'.join(COMMANDS)}] ...",file=sys.stderr)
+        return 2
+    run_gui()
+    return 0
+
+#GUI
+def run_gui():
+    import matplotlib
+
+    #The following line allows PySimpleGUI to work on Mac, you may have to remove
+    # this if you are using a windows system.
+    matplotlib.use("TkAgg")
+    import PySimpleGUI as sg
+
+    TIMER.enabled=bool(os.environ.get(TIMINGS_ENV))
+    window=make_window()
+    window["-TIMINGS-"].update(TIMER.enabled)
+    window["-STORE-"].update(bool(os.environ.get(STORE_ENV)))
+
+    #add plot to window, the figure and canvas live for the whole session
+    with stage('build'):
+        mohr_fig=MohrFigure()
+    fig_agg=draw_figure(window["-CANVAS-"].TKCanvas, mohr_fig.fig)
+    if TIMER.enabled:
+        TIMER.log(TIMINGS_LOG,event='startup')
+
+    #stress transformation at any angle, scrubbed with the slider or by dragging the element
+    scrubber=AngleScrubber(mohr_fig,on_change=lambda theta: window["-THETA-"].update(theta))
+
+    #failure envelopes and safety factors
+    failure=FailureOverlay(mohr_fig)
+
+    #critical plane of a load history on the given element
+    critical=CriticalPlaneOverlay(mohr_fig)
+
+    #revisited load cases are neither solved nor drawn again
+    frames=LRUCache(FRAME_CACHE_SIZE)
+    renders=LRUCache(RENDER_CACHE_SIZE,RENDER_CACHE_BYTES)
+
+    def prepare(*stress):
+        key=state_key(*stress,quantum=CACHE_QUANTUM)
+        return key,frames.get_or_compute(key,prepare_frame,*stress)
+
+    #result stores by path, opened on first use
+    stores={}
+    def open_store(path):
+        if path not in stores:
+            from mohr_store import ResultStore
+            stores[path]=ResultStore(path)
+        return stores[path]
+
+    #key of a state loaded from the store, it is not saved again
+    loaded=None
+
+    #solve and prepare figures off the Tk thread, results come back as -FRAME- events
+    worker=DebouncedWorker(prepare,
+    lambda generation,frame,error: window.write_event_value('-FRAME-',(generation,frame,error)),
+    delay=LIVE_DELAY)
+
+    #Monte Carlo runs off the Tk thread too, progress comes back as -MC_PROGRESS-
+    # events and the result as an -MC- event. Spawned pool workers do not
+    # inherit the Tk state of this process.
+    def sample(inputs,samples):
+        from mohr_montecarlo import monte_carlo
+        return monte_carlo(inputs,samples=samples,mp_context=multiprocessing.get_context('spawn'),
+        progress=lambda done,total,elapsed: window.write_event_value('-MC_PROGRESS-',(done,total,elapsed)))
+    sampler=DebouncedWorker(sample,
+    lambda generation,result,error: window.write_event_value('-MC-',(result,error)),delay=0)
+    sampling=False
+
+    #figure exports render in a worker process, results come back as -EXPORT- events
+    from mohr_export import ExportQueue,format_size
+    exports=ExportQueue(lambda path,result,error,pending:
+    window.write_event_value('-EXPORT-',(path,result,error,pending)))
+
+    #solved sweep tiles, kept for the session so reopened sweeps reuse them
+    from mohr_sweep import GridCache
+    sweeps=GridCache()
+
+    #report cold start time
+    window["-STATUS-"].update(f"Ready in {time.perf_counter()-START_TIME:.2f} s.")
+
+    while True:  #event loop
+        event, values = window.read()
+        if event == sg.WIN_CLOSED or event == 'Exit': #close program
+            break
+        elif event == '-sigma_xx-' and values['-sigma_xx-']: #check for non-float values
+            try:
+                float_check1=float(values['-sigma_xx-'])
+            except:
+                if len(values['-sigma_xx-']) == 1 and values['-sigma_xx-'][0] == '-':
+                    continue
+                window['-sigma_xx-'].update(values['-sigma_xx-'][:-1])
+                window['-STATUS-'].update('Only float or integer values are accepted.')
+        elif event == '-sigma_yy-' and values['-sigma_yy-']: #check for non-float values
+            try:
+                float_check2=float(values['-sigma_yy-'])
+            except:
+                if len(values['-sigma_yy-']) == 1 and values['-sigma_yy-'][0] == '-':
+                    continue
+                window['-sigma_yy-'].update(values['-sigma_yy-'][:-1])
+                window['-STATUS-'].update('Only float or integer values are accepted.')
+        elif event == '-tau_xy-' and values['-tau_xy-']: #check for non-float values
+            try:
+                float_check3=float(values['-tau_xy-'])
+            except:
+                if len(values['-tau_xy-']) == 1 and values['-tau_xy-'][0] == '-':
+                    continue
+                window['-tau_xy-'].update(values['-tau_xy-'][:-1])
+                window['-STATUS-'].update('Only float or integer values are accepted.')
+        elif event in (OUT_OF_PLANE_KEYS+STRENGTH_KEYS+ROSETTE_KEYS+UNCERTAINTY_KEYS+SWEEP_RANGE_KEYS
+        +('-STORE_SIGMA1-',)) and values[event]: #check for non-float values
+            try:
+                float(values[event])
+            except:
+                if len(values[event]) == 1 and values[event][0] == '-':
+                    continue
+                window[event].update(values[event][:-1])
+                window['-STATUS-'].update('Only float or integer values are accepted.')
+        elif event == "Calculate":
+            stress=read_stress(values)
+            if stress is None:
+                #one or more stress values missing
+                window["-STATUS-"].update("Please enter all stress values into the GUI.")
+            else:
+                #print feedback to user, the worker posts -FRAME- when done
+                TIMER.reset()
+                worker.submit(*stress,delay=0)
+                window["-STATUS-"].update("Working...")
+        elif event == "Play":
+            if not values["-HISTORY-"]:
+                window["-STATUS-"].update("Please choose a load history file.")
                 continue
-            window['-sigma_xx-'].update(values['-sigma_xx-'][:-1])
-            window['-STATUS-'].update('Only float or integer values are accepted.')
-    elif event == '-sigma_yy-' and values['-sigma_yy-']: #check for non-float values
-        try:
-            float_check2=float(values['-sigma_yy-'])
-        except:
-            if len(values['-sigma_yy-']) == 1 and values['-sigma_yy-'][0] == '-':
+            try:
+                play_history(values["-HISTORY-"])
+            except (OSError,ValueError) as e:
+                window["-STATUS-"].update(f"Load history failed: {e}")
+        elif event == "Overlay":
+            if not values["-HISTORY-"]:
+                window["-STATUS-"].update("Please choose a stress state file.")
                 continue
-            window['-sigma_yy-'].update(values['-sigma_yy-'][:-1])
-            window['-STATUS-'].update('Only float or integer values are accepted.')
-    elif event == '-tau_xy-' and values['-tau_xy-']: #check for non-float values
-        try:
-            float_check3=float(values['-tau_xy-'])
-        except:
-            if len(values['-tau_xy-']) == 1 and values['-tau_xy-'][0] == '-':
+            try:
+                show_overlay(values["-HISTORY-"])
+            except (OSError,ValueError) as e:
+                window["-STATUS-"].update(f"Overlay failed: {e}")
+        elif event == "Field":
+            if not values["-HISTORY-"]:
+                window["-STATUS-"].update("Please choose a field file.")
                 continue
-            window['-tau_xy-'].update(values['-tau_xy-'][:-1])
-            window['-STATUS-'].update('Only float or integer values are accepted.')
-    elif event == "Calculate":
-        #print feedback to user
-        while i<100:
-            window["-STATUS-"].update("Working...")
+            try:
+                show_field(values["-HISTORY-"])
+            except (OSError,ValueError) as e:
+                window["-STATUS-"].update(f"Field failed: {e}")
+        elif event == "Critical Plane":
+            if not values["-HISTORY-"]:
+                window["-STATUS-"].update("Please choose a load history file.")
+                continue
+            window["-STATUS-"].update("Searching...")
             window.refresh()
-            i+=1
-        try:
-            #retrieve user input
-            sigma_xx=float(values['-sigma_xx-'])
-            sigma_yy=float(values['-sigma_yy-'])
-            tau_xy=float(values['-tau_xy-'])
+            from mohr_critical import critical_plane_file
+            try:
+                result=critical_plane_file(values["-HISTORY-"],values["-CRITERION-"])
+            except (OSError,ValueError) as e:
+                window["-STATUS-"].update(f"Critical plane search failed: {e}")
+                continue
+            critical.update(result)
+            fig_agg.draw_idle()
+            window["-STATUS-"].update(f"Critical plane at {result.theta:.2f} deg over {result.steps:,} steps.")
+        elif event == "Monte Carlo":
+            stress=read_stress(values)
+            if stress is None:
+                window["-STATUS-"].update("Please enter all stress values into the GUI.")
+                continue
+            from mohr_montecarlo import Input
+            try:
+                inputs=[Input(mean,abs(float(values[key] or 0))) for mean,key in zip(stress,UNCERTAINTY_KEYS)]
+            except ValueError:
+                window["-STATUS-"].update("Please enter the standard deviations as numbers.")
+                continue
+            if sampling:
+                window["-STATUS-"].update("A Monte Carlo run is already in progress.")
+                continue
+            sampling=True
+            sampler.submit(inputs,int(values["-MC_SAMPLES-"]))
+            window["-STATUS-"].update("Sampling..."
+            +(" Out of plane stresses are left out." if any(stress[3:]) else ""))
+        elif event == '-MC_PROGRESS-':
+            done,total,elapsed=values['-MC_PROGRESS-']
+            window["-STATUS-"].update(f"Sampling... {done:,} of {total:,} samples, "
+            f"{done/elapsed if elapsed>0 else 0:,.0f} samples/s")
+        elif event == '-MC-':
+            sampling=False
+            result,error=values['-MC-']
+            if error is not None:
+                window["-STATUS-"].update(f"Monte Carlo failed: {error}")
+                continue
+            window["-STATUS-"].update(f"{result.samples:,} samples in {result.elapsed:.2f} s.")
+            show_montecarlo(result)
+        elif event == "Sweep":
+            axes=[values["-SWEEP_X-"]]+([values["-SWEEP_Y-"]] if values["-SWEEP_Y-"] else [])
+            try:
+                #swept components may be left blank in the stress inputs
+                base=tuple(float(values[key] or 0) for key in STRESS_KEYS)
+                ranges=[(float(values[lo]),float(values[hi])) for lo,hi in
+                zip(SWEEP_RANGE_KEYS[::2],SWEEP_RANGE_KEYS[1::2])][:len(axes)]
+            except ValueError:
+                window["-STATUS-"].update("Please enter the stresses and sweep ranges as numbers.")
+                continue
+            try:
+                show_sweep(sweeps,base,axes,ranges,values["-SWEEP_VIEW-"])
+            except ValueError as e:
+                window["-STATUS-"].update(f"Sweep failed: {e}")
+        elif event == "Convert":
+            try:
+                stress=read_rosette(values)
+            except ValueError as e:
+                window["-STATUS-"].update(f"Rosette conversion failed: {e}")
+                continue
+            if stress is None:
+                window["-STATUS-"].update("Please enter all gauge strains, E and \u03BD.")
+                continue
 
-            #erase current canvas
-            fig_agg.get_tk_widget().forget()
-            plt.clf()
+            #fill in the plane stress state and calculate it
+            for key,value in zip(STRESS_KEYS,stress):
+                window[key].update(f'{value:.6g}')
+                values[key]=f'{value:.6g}'
+            for key in OUT_OF_PLANE_KEYS:
+                window[key].update('')
+                values[key]=''
+            TIMER.reset()
+            worker.submit(*read_stress(values),delay=0)
+            window["-STATUS-"].update("Working...")
+        elif event == "Find":
+            try:
+                sigma1=float(values["-STORE_SIGMA1-"] or '-inf')
+                store=open_store(values["-STORE_PATH-"])
+                count=store.count(sigma1=(sigma1,None))
+                states=store.query(order_by='sigma1',limit=FIND_LIMIT,sigma1=(sigma1,None))
+            except (ValueError,sqlite3.Error) as e:
+                window["-STATUS-"].update(f"Result store query failed: {e}")
+                continue
+            window["-STATUS-"].update(f"{count:,} stored states with \u03C31 \u2265 {sigma1:g} MPa.")
+            if states:
+                sg.popup_scrolled('\n'.join(f"{state.id:>8}  {state.label or '':<12} "
+                +' '.join(f'{s:10.4g}' for s in state.stress)
+                +f"  \u03C31 {state.sigma1:10.4g}  \u03C4max {state.tau_max:10.4g}" for state in states),
+                title=f"Stored states, {len(states)} of {count:,} largest \u03C31 first",
+                size=(110,25),font='Courier 12',non_blocking=True)
+        elif event == "Load":
+            try:
+                state=open_store(values["-STORE_PATH-"]).get(int(values["-STORE_ID-"]))
+            except (ValueError,sqlite3.Error) as e:
+                window["-STATUS-"].update(f"Result store lookup failed: {e}")
+                continue
+            if state is None:
+                window["-STATUS-"].update(f"No stored state {values['-STORE_ID-']}.")
+                continue
 
-            #retrieve updated figure
-            fig2=mohrs_circle(sigma_xx,sigma_yy,tau_xy)
+            #fill in the stored state, plane states are shown from the stored values
+            for key,value in zip(STRESS_KEYS+OUT_OF_PLANE_KEYS,state.stress):
+                text='' if key in OUT_OF_PLANE_KEYS and not state.is_3d else f'{value:.10g}'
+                window[key].update(text)
+                values[key]=text
+            stress=read_stress(values)
+            loaded=state_key(*stress,quantum=CACHE_QUANTUM)
+            if not state.is_3d:
+                frames.put(loaded,prepare_frame(*stress,points=state.points()))
+            TIMER.reset()
+            worker.submit(*stress,delay=0)
+            window["-STATUS-"].update("Working...")
+        elif event == "Export":
+            if mohr_fig.state is None:
+                window["-STATUS-"].update("Please calculate a state of stress to export.")
+                continue
 
-            #redraw canvas
-            fig_agg=draw_figure(window["-CANVAS-"].TKCanvas, fig2)
+            #snapshot of the shown figure, later input changes do not affect it
+            stress=mohr_fig.state+(mohr_fig.state_3d or ())
+            try:
+                pending=exports.submit(stress,values["-EXPORT_PATH-"],int(values["-DPI-"]),
+                failure.strengths,critical.result)
+            except ValueError as e:
+                window["-STATUS-"].update(f"Export failed: {e}")
+                continue
+            window["-STATUS-"].update(f"Export of {values['-EXPORT_PATH-']} queued, {pending} pending.")
+        elif event == '-EXPORT-':
+            path,result,error,pending=values['-EXPORT-']
+            if error is not None:
+                window["-STATUS-"].update(f"Export of {path} failed: {error}")
+                continue
+            path,size,seconds=result
+            window["-STATUS-"].update(f"Exported {path} ({format_size(size)}) in {seconds:.2f} s"
+            +(f", {pending} pending." if pending else "."))
+        elif event == '-TIMINGS-':
+            TIMER.enabled=values['-TIMINGS-']
+        elif event == 'Profile':
+            stress=read_stress(values)
+            if stress is None:
+                window["-STATUS-"].update("Please enter all stress values into the GUI.")
+                continue
 
-            #update status "calculation completed"
-            window["-STATUS-"].update("Calculation completed.")
-        except:
-            #one or more stress values missing
-            window["-STATUS-"].update("Please enter all stress values into the GUI.")
+            #one uncached recalculation on this thread, under the chosen profiler
+            def recalculate():
+                mohr_fig.apply(prepare_frame(*stress))
+                failure.update(**read_strengths(values))
+                fig_agg.draw()
+            mode,suffix=PROFILE_MODES[values['-PROFILE_MODE-']]
+            path=f"mohr_profile_{time.strftime('%Y%m%d_%H%M%S')}.{suffix}"
+            report=capture(mode,path,recalculate)[1]
+            sg.popup_scrolled(report,title=f"{values['-PROFILE_MODE-']} profile - {path}",
+            size=(110,25),font='Courier 12',non_blocking=True)
+            window["-STATUS-"].update(f"{values['-PROFILE_MODE-']} profile of one recalculation written to {path}.")
+        elif event == '-THETA-':
+            scrubber.set_angle(values['-THETA-'])
+        elif event == '-FRAME-':
+            generation,frame,error=values['-FRAME-']
+            if not worker.is_current(generation):
+                continue #inputs changed while this frame was prepared
+            if error is not None:
+                window["-STATUS-"].update(f"Calculation failed: {error}")
+                continue
 
-#end program
-window.close()
\ No newline at end of file
+            #update the figure in place and redraw canvas
+            key,frame=frame
+            if values["-STORE-"] and key!=loaded:
+                try:
+                    open_store(values["-STORE_PATH-"]).add(*frame['state'],*(frame['out_of_plane'] or ()))
+                except sqlite3.Error as e:
+                    window["-STATUS-"].update(f"Saving to the result store failed: {e}")
+            loaded=None
+            strengths=read_strengths(values)
+            mohr_fig.apply(frame)
+            failure.update(**strengths)
+            size=(mohr_fig.fig.bbox.width,mohr_fig.fig.bbox.height)
+
+            #the critical plane overlay is part of the cached background
+            plane=None if critical.result is None else (critical.result.criterion,critical.result.theta,
+            critical.result.value)
+            cached=redraw(fig_agg,scrubber,renders,(key,tuple(strengths.values()),plane,size))
+
+            #update status "calculation completed", or the stage timings
+            if TIMER.enabled:
+                window["-STATUS-"].update(TIMER.summary()+(' (cached)' if cached else ''))
+                TIMER.log(TIMINGS_LOG,event='calculate',stress=list(key),cached=cached)
+                continue
+            stats=renders.stats()
+            window["-STATUS-"].update(f"Calculation completed{' (cached)' if cached else ''}. "
+            f"Figure cache: {stats.hits} hits, {stats.misses} misses, {stats.nbytes/2**20:.1f} MB.")
+
+        #strengths only change the overlay, no need to recalculate
+        if event in STRENGTH_KEYS and mohr_fig.state is not None:
+            failure.update(**read_strengths(values))
+            fig_agg.draw_idle()
+
+        #live mode, recalculate once typing pauses
+        if event in STRESS_KEYS+OUT_OF_PLANE_KEYS+('-LIVE-',) and values['-LIVE-']:
+            stress=read_stress(values)
+            if stress is None:
+                worker.cancel()
+            else:
+                TIMER.reset()
+                worker.submit(*stress)
+
+    #end program, queued exports are still written
+    worker.close()
+    sampler.close()
+    exports.close()
+    for store in stores.values():
+        store.close()
+    window.close()
+
+###################### END PYSIMPLEGUI ###########################
+
+if __name__ == "__main__":
+    sys.exit(main())
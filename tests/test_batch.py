@@ -0,0 +1,23 @@
+import warnings
+import numpy as np
+from mohr_batch import count_rows,run_batch
+from mohr_core import mohr_solve
+
+#blank and whitespace-only lines are neither counted nor solved
+def test_blank_csv_lines_are_skipped(tmp_path):
+    path=tmp_path/'states.csv'
+    path.write_text('sigma_xx,sigma_yy,tau_xy\n1,2,3\n\n4,5,6\n  \n\n')
+    assert count_rows(path)==2
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        rows=run_batch(path,tmp_path/'out.npy',chunk_size=2)
+    out=np.load(tmp_path/'out.npy')
+    assert rows==2 and out.shape==(2,4)
+    res=mohr_solve(np.array([1.,4.]),np.array([2.,5.]),np.array([3.,6.]))
+    np.testing.assert_allclose(out,np.column_stack([res.sigma1,res.sigma2,res.tau_max,res.theta]))
+
+
+def test_count_rows_without_final_newline(tmp_path):
+    path=tmp_path/'states.csv'
+    path.write_text('sigma_xx,sigma_yy,tau_xy\n1,2,3\n4,5,6')
+    assert count_rows(path)==2
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from mohr_history import decimate
+
+#the frame budget is never exceeded and keeps the ends and the largest circle
+@pytest.mark.parametrize('max_frames',[3,4,7,100,999])
+def test_decimate_within_budget(max_frames):
+    radius=np.random.default_rng(1).random(1000)
+    radius[537]=2
+    indices=decimate(radius,max_frames)
+    assert 3<=len(indices)<=max_frames
+    assert indices[0]==0 and indices[-1]==999 and 537 in indices
+    assert np.all(np.diff(indices)>0)
+
+
+def test_decimate_rejects_budget_below_3():
+    for max_frames in (0,1,2):
+        with pytest.raises(ValueError):
+            decimate(np.arange(10.),max_frames)
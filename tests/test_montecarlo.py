@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from mohr_montecarlo import Input,monte_carlo
+
+INPUTS=[Input(80,5),Input(-40,8),Input(30,3,'uniform')]
+CORRELATION=[[1,0.5,0],[0.5,1,0],[0,0,1]]
+
+#chunks draw from their own streams, so the workers do not change the result
+def test_same_seed_same_counts_for_any_worker_count():
+    results=[monte_carlo(INPUTS,CORRELATION,samples=250_000,seed=7,workers=workers,chunk_size=50_000)
+    for workers in (1,2,3)]
+    for result in results[1:]:
+        np.testing.assert_array_equal(result.counts,results[0].counts)
+        np.testing.assert_array_equal(result.mean,results[0].mean)
+        np.testing.assert_array_equal(result.std,results[0].std)
+
+
+def test_different_seeds_differ():
+    a=monte_carlo(INPUTS,samples=100_000,seed=1,workers=1)
+    b=monte_carlo(INPUTS,samples=100_000,seed=2,workers=1)
+    assert not np.array_equal(a.counts,b.counts)
+
+
+def test_exact_inputs_give_the_nominal_state():
+    result=monte_carlo([Input(80,0),Input(-40,0),Input(30,0)],samples=10_000,workers=1)
+    sigma1=20+(60**2+30**2)**0.5
+    assert result.mean[0]==pytest.approx(sigma1)
+    assert result.percentile('sigma1',[5,50,95])==pytest.approx([sigma1]*3)
+
+
+def test_uniform_inputs_can_not_be_correlated():
+    with pytest.raises(ValueError,match='uniform'):
+        monte_carlo(INPUTS,[[1,0,0.3],[0,1,0],[0.3,0,1]],samples=1000)
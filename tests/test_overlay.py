@@ -0,0 +1,13 @@
+import numpy as np
+import pytest
+from mohr_overlay import OverlayFigure
+
+#circles stay circles in both the collection and the density rendering
+@pytest.mark.parametrize('count',[10,50])
+def test_overlay_keeps_equal_aspect(count):
+    overlay=OverlayFigure(density_threshold=20)
+    assert overlay.ax.get_aspect()==1
+    rng=np.random.default_rng(0)
+    overlay.update(*rng.normal(0,100,(3,count)))
+    assert overlay.image.get_visible()==(count>20)
+    assert overlay.ax.get_aspect()==1
@@ -0,0 +1,13 @@
+import warnings
+import numpy as np
+from mohr_rosette import read_channel_chunks
+
+#blank and whitespace-only lines never reach loadtxt
+def test_blank_csv_lines_are_skipped(tmp_path):
+    path=tmp_path/'daq.csv'
+    path.write_text('a,b,c\n1,2,3\n\n4,5,6\n  \n\n\n')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        chunks=list(read_channel_chunks(path,['a','c'],chunk_size=2))
+    assert all(len(chunk) for chunk in chunks)
+    np.testing.assert_array_equal(np.concatenate(chunks),[[1,3],[4,6]])
@@ -0,0 +1,56 @@
+import http.client
+import json
+import threading
+import pytest
+from mohr_server import parse_states,serve
+
+@pytest.fixture(scope='module')
+def server():
+    server=serve(port=0,workers=1)
+    thread=threading.Thread(target=server.serve_forever,daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+#(status,JSON body) of a POST request, body bytes are sent as given
+def post(server,path,body,headers=None):
+    connection=http.client.HTTPConnection(*server.server_address,timeout=30)
+    try:
+        connection.request('POST',path,body if isinstance(body,bytes) else json.dumps(body).encode(),
+        {'Content-Type':'application/json',**(headers or {})})
+        response=connection.getresponse()
+        return response.status,json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_parse_states_rejects_missing_component():
+    with pytest.raises(ValueError,match='state 1: missing tau_xy'):
+        parse_states({'states':[{'sigma_xx':1,'sigma_yy':2,'tau_xy':3},{'sigma_xx':1,'sigma_yy':2}]})
+
+
+def test_parse_states_defaults_out_of_plane():
+    columns,single=parse_states({'states':[{'sigma_xx':1,'sigma_yy':2,'tau_xy':3},
+    {'sigma_xx':1,'sigma_yy':2,'tau_xy':3,'sigma_zz':4}]})
+    assert not single
+    assert list(columns['sigma_zz'])==[0,4]
+
+
+def test_solve_missing_component_is_400(server):
+    status,body=post(server,'/solve',{'states':[{'sigma_xx':80,'sigma_yy':-40}]})
+    assert status==400
+    assert 'tau_xy' in body['error']
+
+
+def test_solve_single_state(server):
+    status,body=post(server,'/solve',{'sigma_xx':80,'sigma_yy':-40,'tau_xy':30})
+    assert status==200
+    assert body['sigma1']==pytest.approx(20+(60**2+30**2)**0.5)
+
+
+def test_negative_content_length_is_400(server):
+    status,body=post(server,'/solve',b'{}',{'Content-Length':'-1'})
+    assert status==400
+    assert body['error']=='negative Content-Length'
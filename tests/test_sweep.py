@@ -0,0 +1,53 @@
+import numpy as np
+from mohr_core import mohr_solve
+from mohr_sweep import QUANTITIES,TILE,GridCache,sweep
+
+BASE=(80,-40,30)
+
+#every quantity of a grid equals a direct solve on its coordinates
+def assert_exact(grid):
+    stress=list(BASE)
+    for name,values in zip(grid.axes,np.meshgrid(*grid.coords,indexing='ij',sparse=True)):
+        stress[('sigma_xx','sigma_yy','tau_xy').index(name)]=values
+    res=mohr_solve(*stress,dtype=np.float64)
+    for name in QUANTITIES:
+        np.testing.assert_array_equal(grid.quantity(name),np.broadcast_to(getattr(res,name),grid.values.shape[1:]))
+
+
+def test_uncached_sweep_matches_solver():
+    grid=sweep(BASE,('sigma_xx','tau_xy'),[(-100,100),(-50,50)],101)
+    assert grid.values.shape==(4,101,101)
+    assert_exact(grid)
+
+
+def test_pan_reuses_tiles():
+    cache=GridCache()
+    first=cache.sweep(BASE,('sigma_xx','sigma_yy'),[(-100,100),(-100,100)],300)
+    assert first.reused==0
+    same=cache.sweep(BASE,('sigma_xx','sigma_yy'),[(-100,100),(-100,100)],300)
+    assert same.solved==0 and same.reused==first.solved
+    panned=cache.sweep(BASE,('sigma_xx','sigma_yy'),[(-50,150),(-100,100)],300)
+    assert panned.reused>0 and panned.solved<first.solved
+    assert_exact(same)
+    assert_exact(panned)
+
+
+def test_refine_copies_parent_points():
+    cache=GridCache()
+    cache.sweep(BASE,('tau_xy',),[(-100,100)],10_000)
+    refined=cache.sweep(BASE,('tau_xy',),[(-50,50)],10_000)
+    assert refined.solved==refined.reused  #every other point is copied
+    assert_exact(refined)
+
+
+#with unequal aspect ratios the axes change level on different zoom steps
+def test_zoom_with_unequal_aspect_reuses():
+    cache=GridCache()
+    ranges=[(-100,100),(-30,50)]
+    cache.sweep(BASE,('sigma_xx','sigma_yy'),ranges,1000)
+    for _ in range(6):
+        ranges=[(c-(c-lo)*0.8,c+(hi-c)*0.8) for c,(lo,hi) in zip((10,5),ranges)]
+        grid=cache.sweep(BASE,('sigma_xx','sigma_yy'),ranges,1000)
+        assert grid.reused>0
+        assert (grid.solved+grid.reused)%TILE[2]**2==0  #whole tiles
+        assert_exact(grid)